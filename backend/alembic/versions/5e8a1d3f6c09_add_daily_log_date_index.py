@@ -0,0 +1,26 @@
+"""Add an index on daily_log.date
+
+Revision ID: 5e8a1d3f6c09
+Revises: 543703d68501
+Create Date: 2026-10-18 10:04:51.208337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a1d3f6c09'
+down_revision: Union[str, None] = '543703d68501'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_daily_log_date', 'daily_log', ['date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_daily_log_date', table_name='daily_log')
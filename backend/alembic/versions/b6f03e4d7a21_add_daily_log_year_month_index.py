@@ -0,0 +1,26 @@
+"""Add an index on daily_log (year, month)
+
+Revision ID: b6f03e4d7a21
+Revises: 5e8a1d3f6c09
+Create Date: 2026-10-18 19:12:07.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f03e4d7a21'
+down_revision: Union[str, None] = '5e8a1d3f6c09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_daily_log_year_month', 'daily_log', ['year', 'month'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_daily_log_year_month', table_name='daily_log')
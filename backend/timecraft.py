@@ -1,14 +1,16 @@
 #!/usr/bin/python3
 """ Console Module """
 
+import argparse
 import cmd
+import json
 import sys
 import os
 import uuid
 import calendar
 from datetime import datetime, date, timedelta
 from models.basemodel import BaseModel
-from models.__init__ import storage
+from models import storage
 from models.user import User
 from models.task import Task
 from models.dailylog import DailyLog
@@ -162,7 +164,7 @@ class TcCommand(cmd.Cmd):
                           + "Please try again")
                     storage.user_id = None
                     return
-                print(f"Current User: {user.name}")
+                print(f"Current User: {user.username}")
                 task_name = str(input("Please name your task\n: "))
                 total_tot = 0
                 daily_goal = float(input("How many hours would you like to "
@@ -255,13 +257,10 @@ class TcCommand(cmd.Cmd):
                 user_id = str(input("Can I please see some ID?\n: "))
                 storage.user_id = user_id
 
-            # Get all the tasks in storage
-            tasks = storage.get_task()
+            # Get the user's tasks in storage
+            tasks = storage.get_task_by_user_id(user_id)
 
-            user_tasks_names = []
-            for task in tasks:
-                if task.user_id == user_id:
-                    user_tasks_names.append(task.task_name)
+            user_tasks_names = [task.task_name for task in tasks]
             if not user_tasks_names:
                 print("Looks like this user has no tasks")
                 return
@@ -344,7 +343,7 @@ class TcCommand(cmd.Cmd):
                 print("There seems to be no user with that ID")
                 storage.user_id = None
                 return
-            print(f"Current User: {user.name}")
+            print(f"Current User: {user.username}")
             print(f"So far, you've logged in {user.total_productive_time}"
                   + " hours of solid work. Keep it going!")
         except Exception as e:
@@ -371,7 +370,7 @@ class TcCommand(cmd.Cmd):
                 print("There seems to be no user with that ID")
                 storage.user_id = None
                 return
-            print(f"Current User: {user.name}")
+            print(f"Current User: {user.username}")
             print(f"So far, you've wasted {user.total_wasted_time} hours."
                   + " Remember, it's about progress not perfection. "
                   + "Keep going!")
@@ -412,30 +411,24 @@ class TcCommand(cmd.Cmd):
                 print("Run 'help daily_report' for help")
                 return
 
-            logs = storage.get_logs_of_the_day(date)
+            # Sums the user's logs of that date per task in a single query
+            report = storage.daily_report(user_id, date)
 
-            if not logs:
+            if report is None:
                 print(f"{self.prompt} There seems to be no logs for today")
                 return
-        except TypeError as e:
+        except (TypeError, ValueError) as e:
             print(f"{self.prompt} Something seems off. Run 'help daily_report'"
                   + " and try again.")
             return
 
-        total_time_on_task_day = 0
-        total_wasted_time_day = 0
-
-        for log in logs:
-            task = storage.get_task(log.task_id)
-            if task.user_id == user_id:
-                total_time_on_task_day += log.time_on_task
-                total_wasted_time_day += log.time_wasted
-                print(f"{self.prompt} You spent {log.time_on_task} hours on"
-                      + f" {task.task_name}")
-        print(f"{self.prompt} You spent a total of {total_time_on_task_day} "
+        for task in report['tasks']:
+            print(f"{self.prompt} You spent {task['ttot']} hours on"
+                  + f" {task['name']}")
+        print(f"{self.prompt} You spent a total of {report['ttot_day']} "
               + "hours working")
         print()
-        print(f"{self.prompt} You wasted a total of {total_wasted_time_day} "
+        print(f"{self.prompt} You wasted a total of {report['twt_day']} "
               + "hours today")
         print(f"{self.prompt} Tomorrow is always another day. Salute!")
 
@@ -460,7 +453,7 @@ class TcCommand(cmd.Cmd):
                       + f" Please try again!")
                 storage.user_id = None
                 return
-            print(f"Current User: {user.name}")
+            print(f"Current User: {user.username}")
             date = str(input("Please choose from these options\n"
                              + "this_week   last_week    custom\n: "))
 
@@ -474,21 +467,10 @@ class TcCommand(cmd.Cmd):
                 end_date = start_date + timedelta(days=6)
                 print(f"End Date: {end_date.strftime('%B.%-d.%Y')}")
 
-                total_time_on_task_week = 0
-                total_wasted_time_week = 0
-
-                day = start_date
-                while day < end_date:
-                    log_id = day.strftime("%B.%-d.%Y")
-                    logs = storage.get_logs_of_the_day(log_id)
-
-                    for log in logs:
-                        task = storage.get_task(log.task_id)
-                        if task.user_id == user_id:
-                            total_time_on_task_week += log.time_on_task
-                            total_wasted_time_week += log.time_wasted
-
-                    day += timedelta(days=1)
+                # Sums the user's logs of the week in a single query
+                report = storage.weekly_report(user_id, date)
+                total_time_on_task_week = report['ttot_week']
+                total_wasted_time_week = report['twt_week']
 
                 if total_time_on_task_week == 0 and\
                         total_wasted_time_week == 0:
@@ -552,32 +534,22 @@ class TcCommand(cmd.Cmd):
             if not user:
                 print("There seems to be no user with that ID."
                       + " Please try again!")
-                stprage.user_id = None
+                storage.user_id = None
                 return
 
-            print(f"Current User: {user.name}")
+            print(f"Current User: {user.username}")
             month = str(input("What month would you like to get a report for?"
                               + "\n (Example: February) : "))
-            # Total time on task this month
-            ttot_month = 0
-            # Total wasted time this month
-            twt_month = 0
-
-            logs = storage.get_logs_of_the_day()
-            logs_of_the_month = []
-            for log in logs:
-                if log.month == month:
-                    logs_of_the_month.append(log)
-            if not logs_of_the_month:
+            # Sums the user's logs of that month, in every year
+            report = storage.monthly_report(user_id, month)
+            if report is None:
                 print(f"{self.prompt} Hmm... it looks like there are no logs"
                       + " for that month. Try Another one")
                 return
-
-            for log in logs_of_the_month:
-                task = storage.get_task(log.task_id)
-                if task.user_id == user_id:
-                    ttot_month += log.time_on_task
-                    twt_month += log.time_wasted
+            # Total time on task this month
+            ttot_month = report['ttot_month']
+            # Total wasted time this month
+            twt_month = report['twt_month']
 
             print(f"{self.prompt} In the month of {month}, you have spent"
                   + f" {ttot_month} hours working. Way to go!")
@@ -609,7 +581,7 @@ class TcCommand(cmd.Cmd):
                   + ". Please try again")
             return
         storage.user_id = user_id
-        print(f"Switched to user {user.name}")
+        print(f"Switched to user {user.username}")
 
     def help_switch_user(self):
         ''' Documentation for the method switch_user '''
@@ -619,5 +591,117 @@ class TcCommand(cmd.Cmd):
         print("Provide the user ID of the User you want to switch to")
 
 
+def log_date(value):
+    """ The "March.5.2024" log date of today or a YYYY-MM-DD date """
+    if value == "today":
+        return datetime.today().strftime("%B.%-d.%Y")
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%B.%-d.%Y")
+
+
+def batch_all_tasks(user, args):
+    """ all_tasks USER_ID """
+    return {'tasks': [
+        {
+            'id': task.unique_id,
+            'name': task.task_name,
+            'total_time_on_task': task.total_time_on_task,
+        }
+        for task in storage.get_task_by_user_id(user.unique_id)
+    ]}
+
+
+def batch_total_productive_time(user, args):
+    """ total_productive_time USER_ID """
+    return {'tpt': user.total_productive_time}
+
+
+def batch_total_wasted_time(user, args):
+    """ total_wasted_time USER_ID """
+    return {'twt': user.total_wasted_time}
+
+
+def batch_daily_report(user, args):
+    """ daily_report USER_ID [today | YYYY-MM-DD] """
+    return storage.daily_report(user.unique_id,
+                                log_date(args[0] if args else "today"))
+
+
+def batch_weekly_report(user, args):
+    """ weekly_report USER_ID [this_week | last_week | YYYY-MM-DD] """
+    week = args[0] if args else "this_week"
+    if week == "this_week":
+        day = datetime.today()
+    elif week == "last_week":
+        day = datetime.today() - timedelta(days=7)
+    else:
+        day = datetime.strptime(week, "%Y-%m-%d")
+    return storage.weekly_report(user.unique_id, day)
+
+
+def batch_monthly_report(user, args):
+    """ monthly_report USER_ID MONTH [YEAR] """
+    if not args:
+        raise ValueError("Missing month")
+    return storage.monthly_report(user.unique_id, args[0],
+                                  int(args[1]) if len(args) > 1 else None)
+
+
+# Commands of --batch files, each takes the user and the remaining words
+BATCH_COMMANDS = {
+    'all_tasks': batch_all_tasks,
+    'total_productive_time': batch_total_productive_time,
+    'total_wasted_time': batch_total_wasted_time,
+    'daily_report': batch_daily_report,
+    'weekly_report': batch_weekly_report,
+    'monthly_report': batch_monthly_report,
+}
+
+
+def run_batch(lines, out=sys.stdout):
+    """ Runs one command per line and writes a JSON object per line
+
+        Lines look like "daily_report USER_ID 2024-03-05", empty lines
+        and lines starting with # are skipped. Reports that have no logs
+        are null. Returns the number of failed lines """
+    failures = 0
+    users = {}
+    for number, line in enumerate(lines, 1):
+        words = line.split()
+        if not words or words[0].startswith('#'):
+            continue
+
+        result = {'line': number, 'command': words[0]}
+        try:
+            if words[0] not in BATCH_COMMANDS:
+                raise ValueError(f"Unknown command {words[0]}")
+            if len(words) < 2:
+                raise ValueError("Missing user ID")
+            if words[1] not in users:
+                users[words[1]] = storage.get_user(words[1])
+            user = users[words[1]]
+            if not user:
+                raise ValueError(f"No user with ID {words[1]}")
+            result['user_id'] = user.unique_id
+            result['report'] = BATCH_COMMANDS[words[0]](user, words[2:])
+        except Exception as e:
+            storage.rollback()
+            failures += 1
+            result['error'] = str(e)
+        out.write(json.dumps(result) + '\n')
+    return failures
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TimeCraft console")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="Run the commands of FILE ('-' for stdin) and "
+                             + "print one JSON result per line")
+    arguments = parser.parse_args()
+
+    if arguments.batch:
+        if arguments.batch == '-':
+            sys.exit(1 if run_batch(sys.stdin) else 0)
+        with open(arguments.batch) as batch_file:
+            sys.exit(1 if run_batch(batch_file) else 0)
+
     TcCommand().cmdloop()
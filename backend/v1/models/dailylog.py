@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 from models.basemodel import BaseModel, Base
-from sqlalchemy import Column, String, Float, Integer, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -9,6 +9,7 @@ from datetime import datetime
 class DailyLog(BaseModel, Base):
     ''' This is the class representation of the Object DailyLog '''
     __tablename__ = "daily_log"
+    __table_args__ = (Index('ix_daily_log_year_month', 'year', 'month'),)
     month = Column(String(60), nullable=False)
     day = Column(Integer, nullable=False)
     year = Column(Integer, nullable=False)
@@ -16,5 +17,5 @@ class DailyLog(BaseModel, Base):
     time_on_task = Column(Float, nullable=False, default=0)
     time_wasted = Column(Float, nullable=False, default=0)
     day_of_week = Column(String(55), nullable=False)
-    date = Column(String(60), nullable=True)
+    date = Column(String(60), nullable=True, index=True)
     task = relationship("Task", back_populates="logs")
\ No newline at end of file
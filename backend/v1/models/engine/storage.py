@@ -5,7 +5,8 @@
 import os
 import sys
 import sqlalchemy
-from sqlalchemy import (create_engine, update)
+from datetime import datetime, timedelta
+from sqlalchemy import (create_engine, func, update)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from models.basemodel import Base
@@ -72,17 +73,12 @@ class Storage:
     def get_user(self, user_id=None):
         """ Get a user(Users) from the list of users """
 
-        # Get all User objects in storage
-        users = self.__session.query(User)
-
         if user_id:
-            for user in users:
-                if user.unique_id == user_id:
-                    return user
-            return None
+            return self.__session.query(User).filter(
+                User.unique_id == user_id).first()
 
         # If no User Id given, return all User objects(for internal usage)
-        return users
+        return self.__session.query(User)
     
     def get_user_by_email(self, email):
         ''' Get user byy email address '''
@@ -91,17 +87,20 @@ class Storage:
     def get_task(self, task_id=None):
         """ Get a task(or all tasks) from the list of tasks """
 
-        # Get all Task objects in storage
-        tasks = self.__session.query(Task)
-
         if task_id:
-            for task in tasks:
-                if task.unique_id == task_id:
-                    return task
-            return None
+            return self.__session.query(Task).filter(
+                Task.unique_id == task_id).first()
 
         # If noto Task ID is given, return all Task objects(for internal use)
-        return tasks
+        return self.__session.query(Task)
+
+    def get_tasks(self, task_ids):
+        """ Get several tasks by their IDs in a single query """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        return self.__session.query(Task).filter(
+            Task.unique_id.in_(task_ids)).all()
     
     def get_task_by_user_id(self, user_id):
         ''' Get a task by user Id '''
@@ -114,19 +113,106 @@ class Storage:
     def get_logs_of_the_day(self, log_date=None):
         """ Gets a log(or all logs) from the list of logs """
 
-        # Get all Log objects in storarge
-        logs = self.__session.query(DailyLog)
-        logs_of_the_day = []
-
         if log_date:
-            for log in logs:
-                # Get all logs for a given date
-                if log.date == log_date:
-                    logs_of_the_day.append(log)
-            return logs_of_the_day
+            # Get all logs for a given date
+            return self.__session.query(DailyLog).filter(
+                DailyLog.date == log_date).all()
 
         # If no log date given, return all DailyLog objects(for internal use)
-        return logs
+        return self.__session.query(DailyLog)
+
+    def __log_filter(self, log_dates=None, month=None, year=None):
+        ''' SQL condition selecting logs by date strings or by month '''
+        if log_dates is not None:
+            return DailyLog.date.in_(list(log_dates))
+        if year is None:
+            return DailyLog.month == month
+        return (DailyLog.year == year) & (DailyLog.month == month)
+
+    def task_totals(self, user_id, log_dates=None, month=None, year=None):
+        ''' Sums a user's logs per task name in a single grouped query
+
+            The logs are the ones dated one of log_dates ("March.5.2024"
+            strings), or else the ones of month (a full month name) and
+            year, of any year when year is None. Returns
+            (task_name, time_on_task, time_wasted) rows ordered by task
+            name '''
+        return self.__session.query(
+            Task.task_name,
+            func.sum(DailyLog.time_on_task),
+            func.sum(DailyLog.time_wasted)
+        ).join(
+            Task, DailyLog.task_id == Task.unique_id
+        ).filter(
+            Task.user_id == user_id,
+            self.__log_filter(log_dates, month, year)
+        ).group_by(Task.task_name).order_by(Task.task_name).all()
+
+    def has_logs(self, log_dates=None, month=None, year=None):
+        ''' Checks if anyone logged on log_dates, or in month of year '''
+        return self.__session.query(
+            self.__session.query(DailyLog).filter(
+                self.__log_filter(log_dates, month, year)).exists()
+        ).scalar()
+
+    def __summarize(self, rows):
+        ''' Total time on task, total wasted time and per-task list of
+            task_totals rows '''
+        tasks = [{'name': name, 'ttot': ttot} for name, ttot, _ in rows]
+        return (sum(row[1] for row in rows), sum(row[2] for row in rows),
+                tasks)
+
+    def daily_report(self, user_id, log_date):
+        ''' The daily report of a user for a "March.5.2024" date string
+
+            Returns None when nobody logged anything that day '''
+        rows = self.task_totals(user_id, log_dates=[log_date])
+        if not rows and not self.has_logs(log_dates=[log_date]):
+            return None
+        ttot, twt, tasks = self.__summarize(rows)
+        return {
+            'ttot_day': ttot,
+            'twt_day': twt,
+            'date': log_date.replace(".", " "),
+            'weekday': datetime.strptime(log_date, "%B.%d.%Y").strftime("%A"),
+            'tasks': tasks,
+        }
+
+    def weekly_report(self, user_id, date):
+        ''' The weekly report of a user for the week of a datetime
+
+            Like it always has, the report sums Monday to Saturday while
+            naming Sunday as its end date '''
+        start_date = date - timedelta(days=date.weekday())
+        end_date = start_date + timedelta(days=6)
+        log_dates = [(start_date + timedelta(days=offset)).strftime("%B.%-d.%Y")
+                     for offset in range(6)]
+        ttot, twt, tasks = self.__summarize(
+            self.task_totals(user_id, log_dates=log_dates))
+        return {
+            'ttot_week': ttot,
+            'twt_week': twt,
+            'start_date': start_date.strftime("%a, %d %b, %Y"),
+            'end_date': end_date.strftime("%a, %d %b, %Y"),
+            'tasks': tasks,
+        }
+
+    def monthly_report(self, user_id, month, year=None):
+        ''' The monthly report of a user, month is a full month name
+
+            Without a year, the month of every year is summed. Returns
+            None when nobody logged anything that month '''
+        rows = self.task_totals(user_id, month=month, year=year)
+        if not rows and not self.has_logs(month=month, year=year):
+            return None
+        ttot, twt, tasks = self.__summarize(rows)
+        return {
+            'ttot_month': ttot,
+            'twt_month': twt,
+            'month': month,
+            'year': year,
+            'tasks': tasks,
+        }
 
     def new(self, obj):
         ''' Adds a new object to the session '''
@@ -1,5 +1,26 @@
 from v2.models.Activity import Activity
+from v2.models.Report import Report
 from v2.models import storage
+from v2.utils.serializers import ModelSerializer, serializer_for
+from datetime import datetime
+from sqlalchemy import and_, or_
+import base64
+import json
+
+# Fields an activity can be serialized with, in response order
+ACTIVITY_FIELDS = (
+    'id',
+    'unique_id',
+    'name',
+    'description',
+    'daily_goal',
+    'weekly_goal',
+    'total_time_on_task',
+    'created_at',
+    'updated_at'
+)
+
+activity_serializer = ModelSerializer(Activity, ACTIVITY_FIELDS)
 
 
 def get_activity_by_name(user_id: str, name: str) -> Activity:
@@ -11,17 +32,89 @@ def get_activity_by_name(user_id: str, name: str) -> Activity:
     ).first()
 
 
-def get_all_activities(user_id: str) -> list[Activity]:
-    """Get all activities for a specific user"""
+def get_activity_by_id(activity_id: str, user_id: str) -> Activity:
+    """Get one of user_id's activities by ID"""
     return storage.session.query(Activity).filter(
+        Activity.unique_id == activity_id,
         Activity.user_id == user_id,
         Activity.deleted == None
-    ).all()
+    ).first()
 
 
-def get_activity_by_id(activity_id: str) -> Activity:
-    """Get an activity by ID"""
-    return storage.session.query(Activity).filter(
-        Activity.unique_id == activity_id,
+def touch_activity_reports(activity: Activity) -> None:
+    """Stamp updated_at of the activity's reports in the current transaction
+
+    Reports carry the activity's name and deleted time in the Parquet
+    exports, which pick up reports by updated_at.
+    """
+    storage.session.query(Report).filter(
+        Report.activity_id == activity.id
+    ).update({'updated_at': datetime.now()}, synchronize_session=False)
+
+
+def encode_cursor(created_at: datetime, activity_id: str) -> str:
+    """Encode the position after an activity as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), activity_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a cursor made by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, activity_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), str(activity_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def get_activity_page(
+    user_id: str,
+    fields: tuple[str, ...] = ACTIVITY_FIELDS,
+    limit: int | None = None,
+    cursor: str | None = None
+) -> tuple[list[dict], str | None]:
+    """Get a page of a user's activities ordered by (created_at, id)
+
+    Only the requested fields are selected, no ORM objects are built.
+    Pages are keyset based: cursor is the next_cursor of the previous page,
+    so later pages cost the same as the first one.
+
+    Returns:
+        The activities as dictionaries and the cursor of the next page,
+        None when this is the last page
+    """
+    query = storage.session.query(
+        Activity.created_at.label('cursor_created_at'),
+        Activity.id.label('cursor_id'),
+        *(getattr(Activity, field) for field in fields)
+    ).filter(
+        Activity.user_id == user_id,
         Activity.deleted == None
-    ).first()
\ No newline at end of file
+    ).order_by(
+        Activity.created_at,
+        Activity.id
+    )
+
+    if cursor:
+        created_at, activity_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Activity.created_at > created_at,
+            and_(Activity.created_at == created_at, Activity.id > activity_id)
+        ))
+
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        query = query.limit(limit + 1)
+
+    rows = query.all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].cursor_created_at, rows[-1].cursor_id)
+
+    activities = serializer_for(Activity, tuple(fields)).dump_many(rows)
+    return activities, next_cursor
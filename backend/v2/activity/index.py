@@ -4,15 +4,22 @@ from datetime import datetime
 from v2.report.functions import get_profile_by_id
 from v2.activity.functions import get_activity_by_id
 from v2.activity.validation import CreateActivityRequest, UpdateActivityRequest
-from v2.activity.functions import get_activity_by_name, get_all_activities
+from v2.activity.functions import (
+    get_activity_by_name, get_activity_page, activity_serializer, ACTIVITY_FIELDS,
+    touch_activity_reports)
 from v2 import router
 from flask import jsonify, request, abort
 from v2.models.Activity import Activity
 from v2.models import storage
 from v2.utils.middleware import auth_middleware
+from v2.report.cache import report_cache
+from v2.utils.etag import bump_data_version, data_etag, not_modified
 from flasgger.utils import swag_from
 from sqlalchemy.exc import IntegrityError
 
+# Largest page GET /activity returns
+MAX_PAGE_SIZE = 500
+
 
 @router.route('/activity', methods=['POST'], strict_slashes=False)
 @auth_middleware
@@ -41,6 +48,7 @@ def create_activity():
         )
         
         try:
+            bump_data_version(request.user['id'])
             new_activity.save()
         except Exception as e:
             storage.rollback()
@@ -48,18 +56,7 @@ def create_activity():
                 'message': str(e)
             }), 500
             
-        # Convert task to dictionary for response
-        activity_dict = {
-            'id': new_activity.id,
-            'unique_id': new_activity.unique_id,
-            'name': new_activity.name,
-            'description': new_activity.description,
-            'daily_goal': new_activity.daily_goal,
-            'weekly_goal': new_activity.weekly_goal,
-            'total_time_on_task': new_activity.total_time_on_task,
-            'created_at': new_activity.created_at.isoformat(),
-            'updated_at': new_activity.updated_at.isoformat()
-        }
+        activity_dict = activity_serializer.dump(new_activity)
         
         return jsonify({
             'message': 'Activity created successfully',
@@ -79,30 +76,54 @@ def create_activity():
 @router.route('/activity', methods=['GET'], strict_slashes=False)
 @auth_middleware
 def get_activities():
-    """Get all activities for the authenticated user"""
+    """Get the activities of the authenticated user
+
+    Query parameters:
+        limit: Page size (1 to MAX_PAGE_SIZE), all activities when missing
+        cursor: next_cursor of the previous page
+        fields: Comma separated subset of ACTIVITY_FIELDS to return
+
+    Answers 304 when If-None-Match holds the current ETag.
+    """
     try:
-        # Query activities for the current user that aren't deleted
-        activities = get_all_activities(request.user['id'])
-        
-        # Convert activities to list of dictionaries
-        activities_list = []
-        for activity in activities:
-            activities_list.append({
-                'id': activity.id,
-                'unique_id': activity.unique_id,
-                'name': activity.name,
-                'description': activity.description,
-                'daily_goal': activity.daily_goal,
-                'weekly_goal': activity.weekly_goal,
-                'total_time_on_task': activity.total_time_on_task,
-                'created_at': activity.created_at.isoformat(),
-                'updated_at': activity.updated_at.isoformat()
-            })
+        # The version is read before the data, so a concurrent write can
+        # only make the ETag older than the body, never newer
+        etag = data_etag(request.user['id'], request.full_path)
+        response = not_modified(etag)
+        if response:
+            return response
+
+        try:
+            limit = request.args.get('limit', type=int)
+            if 'limit' in request.args and (limit is None or not 1 <= limit <= MAX_PAGE_SIZE):
+                raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+            fields = ACTIVITY_FIELDS
+            if request.args.get('fields'):
+                fields = tuple(field.strip() for field in request.args['fields'].split(','))
+                unknown = set(fields) - set(ACTIVITY_FIELDS)
+                if unknown:
+                    raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+            # Query activities for the current user that aren't deleted
+            activities_list, next_cursor = get_activity_page(
+                request.user['id'],
+                fields=fields,
+                limit=limit,
+                cursor=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({
+                'message': str(e)
+            }), 400
             
-        return jsonify({
+        response = jsonify({
             'message': 'Activities retrieved successfully',
-            'data': activities_list
-        }), 200
+            'data': activities_list,
+            'next_cursor': next_cursor
+        })
+        response.set_etag(etag)
+        return response, 200
         
     except Exception as e:
         return jsonify({
@@ -113,33 +134,32 @@ def get_activities():
 @router.route('/activity/<activity_id>', methods=['GET'], strict_slashes=False)
 @auth_middleware
 def get_activity(activity_id):
-    """Get a specific activity by ID"""
+    """Get a specific activity by ID
+
+    Answers 304 when If-None-Match holds the current ETag.
+    """
     try:
+        etag = data_etag(request.user['id'], request.path)
+        response = not_modified(etag)
+        if response:
+            return response
+
         # Query the activity
-        activity = get_activity_by_id(activity_id)
+        activity = get_activity_by_id(activity_id, request.user['id'])
         
         if not activity:
             return jsonify({
                 'message': 'Activity not found'
             }), 404
             
-        # Convert activity to dictionary
-        activity_dict = {
-            'id': activity.id,
-            'unique_id': activity.unique_id,
-            'name': activity.name,
-            'description': activity.description,
-            'daily_goal': activity.daily_goal,
-            'weekly_goal': activity.weekly_goal,
-            'total_time_on_task': activity.total_time_on_task,
-            'created_at': activity.created_at.isoformat(),
-            'updated_at': activity.updated_at.isoformat()
-        }
+        activity_dict = activity_serializer.dump(activity)
         
-        return jsonify({
+        response = jsonify({
             'message': 'Activity retrieved successfully',
             'data': activity_dict
-        }), 200
+        })
+        response.set_etag(etag)
+        return response, 200
         
     except Exception as e:
         return jsonify({
@@ -157,7 +177,7 @@ def update_activity(activity_id):
         update_data = UpdateActivityRequest.model_validate(data)
         
         # Query the activity
-        updated_activity = get_activity_by_id(activity_id)
+        updated_activity = get_activity_by_id(activity_id, request.user['id'])
         
         if not updated_activity:
             return jsonify({
@@ -173,6 +193,9 @@ def update_activity(activity_id):
                     'message': "You already have an activity with this name"
                 }), 400
 
+        # Reports list activities by name, a rename changes all of them
+        renamed = bool(update_data.name) and update_data.name != updated_activity.name
+
         # Update only provided fields
         if update_data.name:
             updated_activity.name = update_data.name
@@ -187,25 +210,20 @@ def update_activity(activity_id):
         updated_activity.updated_at = datetime.now()
         
         try:
+            bump_data_version(updated_activity.user_id)
+            if renamed:
+                touch_activity_reports(updated_activity)
             updated_activity.save()
         except Exception as e:
             storage.rollback()
             return jsonify({
                 'message': str(e)
             }), 500
+
+        if renamed:
+            report_cache.invalidate(updated_activity.user_id)
             
-        # Convert updated activity to dictionary
-        activity_dict = {
-            'id': updated_activity.id,
-            'unique_id': updated_activity.unique_id,
-            'name': updated_activity.name,
-            'description': updated_activity.description,
-            'daily_goal': updated_activity.daily_goal,
-            'weekly_goal': updated_activity.weekly_goal,
-            'total_time_on_task': updated_activity.total_time_on_task,
-            'created_at': updated_activity.created_at.isoformat(),
-            'updated_at': updated_activity.updated_at.isoformat()
-        }
+        activity_dict = activity_serializer.dump(updated_activity)
         
         return jsonify({
             'message': 'Activity updated successfully',
@@ -228,7 +246,7 @@ def delete_activity(activity_id):
     """Soft delete a specific activity"""
     try:
         # Query the activity
-        activity = get_activity_by_id(activity_id)
+        activity = get_activity_by_id(activity_id, request.user['id'])
         
         if not activity:
             return jsonify({
@@ -237,7 +255,10 @@ def delete_activity(activity_id):
             
         # Soft delete the activity
         activity.deleted = datetime.now()
+        bump_data_version(activity.user_id)
+        touch_activity_reports(activity)
         activity.save()
+        report_cache.invalidate(activity.user_id)
         
         return jsonify({
             'message': 'Activity deleted successfully'
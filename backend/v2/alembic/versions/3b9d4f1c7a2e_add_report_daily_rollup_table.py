@@ -0,0 +1,40 @@
+"""Add the report_daily_rollup table
+
+Revision ID: 3b9d4f1c7a2e
+Revises: f91c39ca4f32
+Create Date: 2026-10-18 09:12:40.118204
+
+Run `python -m v2.cli backfill-rollups` after upgrading to fill the table
+from the existing reports.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d4f1c7a2e'
+down_revision: Union[str, None] = 'f91c39ca4f32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'report_daily_rollup',
+        sa.Column('user_id', sa.String(length=60), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('activity_id', sa.String(length=60), nullable=False),
+        sa.Column('time_on_task', sa.Float(), nullable=False),
+        sa.Column('time_wasted', sa.Float(), nullable=False),
+        sa.Column('report_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['activity_id'], ['activity.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['profile.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'activity_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('report_daily_rollup')
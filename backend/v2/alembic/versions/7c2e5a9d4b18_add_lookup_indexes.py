@@ -0,0 +1,50 @@
+"""Add indexes for the storage lookups
+
+Revision ID: 7c2e5a9d4b18
+Revises: 3b9d4f1c7a2e
+Create Date: 2026-10-18 10:02:17.530911
+
+unique_id is declared unique, but databases created before the constraint
+was added may not have it, so those indexes are only created when nothing
+already covers the column.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e5a9d4b18'
+down_revision: Union[str, None] = '3b9d4f1c7a2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNIQUE_ID_TABLES = ('user', 'profile', 'activity', 'report')
+
+
+def _is_indexed(table, columns):
+    """Checks whether an index or unique constraint starts with columns"""
+    inspector = sa.inspect(op.get_bind())
+    existing = [index['column_names'] for index in inspector.get_indexes(table)]
+    existing += [unique['column_names']
+                 for unique in inspector.get_unique_constraints(table)]
+    return any(names[:len(columns)] == list(columns) for names in existing)
+
+
+def upgrade() -> None:
+    for table in UNIQUE_ID_TABLES:
+        if not _is_indexed(table, ['unique_id']):
+            op.create_index(f'ix_{table}_unique_id', table, ['unique_id'], unique=True)
+    op.create_index('ix_activity_user_id', 'activity', ['user_id'])
+    op.create_index('ix_report_activity_id_date', 'report', ['activity_id', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_activity_id_date', table_name='report')
+    op.drop_index('ix_activity_user_id', table_name='activity')
+    inspector = sa.inspect(op.get_bind())
+    for table in UNIQUE_ID_TABLES:
+        names = [index['name'] for index in inspector.get_indexes(table)]
+        if f'ix_{table}_unique_id' in names:
+            op.drop_index(f'ix_{table}_unique_id', table_name=table)
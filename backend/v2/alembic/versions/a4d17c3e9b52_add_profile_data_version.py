@@ -0,0 +1,30 @@
+"""Add profile.data_version
+
+Revision ID: a4d17c3e9b52
+Revises: 7c2e5a9d4b18
+Create Date: 2026-10-18 11:24:05.671390
+
+The counter is bumped by every activity and report write of the user and
+feeds the ETags of the read endpoints.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d17c3e9b52'
+down_revision: Union[str, None] = '7c2e5a9d4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('profile', sa.Column(
+        'data_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('profile') as batch_op:
+        batch_op.drop_column('data_version')
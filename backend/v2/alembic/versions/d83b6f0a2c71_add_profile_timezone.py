@@ -0,0 +1,30 @@
+"""Add profile.timezone
+
+Revision ID: d83b6f0a2c71
+Revises: a4d17c3e9b52
+Create Date: 2026-10-18 12:40:51.204716
+
+Existing profiles get UTC, which is how their rollup days were computed,
+so the rollup stays valid without a rebuild.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd83b6f0a2c71'
+down_revision: Union[str, None] = 'a4d17c3e9b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('profile', sa.Column(
+        'timezone', sa.String(length=64), nullable=False, server_default='UTC'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('profile') as batch_op:
+        batch_op.drop_column('timezone')
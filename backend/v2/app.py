@@ -9,11 +9,20 @@ from flask_cors import CORS
 from flasgger import Swagger
 from v2 import router
 from v2.auth.index import auth_router
+from v2.utils.json_provider import FastJSONProvider
+from v2.utils import instrumentation
 
 
 # Initializing app
 app = Flask(__name__)
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+
+# Compact JSON responses, pretty printed in debug mode or with JSON_PRETTYPRINT
+app.json = FastJSONProvider(app)
+if environ.get('JSON_PRETTYPRINT', '').lower() in ('1', 'true', 'yes', 'on'):
+    app.json.compact = False
+
+# Per-route latency and SQL metrics, Server-Timing headers and /metrics
+instrumentation.init_app(app)
 
 # Registering blueprint on app
 app.register_blueprint(router, url_prefix="/api")
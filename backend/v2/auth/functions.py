@@ -1,13 +1,21 @@
 from v2.models import storage
 from v2.models.User import User
 from v2.models.Profile import Profile
+from v2.utils.cache import TTLCache
 from datetime import datetime
 from jose import jwt
 from os import environ
+import time
 
 SECRET_KEY = environ.get('SECRET_KEY')
 ALGORITHM = environ.get('ALGORITHM')
 
+# Authenticated principals keyed by (token email, token exp)
+principal_cache = TTLCache(
+    maxsize=int(environ.get('PRINCIPAL_CACHE_SIZE', 1024)),
+    ttl=float(environ.get('PRINCIPAL_CACHE_TTL', 60))
+)
+
 
 def get_user_by_email(email: str) -> dict:
     """ Get a user by email """
@@ -24,6 +32,32 @@ def get_user_by_email(email: str) -> dict:
     return {}
 
 
+def get_principal(email: str, expires_at: float | None) -> dict:
+    """ Get the authenticated user for a token's subject
+
+    Served from principal_cache when possible so authenticated requests
+    skip the User and Profile queries. Entries never outlive the token.
+    Returns a copy, callers are free to modify it.
+    """
+    key = (email, expires_at)
+    principal = principal_cache.get(key)
+
+    if principal is None:
+        user = get_user_by_email(email)
+        if not user:
+            return {}
+        principal = user
+        ttl = expires_at - time.time() if expires_at else None
+        principal_cache.set(key, principal, ttl)
+
+    return dict(principal)
+
+
+def invalidate_principal(user_id: str) -> None:
+    """ Drop cached principals of a user after their profile changed """
+    principal_cache.delete_where(lambda key, user: user.get('id') == user_id)
+
+
 def get_user_by_username(username: str) -> dict:
     """ Get a user by username """
     profile = storage.session.query(Profile).filter(Profile.username == username, Profile.deleted == None).first()
@@ -0,0 +1,117 @@
+"""Password hashing on a bounded pool of worker threads
+
+bcrypt is deliberately slow. Running it on a small dedicated pool caps
+how many request threads a login burst can keep busy. When the pool and
+its queue are full, callers get HasherBusy right away instead of waiting
+behind the burst.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count, environ
+from passlib.context import CryptContext
+from v2.utils.metrics import Histogram
+
+# bcrypt cost, hashes made with any other cost are upgraded on login
+BCRYPT_ROUNDS = int(environ.get('BCRYPT_ROUNDS', 12))
+
+bcrypt_context = CryptContext(
+    schemes=['bcrypt'],
+    deprecated='auto',
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+
+class HasherBusy(Exception):
+    """Raised when every hashing worker and queue slot is taken"""
+
+
+class PasswordHasher:
+    """Runs a CryptContext's hash and verify calls on a bounded pool
+
+    At most workers hashes run at once and at most queue_depth more wait
+    for a worker. Everything past that is rejected with HasherBusy.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, queue_depth: int):
+        self.context = context
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.rejected = 0
+        self.hash_latency = Histogram()
+        self.verify_latency = Histogram()
+        self.queue_wait = Histogram()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='password-hasher'
+        )
+
+    def _run(self, latency: Histogram, fn, *args):
+        """Run fn on the pool and wait for its result
+
+        Raises:
+            HasherBusy: If the pool and its queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy('Too many password checks in progress, try again shortly')
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self.queue_wait.observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        try:
+            future = self._executor.submit(task)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        return self._run(self.hash_latency, self.context.hash, password)
+
+    def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """Check a password against its hash
+
+        Returns:
+            Whether the password matches, and a new hash when it does and
+            the stored one was made with an outdated cost
+        """
+        return self._run(
+            self.verify_latency, self.context.verify_and_update, password, hashed
+        )
+
+    def stats(self) -> dict:
+        """Pool configuration, rejections and latency histograms"""
+        with self._lock:
+            rejected = self.rejected
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'rounds': BCRYPT_ROUNDS,
+            'rejected': rejected,
+            'hash_latency': self.hash_latency.snapshot(),
+            'verify_latency': self.verify_latency.snapshot(),
+            'queue_wait': self.queue_wait.snapshot(),
+        }
+
+
+password_hasher = PasswordHasher(
+    bcrypt_context,
+    workers=int(environ.get('PASSWORD_HASH_WORKERS', min(4, cpu_count() or 1))),
+    queue_depth=int(environ.get('PASSWORD_HASH_QUEUE_DEPTH', 16))
+)
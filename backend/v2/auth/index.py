@@ -5,11 +5,11 @@ from flask import jsonify, request, abort, Blueprint
 from v2.models.User import User
 from v2.models.Profile import Profile
 from flasgger.utils import swag_from
-from passlib.context import CryptContext
 from datetime import timedelta, datetime
 from sqlalchemy.exc import IntegrityError
 from os import environ
-from v2.auth.functions import get_user_by_email, get_user_by_id, create_access_token, get_user_by_username
+from v2.auth.functions import get_user_by_email, get_user_by_id, create_access_token, get_user_by_username, invalidate_principal
+from v2.auth.hashing import HasherBusy, password_hasher
 from v2.auth.validation import LoginRequest, SignupRequest
 from v2.models import storage
 from v2.utils.middleware import auth_middleware
@@ -20,11 +20,24 @@ auth_router = Blueprint('auth', __name__, url_prefix='/api/auth')
 secret_key = environ.get('SECRET_KEY')
 algorithm = environ.get('ALGORITHM')
 
-bcrypt_context = CryptContext(
-    schemes=['bcrypt'],
-    deprecated='auto',
-    bcrypt__default_rounds=12 
-)
+
+def busy_response(error: HasherBusy):
+    """ 503 telling the client to retry once the hashing pool drains """
+    response = jsonify({ 'message': str(error) })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def rehash_password(user_id: str, new_hash: str) -> None:
+    """ Store a password hash made with the current cost """
+    try:
+        user = get_user_by_id(user_id)
+        user.password = new_hash
+        user.save()
+        invalidate_principal(user_id)
+    except Exception:
+        # The old hash still works, the upgrade is retried on the next login
+        storage.rollback()
 
 
 @auth_router.route('/login', methods=['POST'], strict_slashes=False)
@@ -43,8 +56,17 @@ def login():
         return jsonify({ 'message': "User not found!" }), 404
 
 
-    if not bcrypt_context.verify(login_data.password, user_from_db['password']):
+    try:
+        verified, new_hash = password_hasher.verify_and_update(login_data.password, user_from_db['password'])
+    except HasherBusy as e:
+        return busy_response(e)
+
+    if not verified:
         return jsonify({ 'message': "Invalid password!" }), 401
+
+    if new_hash:
+        # The stored hash uses an outdated cost, upgrade it while we know the password
+        rehash_password(user_from_db['id'], new_hash)
     
     token = create_access_token(user_from_db['email'], user_from_db['id'], timedelta(minutes=20))
 
@@ -64,7 +86,8 @@ def login():
                 'username': user_from_db['username'],
                 'profile_picture_url': user_from_db['profile_picture_url'],
                 'bio': user_from_db['bio'],
-                'location': user_from_db['location']
+                'location': user_from_db['location'],
+                'timezone': user_from_db['timezone']
             }
         }
     }), 200
@@ -86,7 +109,7 @@ def signup():
         return jsonify({ 'message': "User with this email already exists!" }), 400
 
     try:
-        hashed_password = bcrypt_context.hash(signup_data.password)
+        hashed_password = password_hasher.hash(signup_data.password)
         # Create and save the user first
         new_user = User(
             email=signup_data.email,
@@ -101,6 +124,7 @@ def signup():
             username=signup_data.username,
             weekly_work_hours_goal=signup_data.weekly_work_hours_goal,
             number_of_work_days=signup_data.number_of_work_days,
+            timezone=signup_data.timezone,
             total_productive_time=0,
             total_wasted_time=0,
             profile_picture_url="",
@@ -112,6 +136,8 @@ def signup():
         # Generate a token for the new user
         token = create_access_token(new_user.email, new_user.id, timedelta(minutes=20))
         
+    except HasherBusy as e:
+        return busy_response(e)
     except IntegrityError as e:
         storage.rollback()
         return jsonify({ 'message': "Username already exists!" }), 400
@@ -135,7 +161,8 @@ def signup():
                 'username': new_profile.username,
                 'profile_picture_url': new_profile.profile_picture_url,
                 'bio': new_profile.bio,
-                'location': new_profile.location
+                'location': new_profile.location,
+                'timezone': new_profile.timezone
             }
         }
     }), 200
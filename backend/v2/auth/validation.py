@@ -1,5 +1,6 @@
 from typing_extensions import Annotated
 from pydantic import BaseModel, EmailStr, Field, field_validator
+from v2.utils.timezones import DEFAULT_TIMEZONE, validate_timezone
 
 class LoginRequest(BaseModel):
     email: EmailStr
@@ -20,6 +21,12 @@ class SignupRequest(BaseModel):
     username: str
     weekly_work_hours_goal: Annotated[int, Field(gt=0)]  # positive integer
     number_of_work_days: Annotated[int, Field(ge=1, le=7)]  # integer between 1 and 7
+    timezone: str = Field(DEFAULT_TIMEZONE, max_length=64)  # IANA zone, e.g. Europe/Berlin
+
+    @field_validator('timezone')
+    def timezone_must_exist(cls, v):
+        """Validate the IANA time zone name"""
+        return validate_timezone(v)
 
     @field_validator('username')
     def username_must_be_valid(cls, v):
@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+""" Maintenance commands for the TimeCraft v2 database
+
+Usage:
+    python -m v2.cli backfill-rollups [--user-id USER_ID]
+    python -m v2.cli export-parquet DIRECTORY [--full] [--batch-size N]
+    python -m v2.cli import FILE --user-id USER_ID [--chunk-size N]
+    python -m v2.cli migrate-v1 [--source URL] [--batch-size N]
+                                [--checkpoint FILE] [--dry-run] [--timezone TZ]
+"""
+
+import argparse
+import os
+import sys
+
+
+def backfill_rollups(args):
+    """ Rebuilds report_daily_rollup from the report table """
+    from v2.report.rollup import rebuild_daily_rollups
+
+    rows = rebuild_daily_rollups(args.user_id)
+    scope = f'user {args.user_id}' if args.user_id else 'all users'
+    print(f'Rebuilt {rows} daily rollup rows for {scope}')
+
+
+def export_parquet(args):
+    """ Writes reports changed since the last export as Parquet files """
+    from v2.report.parquet import export_parquet_dataset
+
+    result = export_parquet_dataset(args.directory, full=args.full,
+                                    batch_size=args.batch_size)
+    watermark = result['watermark']
+    print(f"Wrote {result['rows']} reports to {result['files']} files in "
+          f"{args.directory}, watermark "
+          f"{watermark.isoformat() if watermark else 'none'}")
+
+
+def import_csv(args):
+    """ Imports reports from a CSV file, printing progress per chunk """
+    from v2.report.importer import IMPORT_CHUNK_SIZE, import_reports
+
+    def progress(result):
+        print(f'{result.imported} imported, {result.rejected} rejected, '
+              f'{result.imported / result.elapsed:.0f} rows/s',
+              file=sys.stderr)
+
+    with open(args.file, newline='', encoding='utf-8-sig') as file:
+        result = import_reports(args.user_id, file,
+                                chunk_size=args.chunk_size or IMPORT_CHUNK_SIZE,
+                                progress=progress)
+
+    for reject in result.rejects:
+        print(f"line {reject['line']}: {reject['message']}", file=sys.stderr)
+    summary = result.to_dict()
+    print(f"Imported {summary['imported']} reports in {summary['seconds']}s "
+          f"({summary['rows_per_second']} rows/s), rejected {summary['rejected']}, "
+          f"created {summary['activities_created']} activities")
+    return 1 if result.rejected else 0
+
+
+def migrate_v1(args):
+    """ Copies a v1 database into v2, printing throughput per batch """
+    from v2.engine.migrate_v1 import V1Migration
+
+    source = args.source or os.environ.get('V1_DATABASE_URL')
+    if not source:
+        print('Pass --source or set V1_DATABASE_URL', file=sys.stderr)
+        return 2
+
+    def progress(stats):
+        counters = stats.tables[stats.table]
+        print(f"{stats.table}: {counters['read']} read, "
+              f"{counters['written']} written, {counters['skipped']} skipped, "
+              f"{counters['rejected']} rejected, "
+              f"{stats.rows_per_second:.0f} rows/s", file=sys.stderr)
+
+    migration = V1Migration(source, batch_size=args.batch_size,
+                            checkpoint_path=args.checkpoint,
+                            dry_run=args.dry_run, timezone=args.timezone,
+                            progress=progress)
+    stats = migration.run().to_dict()
+
+    for reject in stats['rejects']:
+        print(f"{reject['table']} {reject['id']}: {reject['message']}",
+              file=sys.stderr)
+    rejected = sum(counters['rejected'] for counters in stats['tables'].values())
+    written = ', '.join(f"{counters['written']} {table}"
+                        for table, counters in stats['tables'].items())
+    print(f"{'Would write' if args.dry_run else 'Wrote'} {written} in "
+          f"{stats['seconds']}s ({stats['rows_per_second']} rows/s), "
+          f"rejected {rejected}")
+    return 1 if rejected else 0
+
+
+def main(argv=None):
+    """ Parses the command line and runs the requested command """
+    parser = argparse.ArgumentParser(prog='python -m v2.cli',
+                                     description='TimeCraft v2 maintenance')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backfill = commands.add_parser(
+        'backfill-rollups',
+        help='Recompute the daily report rollup from existing reports')
+    backfill.add_argument('--user-id',
+                          help='Only rebuild the rollup of this user')
+    backfill.set_defaults(func=backfill_rollups)
+
+    parquet = commands.add_parser(
+        'export-parquet',
+        help='Export reports updated since the last run as Parquet files '
+             'partitioned by user and month')
+    parquet.add_argument('directory', help='Dataset directory')
+    parquet.add_argument('--full', action='store_true',
+                         help='Export every report, ignoring the watermark')
+    parquet.add_argument('--batch-size', type=int, default=1000,
+                         help='Rows per Arrow record batch')
+    parquet.set_defaults(func=export_parquet)
+
+    importer = commands.add_parser(
+        'import', help='Import reports from a CSV file')
+    importer.add_argument('file', help='CSV with activity, date, '
+                          'time_on_task and optionally time_wasted, comment')
+    importer.add_argument('--user-id', required=True,
+                          help='User the reports belong to')
+    importer.add_argument('--chunk-size', type=int,
+                          help='Rows inserted and committed at once '
+                               '(default IMPORT_CHUNK_SIZE or 20000)')
+    importer.set_defaults(func=import_csv)
+
+    migrate = commands.add_parser(
+        'migrate-v1',
+        help='Copy the users, tasks and daily logs of a v1 database')
+    migrate.add_argument('--source',
+                         help='SQLAlchemy URL of the v1 database '
+                              '(default V1_DATABASE_URL)')
+    migrate.add_argument('--batch-size', type=int, default=1000,
+                         help='Rows read, written and committed at once')
+    migrate.add_argument('--checkpoint',
+                         help='JSON file with the progress, an interrupted '
+                              'migration resumes from it')
+    migrate.add_argument('--dry-run', action='store_true',
+                         help='Read and check everything without writing')
+    migrate.add_argument('--timezone', default='UTC',
+                         help='Time zone of the migrated users, logs are '
+                              'placed at the start of their day in it')
+    migrate.set_defaults(func=migrate_v1)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+
+''' Copies the data of a v1 database into the v2 tables
+
+v1 users become a v2 User with a Profile, tasks become Activities and
+daily logs become Reports. IDs and unique_ids are kept, so links between
+the copied rows stay the same.
+
+Each v1 table is read in batches ordered by primary key (keyset
+pagination, WHERE id > last id), so memory use does not depend on the
+size of the tables. Every batch is written and committed on its own, and
+the last copied key of each table is saved in a JSON checkpoint file
+afterwards. An interrupted run continues from the checkpoint. Rows that
+were committed but not yet checkpointed are recognized by their ID and
+skipped.
+'''
+
+import calendar
+import json
+import os
+import time
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import (Column, DateTime, Float, Integer, MetaData, String,
+                        Table, create_engine, insert, select)
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Profile import Profile
+from v2.models.Report import Report
+from v2.models.User import User
+from v2.report.functions import insert_reports
+from v2.report.rollup import apply_rollup_deltas, collect_rollup_deltas
+from v2.utils.timezones import DEFAULT_TIMEZONE, day_start, validate_timezone
+
+# The v1 tables, as far as the migration reads them
+v1_metadata = MetaData()
+
+v1_users = Table(
+    'users', v1_metadata,
+    Column('id', String(60), primary_key=True),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+    Column('unique_id', String(8), unique=True),
+    Column('username', String(128), nullable=False, unique=True),
+    Column('email', String(128), nullable=True, unique=True),
+    Column('password', String(255), nullable=True),
+    Column('weekly_work_hours_goal', Float, nullable=False),
+    Column('number_of_work_days', Integer, nullable=False),
+    Column('total_productive_time', Float, nullable=False),
+    Column('total_wasted_time', Float, nullable=False),
+)
+
+v1_tasks = Table(
+    'tasks', v1_metadata,
+    Column('id', String(60), primary_key=True),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+    Column('unique_id', String(8), unique=True),
+    Column('task_name', String(128), nullable=False, unique=True),
+    Column('total_time_on_task', Float),
+    Column('daily_goal', Float, nullable=False),
+    Column('weekly_goal', Float, nullable=False),
+    # References users.unique_id, not users.id
+    Column('user_id', String(60), nullable=False),
+)
+
+v1_daily_log = Table(
+    'daily_log', v1_metadata,
+    Column('id', String(60), primary_key=True),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+    Column('unique_id', String(8), unique=True),
+    Column('month', String(60), nullable=False),
+    Column('day', Integer, nullable=False),
+    Column('year', Integer, nullable=False),
+    # References tasks.unique_id, not tasks.id
+    Column('task_id', String(128), nullable=False),
+    Column('time_on_task', Float, nullable=False),
+    Column('time_wasted', Float, nullable=False),
+    Column('day_of_week', String(55), nullable=False),
+    Column('date', String(60), nullable=True),
+)
+
+# Full and abbreviated month names, as written by strftime('%B') and '%b'
+MONTHS = {
+    name.lower(): number
+    for names in (calendar.month_name, calendar.month_abbr)
+    for number, name in enumerate(names) if name
+}
+
+# Rejected rows kept in the stats, the rest are only counted
+MAX_REPORTED_REJECTS = 1000
+
+
+def parse_v1_date(value: Optional[str], month: str, day: int, year: int) -> date:
+    ''' The day of a v1 daily log
+
+    value is the log's date string, like "March.5.2024". Logs without one
+    fall back to their month, day and year columns.
+
+    Raises:
+        ValueError: If neither gives a valid date
+    '''
+    if value:
+        parts = value.strip().split('.')
+        if len(parts) == 3:
+            month, day, year = parts
+    number = MONTHS.get(str(month).strip().lower())
+    if number is None:
+        raise ValueError(f'Unknown month: {month}')
+    try:
+        return date(int(year), number, int(day))
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid date: {value or (month, day, year)}')
+
+
+class MigrationStats:
+    ''' Rows read, written, skipped and rejected per v1 table '''
+
+    def __init__(self):
+        ''' Instantiation '''
+        self.tables = {
+            name: {'read': 0, 'written': 0, 'skipped': 0, 'rejected': 0}
+            for name in ('users', 'tasks', 'daily_log')
+        }
+        self.rejects: List[Dict] = []
+        # The table of the last batch
+        self.table = None
+        self.started = time.perf_counter()
+
+    def count(self, table: str, counter: str, amount: int = 1):
+        ''' Adds amount to one of a table's counters '''
+        self.tables[table][counter] += amount
+
+    def reject(self, table: str, row_id: str, message: str):
+        ''' Records a row that cannot be migrated '''
+        self.count(table, 'rejected')
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({'table': table, 'id': row_id, 'message': message})
+
+    @property
+    def elapsed(self) -> float:
+        ''' Seconds since the migration started '''
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        ''' Rows read per second, over every table '''
+        read = sum(counters['read'] for counters in self.tables.values())
+        return read / self.elapsed if self.elapsed else 0
+
+    def to_dict(self) -> Dict:
+        ''' Counters, throughput and the first rejected rows '''
+        return {
+            'tables': self.tables,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second),
+            'rejects': self.rejects,
+        }
+
+
+class V1Migration:
+    ''' Copies a v1 database into the v2 database of storage
+
+    source_url is the SQLAlchemy URL of the v1 database. Migrated users
+    get timezone, and their logs are placed at the start of the logged
+    day in it. With dry_run everything is read and checked, but nothing
+    is written, not even the checkpoint. progress is called with the
+    stats after every batch.
+    '''
+
+    def __init__(self, source_url: str, batch_size: int = 1000,
+                 checkpoint_path: Optional[str] = None, dry_run: bool = False,
+                 timezone: str = DEFAULT_TIMEZONE,
+                 progress: Optional[Callable[[MigrationStats], None]] = None):
+        ''' Instantiation '''
+        self.source = create_engine(source_url)
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.dry_run = dry_run
+        self.timezone = validate_timezone(timezone)
+        self.progress = progress
+        self.stats = MigrationStats()
+        self.checkpoint = self.load_checkpoint()
+        # Users and tasks rejected by this run, their tasks and logs have
+        # nowhere to go
+        self.rejected_users: set = set()
+        self.rejected_tasks: set = set()
+
+    def load_checkpoint(self) -> Dict:
+        ''' Last migrated key per table, empty for a new migration '''
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as file:
+                return json.load(file)
+        return {}
+
+    def save_checkpoint(self):
+        ''' Atomically writes the checkpoint file '''
+        if self.dry_run or not self.checkpoint_path:
+            return
+        temporary = self.checkpoint_path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.checkpoint, file)
+        os.replace(temporary, self.checkpoint_path)
+
+    def batches(self, name: str, statement, key) -> Iterator[list]:
+        ''' Rows of statement after the checkpoint of name, in key order '''
+        last = self.checkpoint.get(name)
+        while True:
+            batch = statement.order_by(key).limit(self.batch_size)
+            if last is not None:
+                batch = batch.where(key > last)
+            with self.source.connect() as connection:
+                rows = connection.execute(batch).all()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1].id
+
+    def existing_ids(self, table, ids: List[str]) -> set:
+        ''' The ids already present in a v2 table '''
+        return set(storage.session.scalars(
+            select(table.c.id).where(table.c.id.in_(ids))))
+
+    def migrated_ids(self, table, ids: List[str], rejected: set) -> set:
+        ''' The ids that are in a v2 table, or would be in a dry run
+
+        A dry run writes nothing, so there the ids not rejected so far
+        count as migrated.
+        '''
+        ids = set(ids)
+        if self.dry_run:
+            return ids - rejected
+        return self.existing_ids(table, list(ids))
+
+    def write(self, name: str, rows: list, write: Callable[[list], int]):
+        ''' Writes one batch, then commits and checkpoints it
+
+        write returns the number of rows it wrote, or would write in a
+        dry run.
+        '''
+        self.stats.table = name
+        self.stats.count(name, 'read', len(rows))
+        try:
+            written = write(rows)
+            if self.dry_run:
+                storage.rollback()
+            else:
+                storage.save()
+        except Exception:
+            storage.rollback()
+            raise
+        if not self.dry_run:
+            self.checkpoint[name] = rows[-1].id
+            self.save_checkpoint()
+        self.stats.count(name, 'written', written)
+        if self.progress:
+            self.progress(self.stats)
+
+    def migrate_users(self, rows: list) -> int:
+        ''' Inserts a batch of v1 users as v2 users with profiles '''
+        existing = self.existing_ids(User.__table__, [row.id for row in rows])
+        self.stats.count('users', 'skipped', len(existing))
+        rows = [row for row in rows if row.id not in existing]
+        usernames = set(storage.session.scalars(
+            select(Profile.username).where(
+                Profile.username.in_([row.username for row in rows]))))
+        emails = set(storage.session.scalars(
+            select(User.email).where(
+                User.email.in_([row.email for row in rows if row.email]))))
+        accepted = []
+        for row in rows:
+            if row.username in usernames:
+                message = f'Username {row.username} is taken'
+            elif row.email and row.email in emails:
+                message = f'Email {row.email} is taken'
+            else:
+                accepted.append(row)
+                continue
+            self.stats.reject('users', row.id, message)
+            self.rejected_users.add(row.id)
+        rows = accepted
+        if not rows or self.dry_run:
+            return len(rows)
+
+        storage.session.execute(insert(User.__table__), [
+            {
+                'id': row.id,
+                'unique_id': row.unique_id,
+                'created_at': row.created_at,
+                'updated_at': row.updated_at,
+                'email': row.email,
+                'password': row.password,
+            }
+            for row in rows
+        ])
+        storage.session.execute(insert(Profile.__table__), [
+            Profile.new_row(
+                user_id=row.id,
+                full_name=row.username,
+                username=row.username,
+                profile_picture_url='',
+                bio='',
+                location='',
+                weekly_work_hours_goal=row.weekly_work_hours_goal,
+                number_of_work_days=row.number_of_work_days,
+                total_productive_time=row.total_productive_time,
+                total_wasted_time=row.total_wasted_time,
+                timezone=self.timezone,
+                data_version=0
+            )
+            for row in rows
+        ])
+        return len(rows)
+
+    def migrate_tasks(self, rows: list) -> int:
+        ''' Inserts a batch of v1 tasks as activities '''
+        existing = self.existing_ids(Activity.__table__, [row.id for row in rows])
+        self.stats.count('tasks', 'skipped', len(existing))
+        owners = self.migrated_ids(
+            User.__table__,
+            [row.owner_id for row in rows if row.owner_id is not None],
+            self.rejected_users)
+        activities = []
+        for row in rows:
+            if row.id in existing:
+                continue
+            if row.owner_id is None:
+                message = f'Unknown user {row.user_id}'
+            elif row.owner_id not in owners:
+                message = f'User {row.user_id} was not migrated'
+            else:
+                message = None
+            if message:
+                self.stats.reject('tasks', row.id, message)
+                self.rejected_tasks.add(row.id)
+                continue
+            activities.append({
+                'id': row.id,
+                'unique_id': row.unique_id,
+                'created_at': row.created_at,
+                'updated_at': row.updated_at,
+                'name': row.task_name,
+                'total_time_on_task': row.total_time_on_task or 0,
+                'daily_goal': row.daily_goal,
+                'weekly_goal': row.weekly_goal,
+                'user_id': row.owner_id,
+            })
+        if activities and not self.dry_run:
+            storage.session.execute(insert(Activity.__table__), activities)
+        return len(activities)
+
+    def migrate_logs(self, rows: list) -> int:
+        ''' Inserts a batch of v1 daily logs as reports with their rollup '''
+        existing = self.existing_ids(Report.__table__, [row.id for row in rows])
+        self.stats.count('daily_log', 'skipped', len(existing))
+        # An activity is only written together with its owner's profile
+        activities = self.migrated_ids(
+            Activity.__table__,
+            [row.activity_id for row in rows if row.activity_id is not None],
+            self.rejected_tasks)
+
+        reports = []
+        for row in rows:
+            if row.id in existing:
+                continue
+            if row.activity_id is None or row.owner_id is None:
+                self.stats.reject('daily_log', row.id, f'Unknown task {row.task_id}')
+                continue
+            if row.activity_id not in activities:
+                self.stats.reject('daily_log', row.id,
+                                  f'Task {row.task_id} was not migrated')
+                continue
+            try:
+                day = parse_v1_date(row.date, row.month, row.day, row.year)
+            except ValueError as e:
+                self.stats.reject('daily_log', row.id, str(e))
+                continue
+            reports.append({
+                'id': row.id,
+                'unique_id': row.unique_id,
+                'created_at': row.created_at,
+                'updated_at': row.updated_at,
+                'activity_id': row.activity_id,
+                'date': day_start(day, self.timezone),
+                'time_on_task': row.time_on_task,
+                'time_wasted': row.time_wasted,
+                'comment': None,
+                'user_id': row.owner_id,
+            })
+        if reports and not self.dry_run:
+            insert_reports([
+                {key: value for key, value in report.items() if key != 'user_id'}
+                for report in reports
+            ])
+            apply_rollup_deltas(collect_rollup_deltas(reports, self.timezone))
+        return len(reports)
+
+    def run(self) -> MigrationStats:
+        ''' Migrates users, then tasks, then daily logs '''
+        for rows in self.batches('users', select(v1_users), v1_users.c.id):
+            self.write('users', rows, self.migrate_users)
+
+        owners = v1_users.alias('owner')
+        tasks = select(
+            v1_tasks, owners.c.id.label('owner_id')
+        ).select_from(
+            v1_tasks.outerjoin(owners, owners.c.unique_id == v1_tasks.c.user_id)
+        )
+        for rows in self.batches('tasks', tasks, v1_tasks.c.id):
+            self.write('tasks', rows, self.migrate_tasks)
+
+        logs = select(
+            v1_daily_log,
+            v1_tasks.c.id.label('activity_id'),
+            owners.c.id.label('owner_id')
+        ).select_from(
+            v1_daily_log
+            .outerjoin(v1_tasks, v1_tasks.c.unique_id == v1_daily_log.c.task_id)
+            .outerjoin(owners, owners.c.unique_id == v1_tasks.c.user_id)
+        )
+        for rows in self.batches('daily_log', logs, v1_daily_log.c.id):
+            self.write('daily_log', rows, self.migrate_logs)
+
+        return self.stats
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+''' Connection pool configuration and metrics for the storage engine '''
+
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    ''' Thread safe counters describing how the connection pool is used '''
+
+    def __init__(self):
+        ''' Instantiation '''
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        ''' Sets every counter back to zero '''
+        with self.__lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.waits = 0
+            self.wait_time = 0.0
+            self.max_wait_time = 0.0
+            self.timeouts = 0
+
+    def on_connect(self, *args):
+        ''' A new DBAPI connection was opened '''
+        with self.__lock:
+            self.connects += 1
+
+    def on_checkout(self, *args):
+        ''' A connection was handed out by the pool '''
+        with self.__lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def on_checkin(self, *args):
+        ''' A connection was returned to the pool '''
+        with self.__lock:
+            self.checkins += 1
+            self.in_use = max(self.in_use - 1, 0)
+
+    def on_invalidate(self, *args):
+        ''' A connection was found to be broken and discarded '''
+        with self.__lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds, timed_out=False):
+        ''' Records how long a caller waited for a connection '''
+        with self.__lock:
+            self.waits += 1
+            self.wait_time += seconds
+            self.max_wait_time = max(self.max_wait_time, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        ''' Returns the counters as a dictionary '''
+        with self.__lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+                'timeouts': self.timeouts,
+            }
+
+
+# One engine per process, so the pool metrics are process wide as well
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    ''' QueuePool that records how long checkouts wait for a connection '''
+
+    def _do_get(self):
+        ''' Times the wait for a pooled connection '''
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - started, True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def _env_flag(name, default):
+    ''' Reads a boolean environment variable '''
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def pool_options(database_url):
+    ''' Builds the create_engine() pool arguments from the environment
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (seconds),
+    DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING configure the pool.
+    SQLite keeps SQLAlchemy's default pool since it has no server side
+    connection limits to tune.
+    '''
+    options = {
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', True),
+    }
+    if make_url(database_url).get_backend_name() == 'sqlite':
+        return options
+
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    })
+    return options
+
+
+def instrument_pool(engine):
+    ''' Feeds the engine's pool events into pool_metrics '''
+    event.listen(engine, 'connect', pool_metrics.on_connect)
+    event.listen(engine, 'checkout', pool_metrics.on_checkout)
+    event.listen(engine, 'checkin', pool_metrics.on_checkin)
+    event.listen(engine, 'invalidate', pool_metrics.on_invalidate)
+
+
+def pool_status(engine):
+    ''' Returns the pool's configuration, current state and metrics '''
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    status.update(pool_metrics.snapshot())
+    return status
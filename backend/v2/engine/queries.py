@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+''' Per-request statement counts, database time and rows for the engine
+
+The engine's cursor events add every statement to the QueryStats of the
+current request (or task), which the caller starts with track_queries().
+Statements outside of one are not recorded. The time measured here is
+also handed to the engine's on_statement hook, the slow query log, so
+no statement is timed twice.
+'''
+
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import event
+
+
+class QueryStats:
+    ''' SQL statements issued, seconds spent in them and rows they returned
+
+    rows comes from the DBAPI rowcount. Drivers that do not report it for
+    SELECTs (SQLite) only count the rows changed by INSERT, UPDATE and
+    DELETE.
+    '''
+
+    def __init__(self, route: Optional[str] = None):
+        ''' Instantiation, route names the request, like "GET /api/report" '''
+        self.route = route
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+    def record(self, seconds: float, rows: int):
+        ''' Adds one statement '''
+        self.statements += 1
+        self.db_time += seconds
+        if rows > 0:
+            self.rows += rows
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar(
+    'query_stats', default=None)
+
+
+def track_queries(route: Optional[str] = None) -> QueryStats:
+    ''' Starts recording the statements of the current context '''
+    stats = QueryStats(route)
+    _current.set(stats)
+    return stats
+
+
+def current_queries() -> Optional[QueryStats]:
+    ''' The QueryStats being recorded, None outside of track_queries() '''
+    return _current.get()
+
+
+def stop_tracking():
+    ''' Stops recording the statements of the current context '''
+    _current.set(None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    ''' Remembers when the statement started '''
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(on_statement: Optional[Callable]):
+    ''' The listener adding statements to the current QueryStats '''
+    def after_cursor_execute(conn, cursor, statement, parameters, context,
+                             executemany):
+        started = conn.info.get('query_started')
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.record(seconds, cursor.rowcount or 0)
+        if on_statement is not None:
+            on_statement(conn, statement, parameters, context, executemany,
+                         seconds)
+    return after_cursor_execute
+
+
+def _handle_error(exception_context):
+    ''' Drops the start time of a statement that failed '''
+    started = exception_context.connection.info.get('query_started') \
+        if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_queries(engine, on_statement: Optional[Callable] = None):
+    ''' Feeds the engine's statements into the current QueryStats
+
+    on_statement, when given, is called after every statement as
+    on_statement(conn, statement, parameters, context, executemany,
+    seconds).
+    '''
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute',
+                 _after_cursor_execute(on_statement))
+    event.listen(engine, 'handle_error', _handle_error)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+''' Slow query log of the storage engine
+
+Statements taking longer than SLOW_QUERY_MS milliseconds are written as
+JSON lines to SLOW_QUERY_LOG, a file rotated at SLOW_QUERY_LOG_BYTES with
+SLOW_QUERY_LOG_BACKUPS old copies kept. The log is off until
+SLOW_QUERY_LOG names a file. Each line holds:
+
+    time, duration_ms, route, statement, parameters, executemany,
+    dialect, plan, full_scan
+
+String parameters are replaced by their length, so no user data reaches
+the log. plan is the EXPLAIN output of the statement (EXPLAIN QUERY PLAN
+on SQLite) and full_scan tells if it reads a whole table (a SQLite SCAN,
+a PostgreSQL Seq Scan or a MySQL type ALL). Plans are captured for
+SELECTs only, on the statement's own connection, and kept for
+SLOW_QUERY_EXPLAIN_TTL seconds per statement, so a statement that is
+slow over and over is only explained once in a while. Outside of SQLite
+the EXPLAIN runs in a SAVEPOINT, a failed one would otherwise abort the
+request's transaction on PostgreSQL.
+
+Statements are timed by v2.engine.queries, which calls the hook of
+slow_query_hook() with the duration.
+
+SLOW_QUERY_MS=0 turns the log off as well.
+'''
+
+import json
+import logging
+import os
+from datetime import date, datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, List, Optional
+from v2.engine.queries import current_queries
+from v2.utils.cache import TTLCache
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', '')
+SLOW_QUERY_LOG_BYTES = int(os.getenv('SLOW_QUERY_LOG_BYTES', 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5))
+SLOW_QUERY_EXPLAIN_TTL = float(os.getenv('SLOW_QUERY_EXPLAIN_TTL', 300))
+
+logger = logging.getLogger('timecraft.slow_queries')
+logger.propagate = False
+
+# Plans of recently explained statements
+explained = TTLCache(maxsize=256, ttl=SLOW_QUERY_EXPLAIN_TTL)
+
+# What EXPLAIN prints for a read of a whole table, per dialect
+FULL_SCAN_MARKERS = {
+    'sqlite': ('SCAN ',),
+    'postgresql': ('Seq Scan',),
+    'mysql': ("'type': 'ALL'", '| ALL |'),
+}
+
+
+def configure_log(path: Optional[str] = SLOW_QUERY_LOG):
+    ''' Writes the slow query log to a rotating file at path
+
+    Without a path the log is off.
+    '''
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    if path:
+        handler = RotatingFileHandler(path, maxBytes=SLOW_QUERY_LOG_BYTES,
+                                      backupCount=SLOW_QUERY_LOG_BACKUPS,
+                                      delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def redact(value: Any) -> Any:
+    ''' A parameter value safe to log '''
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__} len={len(value)}>'
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return f'<{type(value).__name__}>'
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    ''' The query plan of statement, one line per plan row
+
+    The statements go to the DBAPI cursor directly, through conn they
+    would reenter the execution this is called from.
+    '''
+    cursor = conn.connection.cursor()
+    try:
+        if conn.dialect.name == 'sqlite':
+            # An error doesn't abort a SQLite transaction, and pysqlite
+            # only BEGINs before writes, so a SAVEPOINT could start one
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            rows = cursor.fetchall()
+        else:
+            cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                cursor.execute('EXPLAIN ' + statement, parameters)
+                rows = cursor.fetchall()
+            finally:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+    if conn.dialect.name == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] if len(row) == 1 else str(row) for row in rows]
+
+
+def _plan(conn, context, statement: str, parameters, executemany: bool):
+    ''' The cached or freshly captured plan and whether it scans a table '''
+    if executemany or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None, None
+    if context is not None and context.execution_options.get('stream_results'):
+        # The connection is still streaming this statement's rows
+        return None, None
+
+    plan = explained.get(statement)
+    if plan is None:
+        try:
+            plan = explain(conn, statement, parameters)
+        except Exception as e:
+            plan = [f'EXPLAIN failed: {e}']
+        explained.set(statement, plan)
+
+    markers = FULL_SCAN_MARKERS.get(conn.dialect.name, ())
+    return plan, any(marker in line for line in plan for marker in markers)
+
+
+def log_slow_statement(conn, statement, parameters, context, executemany,
+                       seconds: float):
+    ''' Logs the statement when it took longer than SLOW_QUERY_MS '''
+    duration = seconds * 1000
+    if SLOW_QUERY_MS <= 0 or duration < SLOW_QUERY_MS or not logger.handlers:
+        return
+
+    plan, full_scan = _plan(conn, context, statement, parameters, executemany)
+    queries = current_queries()
+    record = {
+        'time': datetime.now(timezone.utc).isoformat(),
+        'duration_ms': round(duration, 3),
+        'route': queries.route if queries is not None else None,
+        'statement': statement,
+        'parameters': redact(parameters[:1] if executemany else parameters),
+        'executemany': len(parameters) if executemany else None,
+        'dialect': conn.dialect.name,
+        'plan': plan,
+        'full_scan': full_scan,
+    }
+    logger.warning(json.dumps(record, default=str))
+
+
+def slow_query_hook() -> Optional[Callable]:
+    ''' The on_statement hook of instrument_queries() logging slow ones
+
+    None when SLOW_QUERY_MS turns the log off.
+    '''
+    if SLOW_QUERY_MS <= 0:
+        return None
+    if not logger.handlers:
+        configure_log()
+    return log_slow_statement
@@ -12,6 +12,11 @@ from v2.models.base import Base
 from v2.models.User import User
 from v2.models.Activity import Activity
 from v2.models.Report import Report
+# Registers the table on Base.metadata for create_all() in reload()
+from v2.models.ReportDailyRollup import ReportDailyRollup  # noqa: F401
+from v2.engine.pool import instrument_pool, pool_options, pool_status
+from v2.engine.queries import instrument_queries
+from v2.engine.slow_queries import slow_query_hook
 from contextlib import contextmanager
 from dotenv import load_dotenv
 
@@ -19,23 +24,56 @@ load_dotenv()  # Load environment variables from .env file
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-if DATABASE_URL is None:
-   raise ValueError("No DATABASE_URL found in environment variables")
-
 class Storage:
     ''' This class defines handles the storage of our data '''
 
     __engine = None
-    session = None
+    __sessions = None
     user_id = None
 
-    def __init__(self):
-        ''' Insantization '''
+    def __init__(self, engine=None):
+        ''' Insantization
+
+        engine is the SQLAlchemy engine to store the data with, by default
+        one is created for DATABASE_URL.
+        '''
+        if engine is None:
+            if DATABASE_URL is None:
+                raise ValueError("No DATABASE_URL found in environment variables")
+            # Pool size, overflow, pre-ping and recycle come from the environment
+            engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+        self.__engine = engine
+        instrument_pool(self.__engine)
+        instrument_queries(self.__engine, slow_query_hook())
+
+    @property
+    def engine(self):
+        ''' The SQLAlchemy engine the data is stored with '''
+        return self.__engine
+
+    @property
+    def session(self):
+        ''' The session of the current thread
+
+        Sessions come from a scoped registry, so every worker thread (and
+        therefore every request) gets its own Session. close() discards it
+        at the end of the request.
+        '''
+        return self.__sessions()
+
+    @property
+    def sessions(self):
+        ''' The scoped_session registry handing out the sessions '''
+        return self.__sessions
+
+    @sessions.setter
+    def sessions(self, sessions):
+        ''' Replaces the session registry '''
+        self.__sessions = sessions
 
-        # We are using the dev database
-        # self.__engine = create_engine(DATABASE_URL)
-        #         # We are using the dev database
-        self.__engine = create_engine(DATABASE_URL)
+    def pool_status(self):
+        ''' Returns connection pool state and checkout/wait metrics '''
+        return pool_status(self.__engine)
 
     def all_tasks(self, usr):
         ''' Query the current databse session all tasks belonging to the user
@@ -72,17 +110,12 @@ class Storage:
     def get_user(self, user_id=None):
         """ Get a user(Users) from the list of users """
 
-        # Get all User objects in storage
-        users = self.session.query(User)
-
         if user_id:
-            for user in users:
-                if user.unique_id == user_id:
-                    return user
-            return None
+            return self.session.query(User).filter(
+                User.unique_id == user_id).first()
 
         # If no User Id given, return all User objects(for internal usage)
-        return users
+        return self.session.query(User)
     
     def get_user_by_email(self, email):
         ''' Get user byy email address '''
@@ -91,17 +124,20 @@ class Storage:
     def get_task(self, task_id=None):
         """ Get a task(or all tasks) from the list of tasks """
 
-        # Get all Task objects in storage
-        activities = self.session.query(Activity)
-
-        if activity_id:
-            for activity in activities:
-                if activity.unique_id == activity_id:
-                    return activity
-            return None
+        if task_id:
+            return self.session.query(Activity).filter(
+                Activity.unique_id == task_id).first()
 
         # If noto Task ID is given, return all Task objects(for internal use)
-        return activities
+        return self.session.query(Activity)
+
+    def get_tasks(self, task_ids):
+        """ Get several tasks(activities) by their IDs in a single query """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        return self.session.query(Activity).filter(
+            Activity.unique_id.in_(task_ids)).all()
     
     def get_task_by_user_id(self, user_id):
         ''' Get a task by user Id '''
@@ -114,19 +150,13 @@ class Storage:
     def get_logs_of_the_day(self, log_date=None):
         """ Gets a log(or all logs) from the list of logs """
 
-        # Get all Log objects in storarge
-        logs = self.session.query(Report)
-        logs_of_the_day = []
-
         if log_date:
-            for log in logs:
-                # Get all logs for a given date
-                if log.date == log_date:
-                    logs_of_the_day.append(log)
-            return logs_of_the_day
+            # Get all logs for a given date
+            return self.session.query(Report).filter(
+                Report.date == log_date).all()
 
         # If no log date given, return all DailyLog objects(for internal use)
-        return logs
+        return self.session.query(Report)
 
     def new(self, obj):
         ''' Adds a new object to the session '''
@@ -178,15 +208,13 @@ class Storage:
         session_factory = sessionmaker(bind=self.__engine,
                                        expire_on_commit=False)
 
-        Session = scoped_session(session_factory)
-
-        # Starts the session
-        self.session = Session()
+        # Registry handing out one session per thread
+        self.__sessions = scoped_session(session_factory)
     
     def rollback(self):
         ''' Roll back the current session in case of error '''
         self.session.rollback()
 
     def close(self):
-        ''' Closes the current session '''
-        self.session.close()
+        ''' Closes the current session and removes it from the registry '''
+        self.__sessions.remove()
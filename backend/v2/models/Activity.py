@@ -15,7 +15,7 @@ class Activity(BaseModel, Base):
     total_time_on_task = Column(Float, nullable=False, default=0)
     daily_goal = Column(Float, nullable=False)
     weekly_goal = Column(Float, nullable=False)
-    user_id = Column(String(60), ForeignKey("profile.user_id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String(60), ForeignKey("profile.user_id", ondelete="CASCADE"), nullable=False, index=True)
     user = relationship("Profile", back_populates="activities", foreign_keys=[user_id])
     reports = relationship("Report", back_populates="activity", cascade="all, delete-orphan")
     deleted = Column(DateTime, nullable=True)
\ No newline at end of file
@@ -7,6 +7,7 @@ from v2 import models
 from datetime import datetime
 from sqlalchemy import String, Column, DateTime
 from v2.models.base import Base
+from v2.utils.serializers import model_columns
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.declarative import AbstractConcreteBase
 
@@ -34,10 +35,31 @@ class BaseModel(AbstractConcreteBase):
     def unique_id(cls):
         return Column(String(8), unique=True)
 
-    def __generate_id__(self, length=8):
+    @staticmethod
+    def __generate_id__(length=8):
         """ Creates an 8 digit secure ID """
         chars = string.ascii_lowercase + string.digits
-        return ''.join(secrets.choice(chars) for _ in range(length))
+        # One random draw instead of one per character, bulk inserts
+        # generate an ID per row
+        number = secrets.randbelow(len(chars) ** length)
+        digits = []
+        for _ in range(length):
+            number, digit = divmod(number, len(chars))
+            digits.append(chars[digit])
+        return ''.join(digits)
+
+    @classmethod
+    def new_row(cls, **values):
+        """ Column values for a bulk insert, including the fields
+            __init__ would generate """
+        now = datetime.now()
+        return {
+            'id': str(uuid.uuid4()),
+            'created_at': now,
+            'updated_at': now,
+            'unique_id': cls.__generate_id__(),
+            **values
+        }
     
     def __init__(self, **kwargs):
         """ Instantiates a new model """
@@ -65,14 +87,13 @@ class BaseModel(AbstractConcreteBase):
         models.storage.save()
 
     def to_dict(self):
-        """ Converts the model to a dictionary """
+        """ Converts the model's loaded, non null columns to a dictionary """
+        state = self.__dict__
         dictionary = {}
-        for key, value in self.__dict__.items():
+        for key, is_date in model_columns(type(self)):
+            value = state.get(key)
             if value is not None:
-                if isinstance(value, datetime):
-                    dictionary[key] = value.isoformat()
-                else:
-                    dictionary[key] = value
+                dictionary[key] = value.isoformat() if is_date else value
 
         dictionary['__class__'] = self.__class__.__name__
         return dictionary
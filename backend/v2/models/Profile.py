@@ -21,6 +21,10 @@ class Profile(BaseModel, Base):
     number_of_work_days = Column(Integer, nullable=False)
     total_productive_time = Column(Float, nullable=False, default=0)
     total_wasted_time = Column(Float, nullable=False, default=0)
+    # IANA zone the user's days, weeks and months are counted in
+    timezone = Column(String(64), nullable=False, default='UTC', server_default='UTC')
+    # Bumped by every activity or report write, the read endpoints' ETags use it
+    data_version = Column(Integer, nullable=False, default=0, server_default='0')
     activities = relationship("Activity", back_populates="user", primaryjoin="and_(Profile.user_id==Activity.user_id, Activity.deleted==None)")
     user = relationship("User", back_populates="profile", uselist=False)
     deleted = Column(DateTime, nullable=True)
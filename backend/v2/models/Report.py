@@ -2,7 +2,7 @@
 
 from v2.models.Basemodel import BaseModel
 from v2.models.base import Base
-from sqlalchemy import Column, DateTime, String, Float, Integer, ForeignKey
+from sqlalchemy import Column, DateTime, String, Float, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 import pytz
 from datetime import datetime
@@ -11,6 +11,9 @@ from datetime import datetime
 class Report(BaseModel, Base):
     ''' This class is the represantation for the User object '''
     __tablename__ = "report"
+    __table_args__ = (
+        Index('ix_report_activity_id_date', 'activity_id', 'date'),
+    )
     date = Column(DateTime(timezone=True), nullable=False)
     activity_id = Column(String(128), ForeignKey("activity.id"), nullable=False)
     time_on_task = Column(Float, nullable=False, default=0)
@@ -21,7 +24,9 @@ class Report(BaseModel, Base):
 
     def __init__(self, **kwargs):
         """Initialize a new Report with timezone handling"""
-        # Handle date timezone
+        # Handle date timezone, reports are always stored in UTC
         if 'date' in kwargs and kwargs['date'].tzinfo is None:
             kwargs['date'] = kwargs['date'].replace(tzinfo=pytz.UTC)
+        elif 'date' in kwargs:
+            kwargs['date'] = kwargs['date'].astimezone(pytz.UTC)
         super().__init__(**kwargs)
\ No newline at end of file
@@ -0,0 +1,28 @@
+''' This module contains the class ReportDailyRollup '''
+
+from v2.models.base import Base
+from sqlalchemy import (Column, Date, DateTime, Float, ForeignKey, Integer,
+                        PrimaryKeyConstraint, String)
+from datetime import datetime
+
+
+class ReportDailyRollup(Base):
+    ''' Pre-aggregated Report totals, one row per user, activity and day
+
+    day is a calendar day in the time zone of the user's profile.
+
+    Rows are kept up to date in the same transaction that inserts the
+    reports (see v2.report.rollup), so range reports read at most one row
+    per activity per day instead of every individual report.
+    '''
+    __tablename__ = "report_daily_rollup"
+    __table_args__ = (
+        PrimaryKeyConstraint('user_id', 'day', 'activity_id'),
+    )
+    user_id = Column(String(60), ForeignKey("profile.user_id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    activity_id = Column(String(60), ForeignKey("activity.id", ondelete="CASCADE"), nullable=False)
+    time_on_task = Column(Float, nullable=False, default=0)
+    time_wasted = Column(Float, nullable=False, default=0)
+    report_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
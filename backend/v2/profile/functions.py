@@ -5,10 +5,25 @@ from datetime import datetime
 from jose import jwt
 from os import environ
 from v2.profile.validation import ProfileUpdateRequest
+from v2.auth.functions import invalidate_principal
+from v2.utils.serializers import ModelSerializer
+from v2.report.rollup import rebuild_daily_rollups
+from v2.utils.etag import bump_data_version
 from typing import Optional
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import and_
 
+# The profile returned by the profile endpoints, dates are written as HTTP dates
+profile_serializer = ModelSerializer(
+    Profile,
+    ('id', 'user_id', 'username', 'full_name', 'bio', 'profile_picture_url',
+     'location', 'weekly_work_hours_goal', 'number_of_work_days',
+     'total_productive_time', 'total_wasted_time', 'timezone', 'created_at',
+     'updated_at'),
+    iso_dates=False
+)
+
+
 def get_profile_by_user_id(user_id: str) -> Optional[Profile]:
     """Get a profile by user ID"""
     return storage.session.query(Profile).filter(
@@ -39,6 +54,7 @@ def update_profile(user_id: str, payload: ProfileUpdateRequest) -> Optional[Prof
     try:
         # Update profile fields if they are provided in the payload
         update_data = payload.model_dump(exclude_unset=True, exclude_none=True)
+        moved = update_data.get('timezone', profile.timezone) != profile.timezone
         
         # Update profile fields
         for key, value in update_data.items():
@@ -46,7 +62,16 @@ def update_profile(user_id: str, payload: ProfileUpdateRequest) -> Optional[Prof
                 setattr(profile, key, value)
         
         # Save changes
-        profile.save()
+        if moved:
+            # The rollup is kept in local days, so it is recomputed in the
+            # new zone and committed together with the profile
+            profile.updated_at = datetime.now()
+            bump_data_version(user_id)
+            storage.session.flush()
+            rebuild_daily_rollups(user_id)
+        else:
+            profile.save()
+        invalidate_principal(user_id)
         
         return profile
     
@@ -82,6 +107,7 @@ def delete_profile(user_id) -> Optional[Profile]:
         
         user.save()
         profile.save()
+        invalidate_principal(user_id)
         
         return profile
     except Exception as e:
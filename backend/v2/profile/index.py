@@ -13,7 +13,7 @@ from v2.auth.functions import get_user_by_email, get_user_by_id, create_access_t
 from v2.auth.validation import LoginRequest, SignupRequest
 from v2.models import storage
 from v2.utils.middleware import auth_middleware
-from v2.profile.functions import update_profile, delete_profile
+from v2.profile.functions import update_profile, delete_profile, profile_serializer
 from v2.profile.validation import ProfileUpdateRequest
 
 
@@ -38,21 +38,7 @@ def update_user_profile():
             
         return jsonify({
             'message': 'Profile Updated Successfully!',
-            'data': {
-                'id': updated_profile.id,
-                'user_id': updated_profile.user_id,
-                'username': updated_profile.username,
-                'full_name': updated_profile.full_name,
-                'bio': updated_profile.bio,
-                'profile_picture_url': updated_profile.profile_picture_url,
-                'location': updated_profile.location,
-                'weekly_work_hours_goal': updated_profile.weekly_work_hours_goal,
-                'number_of_work_days': updated_profile.number_of_work_days,
-                'total_productive_time': updated_profile.total_productive_time,
-                'total_wasted_time': updated_profile.total_wasted_time,
-                'created_at': updated_profile.created_at,
-                'updated_at': updated_profile.updated_at
-            }
+            'data': profile_serializer.dump(updated_profile)
         }), 200
         
     except ValueError as e:
@@ -89,21 +75,7 @@ def delete_user_profile():
             
         return jsonify({
             'message': 'Profile deleted successfully',
-            'data': {
-                'id': deleted_profile.id,
-                'user_id': deleted_profile.user_id,
-                'username': deleted_profile.username,
-                'full_name': deleted_profile.full_name,
-                'bio': deleted_profile.bio,
-                'profile_picture_url': deleted_profile.profile_picture_url,
-                'location': deleted_profile.location,
-                'weekly_work_hours_goal': deleted_profile.weekly_work_hours_goal,
-                'number_of_work_days': deleted_profile.number_of_work_days,
-                'total_productive_time': deleted_profile.total_productive_time,
-                'total_wasted_time': deleted_profile.total_wasted_time,
-                'created_at': deleted_profile.created_at,
-                'updated_at': deleted_profile.updated_at
-            }
+            'data': profile_serializer.dump(deleted_profile)
         }), 200
         
     except Exception as e:
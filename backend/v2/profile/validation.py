@@ -2,6 +2,7 @@
 
 from pydantic import BaseModel, Field, EmailStr, field_validator
 from typing import Optional
+from v2.utils.timezones import validate_timezone
 
 
 class ProfileUpdateRequest(BaseModel):
@@ -15,6 +16,7 @@ class ProfileUpdateRequest(BaseModel):
     total_productive_time: Optional[float] = Field(None, ge=0)
     total_wasted_time: Optional[float] = Field(None, ge=0)
     number_of_work_days: Optional[int] = Field(None, ge=1, le=7)
+    timezone: Optional[str] = Field(None, max_length=64)
     
     @field_validator('*')
     @classmethod
@@ -24,6 +26,12 @@ class ProfileUpdateRequest(BaseModel):
             raise ValueError("At least one field must be provided for update")
         return values
 
+    @field_validator('timezone')
+    @classmethod
+    def timezone_must_exist(cls, v):
+        """Validate the IANA time zone name"""
+        return v if v is None else validate_timezone(v)
+
     @field_validator('username')
     def username_must_be_valid(cls, v):
         """Validate username format"""
@@ -44,7 +52,8 @@ class ProfileUpdateRequest(BaseModel):
                 "bio": "Software developer with a passion for time management",
                 "location": "New York, USA",
                 "weekly_work_hours_goal": 40.0,
-                "number_of_work_days": 5
+                "number_of_work_days": 5,
+                "timezone": "America/New_York"
             }
         }
 
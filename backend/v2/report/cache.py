@@ -0,0 +1,241 @@
+"""Cache of GET /report responses keyed by user and date window
+
+Entries hold the totals of one (user, start_date, end_date) window as
+normalized by format_dates. Writes invalidate only the windows of the
+user that contain the written report dates. Changes that can touch every
+window, like renaming or deleting an activity, drop all of the user's
+windows.
+
+The backend is chosen with REPORT_CACHE_BACKEND:
+    memory  In-process LRU with a TTL (the default)
+    redis   Any Redis compatible server at REPORT_CACHE_REDIS_URL. Entries
+            expire after the TTL. Configure the server with an LRU
+            maxmemory-policy for size based eviction.
+    none    Caching disabled
+"""
+
+import bisect
+import json
+import threading
+import time
+from datetime import datetime
+from os import environ
+from typing import Callable, Dict, Iterable, Optional
+from v2.utils.cache import TTLCache
+
+# (start_date, end_date) -> whether the window is affected
+WindowPredicate = Callable[[datetime, datetime], bool]
+
+
+class MemoryBackend:
+    """Keeps entries in this process's memory"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id: str, start: datetime, end: datetime) -> Optional[Dict]:
+        """Get an entry, None when missing or expired"""
+        return self._cache.get((user_id, start, end))
+
+    def set(self, user_id: str, start: datetime, end: datetime, value: Dict) -> None:
+        """Store an entry"""
+        self._cache.set((user_id, start, end), value)
+
+    def delete(self, user_id: str, predicate: WindowPredicate) -> int:
+        """Drop the user's entries whose window matches predicate"""
+        return self._cache.delete_where(
+            lambda key, _: key[0] == user_id and predicate(key[1], key[2])
+        )
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        """Size and evictions"""
+        stats = self._cache.stats()
+        return {
+            'backend': 'memory',
+            'size': stats['size'],
+            'maxsize': stats['maxsize'],
+            'evictions': stats['evictions'],
+        }
+
+
+class RedisBackend:
+    """Keeps entries in a Redis compatible server shared by every worker
+
+    Each user has a set listing their cached windows, so invalidation only
+    looks at that user's keys.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = 'timecraft:report'):
+        self._client = client
+        self._ttl = max(int(ttl), 1)
+        self._prefix = prefix
+
+    def _key(self, user_id: str, window: str) -> str:
+        """Key of one window's entry"""
+        return f'{self._prefix}:{user_id}:{window}'
+
+    def _index(self, user_id: str) -> str:
+        """Key of the set of a user's cached windows"""
+        return f'{self._prefix}:{user_id}'
+
+    @staticmethod
+    def _window(start: datetime, end: datetime) -> str:
+        """Window as stored in the index set"""
+        return f'{start.isoformat()}/{end.isoformat()}'
+
+    def get(self, user_id: str, start: datetime, end: datetime) -> Optional[Dict]:
+        """Get an entry, None when missing or expired"""
+        raw = self._client.get(self._key(user_id, self._window(start, end)))
+        return None if raw is None else json.loads(raw)
+
+    def set(self, user_id: str, start: datetime, end: datetime, value: Dict) -> None:
+        """Store an entry and list it in the user's index"""
+        window = self._window(start, end)
+        pipe = self._client.pipeline()
+        pipe.set(self._key(user_id, window), json.dumps(value), ex=self._ttl)
+        pipe.sadd(self._index(user_id), window)
+        pipe.expire(self._index(user_id), self._ttl)
+        pipe.execute()
+
+    def delete(self, user_id: str, predicate: WindowPredicate) -> int:
+        """Drop the user's entries whose window matches predicate"""
+        stale = []
+        for window in self._client.smembers(self._index(user_id)):
+            if isinstance(window, bytes):
+                window = window.decode()
+            start, end = map(datetime.fromisoformat, window.split('/'))
+            if predicate(start, end):
+                stale.append(window)
+        if stale:
+            pipe = self._client.pipeline()
+            pipe.delete(*(self._key(user_id, window) for window in stale))
+            pipe.srem(self._index(user_id), *stale)
+            pipe.execute()
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        keys = list(self._client.scan_iter(match=f'{self._prefix}:*'))
+        if keys:
+            self._client.delete(*keys)
+
+    def stats(self) -> Dict:
+        """Backend name, the server keeps its own statistics"""
+        return {'backend': 'redis'}
+
+
+class ReportCache:
+    """Report totals per (user, date window) on top of a backend
+
+    Counts hits, misses and invalidations. A result computed while the
+    same user's data changed in this process is not stored, so a slow read
+    racing a write cannot put outdated totals back into the cache.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        # Time of the last write per user, kept as long as entries live
+        self._written_at = TTLCache(maxsize=4096, ttl=max(ttl, 1))
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, user_id: str, start: datetime, end: datetime) -> Optional[Dict]:
+        """Get the report of a window, None on a miss"""
+        if self.backend is None:
+            return None
+        totals = self.backend.get(user_id, start, end)
+        if totals is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return {'start_date': start, 'end_date': end, **totals}
+
+    def set(self, user_id: str, start: datetime, end: datetime,
+            report: Dict, computed_since: float) -> None:
+        """Store the report of a window
+
+        computed_since is the time.monotonic() taken before the report was
+        read from the database.
+        """
+        if self.backend is None:
+            return
+        written_at = self._written_at.get(user_id)
+        if written_at is not None and written_at >= computed_since:
+            return
+        totals = {k: v for k, v in report.items() if k not in ('start_date', 'end_date')}
+        self.backend.set(user_id, start, end, totals)
+
+    def invalidate(self, user_id: str, dates: Optional[Iterable[datetime]] = None) -> None:
+        """Drop the user's windows containing any of dates, or all of them
+
+        Dates must be timezone aware like the windows from format_dates.
+        """
+        self._written_at.set(user_id, time.monotonic())
+        if self.backend is None:
+            return
+        if dates is None:
+            dropped = self.backend.delete(user_id, lambda start, end: True)
+        else:
+            dates = sorted(set(dates))
+            if not dates:
+                return
+            def contains_a_date(start, end):
+                index = bisect.bisect_left(dates, start)
+                return index < len(dates) and dates[index] <= end
+
+            dropped = self.backend.delete(user_id, contains_a_date)
+        self._count('invalidations', dropped)
+
+    def clear(self) -> None:
+        """Drop every window of every user"""
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict:
+        """Hit, miss and invalidation counters with the backend's state"""
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
+        if self.backend is None:
+            stats['backend'] = 'none'
+        else:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def create_report_cache() -> ReportCache:
+    """Build the cache configured by the REPORT_CACHE_* variables"""
+    backend_name = environ.get('REPORT_CACHE_BACKEND', 'memory').lower()
+    ttl = float(environ.get('REPORT_CACHE_TTL', 30))
+
+    if backend_name == 'none':
+        backend = None
+    elif backend_name == 'redis':
+        import redis
+        backend = RedisBackend(
+            redis.Redis.from_url(environ.get('REPORT_CACHE_REDIS_URL', 'redis://localhost:6379/0')),
+            ttl
+        )
+    elif backend_name == 'memory':
+        backend = MemoryBackend(int(environ.get('REPORT_CACHE_SIZE', 1024)), ttl)
+    else:
+        raise ValueError(f'Unknown REPORT_CACHE_BACKEND: {backend_name}')
+
+    return ReportCache(backend, ttl)
+
+
+report_cache = create_report_cache()
@@ -0,0 +1,124 @@
+"""Streaming export of a user's raw reports
+
+Rows are read through a server-side cursor in batches of EXPORT_BATCH_SIZE
+and encoded batch by batch, so memory use does not depend on how many
+reports a user has. PostgreSQL and MySQL stream with a named/unbuffered
+cursor, SQLite steps through its results natively.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from os import environ
+from typing import Iterable, Iterator
+import pytz
+from sqlalchemy import select
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Report import Report
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rows fetched from the database per round trip and written per chunk
+EXPORT_BATCH_SIZE = int(environ.get('EXPORT_BATCH_SIZE', 1000))
+
+EXPORT_COLUMNS = (
+    'unique_id', 'activity_id', 'activity_name', 'date',
+    'time_on_task', 'time_wasted', 'comment',
+)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _isoformat(value: datetime) -> str:
+    """ISO 8601 in UTC, naive values are UTC already"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=pytz.UTC)
+    return value.astimezone(pytz.UTC).isoformat()
+
+
+def export_batches(user_id: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    """Every report of a user, oldest first, as lists of row tuples
+
+    The query runs when this is called, so database errors surface before
+    a response starts streaming. Rows follow EXPORT_COLUMNS, dates are
+    still datetimes.
+    """
+    statement = select(
+        Report.unique_id,
+        Activity.unique_id,
+        Activity.name,
+        Report.date,
+        Report.time_on_task,
+        Report.time_wasted,
+        Report.comment
+    ).join(
+        Activity, Report.activity_id == Activity.id
+    ).where(
+        Activity.user_id == user_id,
+        Activity.deleted.is_(None),
+        Report.deleted.is_(None)
+    ).order_by(
+        Report.date,
+        Report.id
+    ).execution_options(
+        stream_results=True,
+        yield_per=batch_size
+    )
+    result = storage.session.execute(statement)
+    return result.partitions()
+
+
+def _record(row) -> dict:
+    """Export row as a JSON object"""
+    return dict(zip(EXPORT_COLUMNS, (*row[:3], _isoformat(row[3]), *row[4:])))
+
+
+def ndjson_chunks(batches: Iterable[list]) -> Iterator[bytes]:
+    """One JSON object per line, a chunk per batch"""
+    for rows in batches:
+        # Appending to one buffer frees each encoded line right away
+        chunk = bytearray()
+        for row in rows:
+            if orjson is not None:
+                chunk += orjson.dumps(_record(row), option=orjson.OPT_APPEND_NEWLINE)
+            else:
+                chunk += (json.dumps(_record(row)) + '\n').encode()
+        yield bytes(chunk)
+
+
+def csv_chunks(batches: Iterable[list]) -> Iterator[bytes]:
+    """A header line, then one CSV row per report, a chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode()
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (*row[:3], _isoformat(row[3]), *row[4:]) for row in rows
+        )
+        yield buffer.getvalue().encode()
+
+
+def export_reports(user_id: str, export_format: str) -> Iterator[bytes]:
+    """Encoded chunks of a user's reports in export_format
+
+    Raises:
+        ValueError: If the format is not one of EXPORT_FORMATS
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    batches = export_batches(user_id)
+    if export_format == 'csv':
+        return csv_chunks(batches)
+    return ndjson_chunks(batches)
@@ -1,14 +1,29 @@
 """Database query functions for report operations"""
 
-from sqlalchemy import DateTime
+from sqlalchemy import Date, DateTime, Integer, String, cast, func, insert, literal_column, update
+from sqlalchemy.exc import IntegrityError
 from v2.models import storage
 from v2.models.Profile import Profile
 from v2.models.Report import Report
 from v2.models.Activity import Activity
-from datetime import datetime, timedelta
+from v2.models.ReportDailyRollup import ReportDailyRollup
+from v2.report.cache import report_cache
+from v2.report.rollup import apply_rollup_deltas, collect_rollup_deltas
+from v2.utils.serializers import ModelSerializer
+from v2.utils.timezones import DEFAULT_TIMEZONE, day_end, day_start
+from datetime import date, datetime, time, timedelta
+import csv
+import io
 from typing import Dict, List, Optional
 import pytz
 
+# The report returned by POST /report, dates are written as HTTP dates
+report_serializer = ModelSerializer(
+    Report,
+    ('id', 'unique_id', 'activity_id', 'date', 'time_on_task', 'time_wasted', 'comment'),
+    iso_dates=False
+)
+
 
 def get_activity_by_id(activity_id: str, user_id: str) -> Optional[Activity]:
     """Get an activity by ID and verify it belongs to the user"""
@@ -25,6 +40,13 @@ def get_profile_by_id(user_id: str) -> Optional[Profile]:
         Profile.deleted.is_(None)
     ).first()
 
+def get_user_timezone(user_id: str) -> str:
+    """Get the time zone of a user's profile"""
+    timezone = storage.session.query(Profile.timezone).filter(
+        Profile.user_id == user_id
+    ).scalar()
+    return timezone or DEFAULT_TIMEZONE
+
 def get_user_activities(user_id: str) -> List[Activity]:
     """Get all activities for a user"""
     return storage.session.query(Activity).filter(
@@ -53,9 +75,17 @@ def create_new_report(
     date: datetime,
     time_on_task: float,
     time_wasted: float,
-    comment: Optional[str] = None
+    comment: Optional[str] = None,
+    timezone: Optional[str] = None
 ) -> Report:
-    """Create a new report and update activity stats"""
+    """Create a new report and update activity stats
+
+    timezone is the user's profile zone, looked up when not given. It
+    decides which rollup day the report counts towards, so it has to
+    come from the database rather than a cached principal.
+    """
+    if timezone is None:
+        timezone = get_user_timezone(activity.user_id)
     new_report = Report(
         activity_id=activity.id,
         date=date,
@@ -65,12 +95,21 @@ def create_new_report(
     )
     
     try:
-        # Update activity's total time
-        activity.total_time_on_task += time_on_task
-        
-        # Save both report and updated activity
-        new_report.save()
-        activity.save()
+        # Insert the report and add it to the activity and profile totals
+        # and the daily rollup, all in one transaction
+        storage.new(new_report)
+        apply_report_totals(activity.user_id, {
+            activity.id: (time_on_task, time_wasted)
+        })
+        apply_rollup_deltas(collect_rollup_deltas([{
+            'user_id': activity.user_id,
+            'activity_id': activity.id,
+            'date': new_report.date,
+            'time_on_task': time_on_task,
+            'time_wasted': time_wasted
+        }], timezone))
+        storage.save()
+        report_cache.invalidate(activity.user_id, [new_report.date])
         
         return new_report
     except Exception as e:
@@ -78,38 +117,263 @@ def create_new_report(
         raise e
 
 
+def get_activity_ids(user_id: str, unique_ids: List[str]) -> Dict[str, str]:
+    """Map the unique_ids of a user's activities to their IDs in one query"""
+    if not unique_ids:
+        return {}
+    rows = storage.session.query(Activity.unique_id, Activity.id).filter(
+        Activity.user_id == user_id,
+        Activity.unique_id.in_(unique_ids),
+        Activity.deleted.is_(None)
+    )
+    return dict(rows.all())
+
+
+def sqlite_datetime(value: datetime) -> str:
+    """value in the format SQLAlchemy stores SQLite datetimes in"""
+    return value.replace(tzinfo=None).isoformat(' ', 'microseconds')
+
+
+def insert_reports(rows: List[Dict]) -> None:
+    """Insert report rows (from Report.new_row) in the current transaction
+
+    PostgreSQL gets a single COPY, other databases one executemany.
+
+    Raises:
+        IntegrityError: If a row collides with an existing one, for COPY
+            too
+    """
+    connection = storage.session.connection()
+    columns = list(rows[0])
+    if connection.dialect.name == 'sqlite':
+        # The driver's executemany with the datetimes already formatted,
+        # SQLAlchemy's per-row parameter processing costs more than the
+        # insert itself
+        connection.exec_driver_sql(
+            f"INSERT INTO report ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [
+                tuple(
+                    sqlite_datetime(value) if isinstance(value, datetime)
+                    else value
+                    for value in row.values()
+                )
+                for row in rows
+            ]
+        )
+        return
+    if connection.dialect.name != 'postgresql':
+        # The table's insert, the ORM one splits the executemany wherever
+        # a column switches between NULL and a value
+        storage.session.execute(insert(Report.__table__), rows)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # COPY reads unquoted empty fields as NULL
+        writer.writerow(
+            '' if row[column] is None
+            else row[column].isoformat() if isinstance(row[column], datetime)
+            else row[column]
+            for column in columns
+        )
+    buffer.seek(0)
+    statement = f"COPY report ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    except connection.dialect.loaded_dbapi.IntegrityError as e:
+        # The raw cursor raises the driver's error, e.g. UniqueViolation,
+        # wrap it like SQLAlchemy does for the executemany
+        raise IntegrityError(statement, None, e) from e
+    finally:
+        cursor.close()
+
+
+def create_reports_in_bulk(
+    user_id: str,
+    reports: List[Dict],
+    timezone: Optional[str] = None
+) -> List[Dict]:
+    """Insert many reports of one user and update the totals once
+
+    Each report needs activity_id (the Activity's ID), date, time_on_task,
+    time_wasted and optionally comment. The reports are written with a
+    single bulk insert, the activity/profile totals and the rollup get one
+    aggregated update each, and everything is committed together.
+    timezone is the user's profile zone, looked up when not given, read
+    from the database like for create_new_report. Returns the inserted
+    rows.
+    """
+    if timezone is None:
+        timezone = get_user_timezone(user_id)
+    rows = [
+        Report.new_row(
+            activity_id=report['activity_id'],
+            date=report['date'].astimezone(pytz.UTC),
+            time_on_task=report['time_on_task'],
+            time_wasted=report['time_wasted'],
+            comment=report.get('comment')
+        )
+        for report in reports
+    ]
+    if not rows:
+        return rows
+
+    activity_totals = {}
+    for row in rows:
+        time_on_task, time_wasted = activity_totals.get(row['activity_id'], (0, 0))
+        activity_totals[row['activity_id']] = (
+            time_on_task + row['time_on_task'],
+            time_wasted + row['time_wasted']
+        )
+
+    try:
+        insert_reports(rows)
+        apply_report_totals(user_id, activity_totals)
+        apply_rollup_deltas(collect_rollup_deltas(
+            (dict(row, user_id=user_id) for row in rows), timezone
+        ))
+        storage.save()
+        report_cache.invalidate(user_id, (row['date'] for row in rows))
+        return rows
+    except Exception as e:
+        storage.rollback()
+        raise e
+
+
+def apply_report_totals(
+    user_id: str,
+    activity_totals: Dict[str, tuple[float, float]]
+) -> None:
+    """Add report time to the activity and profile running totals
+
+    activity_totals maps Activity.id to (time_on_task, time_wasted). The
+    increments run as UPDATE ... SET col = col + :delta so concurrent
+    reports can't overwrite each other. The profile's data_version is
+    bumped in the same statement. The caller commits.
+    """
+    now = datetime.now()
+    total_on_task = 0
+    total_wasted = 0
+
+    for activity_id, (time_on_task, time_wasted) in activity_totals.items():
+        storage.session.execute(
+            update(Activity)
+            .where(Activity.id == activity_id)
+            .values(
+                total_time_on_task=Activity.total_time_on_task + time_on_task,
+                updated_at=now
+            )
+            .execution_options(synchronize_session='fetch')
+        )
+        total_on_task += time_on_task
+        total_wasted += time_wasted
+
+    storage.session.execute(
+        update(Profile)
+        .where(Profile.user_id == user_id)
+        .values(
+            total_productive_time=Profile.total_productive_time + total_on_task,
+            total_wasted_time=Profile.total_wasted_time + total_wasted,
+            data_version=Profile.data_version + 1,
+            updated_at=now
+        )
+        .execution_options(synchronize_session='fetch')
+    )
+
+
+def rollup_days(
+    start_date: datetime,
+    end_date: datetime,
+    timezone: str = DEFAULT_TIMEZONE
+) -> Optional[tuple[date, date]]:
+    """Get the first and last rollup day covered by a date range
+
+    Returns None when the range doesn't start and end on day boundaries
+    of timezone, since the rollup can't answer those. An end_date of
+    exactly midnight is treated as the end of the previous day. Naive
+    dates are taken as UTC.
+    """
+    zone = pytz.timezone(timezone)
+    start, end = (
+        (value if value.tzinfo else value.replace(tzinfo=pytz.UTC)).astimezone(zone)
+        for value in (start_date, end_date)
+    )
+
+    if start.time() != time.min:
+        return None
+    if end.time() == time.max:
+        return start.date(), end.date()
+    if end.time() == time.min:
+        return start.date(), end.date() - timedelta(days=1)
+    return None
+
+
 def get_reports_in_range(
     user_id: str,
     start_date: datetime,
-    end_date: datetime
+    end_date: datetime,
+    timezone: str = DEFAULT_TIMEZONE
 ) -> Dict:
-    """Get all reports within a date range grouped by activity"""
-    # Get all activities for the user
-    activities = get_user_activities(user_id)
-    
+    """Get all reports within a date range grouped by activity
+
+    Ranges of whole days in the user's timezone (everything format_dates
+    returns) are answered from the daily rollup, other ranges aggregate
+    the report table directly. Either way the per-activity totals come
+    from a single grouped query.
+    """
+    days = rollup_days(start_date, end_date, timezone)
+
+    if days:
+        rows = storage.session.query(
+            Activity.name,
+            func.sum(ReportDailyRollup.time_on_task),
+            func.sum(ReportDailyRollup.time_wasted)
+        ).join(
+            ReportDailyRollup, ReportDailyRollup.activity_id == Activity.id
+        ).filter(
+            ReportDailyRollup.user_id == user_id,
+            ReportDailyRollup.day.between(*days),
+            Activity.deleted.is_(None)
+        ).group_by(
+            Activity.id,
+            Activity.name
+        ).all()
+    else:
+        rows = storage.session.query(
+            Activity.name,
+            func.sum(Report.time_on_task),
+            func.sum(Report.time_wasted)
+        ).join(
+            Report, Report.activity_id == Activity.id
+        ).filter(
+            Activity.user_id == user_id,
+            Activity.deleted.is_(None),
+            Report.deleted.is_(None),
+            Report.date.between(start_date, end_date)
+        ).group_by(
+            Activity.id,
+            Activity.name
+        ).all()
+
     # Initialize response data
     total_productive_time = 0
     total_wasted_time = 0
     activities_data = {}
-    
-    # For each activity, get and process its reports
-    for activity in activities:
-        reports = get_activity_reports(activity, start_date, end_date)
-
-        if reports:
-            productive_time = sum(report.time_on_task for report in reports)
-            wasted_time = sum(report.time_wasted for report in reports)
-            
-            # Update totals
-            total_productive_time += productive_time
-            total_wasted_time += wasted_time
-            
-            # Add to activities data
-            activities_data[activity.name] = {
-                'total_time_on_task': productive_time,
-                'total_time_wasted': wasted_time,
-            }
-    
+
+    for name, productive_time, wasted_time in rows:
+        # Update totals
+        total_productive_time += productive_time
+        total_wasted_time += wasted_time
+
+        # Add to activities data
+        activities_data[name] = {
+            'total_time_on_task': productive_time,
+            'total_time_wasted': wasted_time,
+        }
+
     # Create final response
     return {
         'start_date': start_date,
@@ -120,39 +384,161 @@ def get_reports_in_range(
     }
 
 
-def format_dates(start_date: str | None, end_date: str | None) -> tuple[datetime, datetime]:
+# Granularities of GET /report/series
+SERIES_BUCKETS = ('day', 'week', 'month')
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """First day of the bucket a day falls into, weeks start on Monday"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_starts(first: date, last: date, bucket: str) -> List[date]:
+    """First days of every bucket overlapping [first, last]"""
+    starts = []
+    current = bucket_start(first, bucket)
+    while current <= last:
+        starts.append(current)
+        if bucket == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if bucket == 'week' else 1)
+    return starts
+
+
+def bucket_expression(dialect: str, bucket: str):
+    """SQL expression for the first day of ReportDailyRollup.day's bucket
+
+    date_trunc where the database has it, date arithmetic otherwise.
+    """
+    day = ReportDailyRollup.day
+    if bucket == 'day':
+        return day
+    if dialect == 'postgresql':
+        # Inlined, a bind parameter would differ between SELECT and GROUP BY
+        return cast(func.date_trunc(literal_column(f"'{bucket}'"), day), Date)
+    if dialect in ('mysql', 'mariadb'):
+        if bucket == 'week':
+            return func.subdate(day, func.weekday(day))
+        return func.date_format(day, '%Y-%m-01')
+    # SQLite: %w counts days from Sunday, shift it to count from Monday
+    if bucket == 'week':
+        return func.date(
+            day, '-' + cast((cast(func.strftime('%w', day), Integer) + 6) % 7, String) + ' days'
+        )
+    return func.strftime('%Y-%m-01', day)
+
+
+def get_report_series(
+    user_id: str,
+    start_date: datetime,
+    end_date: datetime,
+    bucket: str,
+    timezone: str = DEFAULT_TIMEZONE
+) -> Dict:
+    """Get per-activity totals for every day, week or month of a date range
+
+    The buckets are read from the daily rollup with one grouped query and
+    zero filled, so every series has one value per bucket. Days, weeks and
+    months are those of the user's timezone, which the rollup is kept in.
+    Buckets are labelled with their first day, the first and last one can
+    extend past the range but only count reports inside it.
+
+    Raises:
+        ValueError: If bucket is unknown or the range isn't whole days
+    """
+    if bucket not in SERIES_BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(SERIES_BUCKETS)}")
+    days = rollup_days(start_date, end_date, timezone)
+    if not days:
+        raise ValueError('The range must start and end on whole days')
+
+    dialect = storage.session.get_bind().dialect.name
+    period = bucket_expression(dialect, bucket).label('period')
+    rows = storage.session.query(
+        Activity.name,
+        period,
+        func.sum(ReportDailyRollup.time_on_task),
+        func.sum(ReportDailyRollup.time_wasted)
+    ).join(
+        ReportDailyRollup, ReportDailyRollup.activity_id == Activity.id
+    ).filter(
+        ReportDailyRollup.user_id == user_id,
+        ReportDailyRollup.day.between(*days),
+        Activity.deleted.is_(None)
+    ).group_by(
+        Activity.id,
+        Activity.name,
+        period
+    ).all()
+
+    starts = bucket_starts(*days, bucket)
+    positions = {start: index for index, start in enumerate(starts)}
+    total_time_on_task = [0] * len(starts)
+    total_time_wasted = [0] * len(starts)
+    activities = {}
+
+    for name, period_start, time_on_task, time_wasted in rows:
+        # SQLite and MySQL hand back the bucket as a string
+        if isinstance(period_start, str):
+            period_start = date.fromisoformat(period_start)
+        elif isinstance(period_start, datetime):
+            period_start = period_start.date()
+        index = positions[period_start]
+
+        series = activities.setdefault(name, {
+            'time_on_task': [0] * len(starts),
+            'time_wasted': [0] * len(starts),
+        })
+        series['time_on_task'][index] += time_on_task
+        series['time_wasted'][index] += time_wasted
+        total_time_on_task[index] += time_on_task
+        total_time_wasted[index] += time_wasted
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'bucket': bucket,
+        'buckets': [start.isoformat() for start in starts],
+        'total_time_on_task': total_time_on_task,
+        'total_time_wasted': total_time_wasted,
+        'activities': activities
+    }
+
+
+def format_dates(
+    start_date: str | None,
+    end_date: str | None,
+    timezone: str = DEFAULT_TIMEZONE
+) -> tuple[datetime, datetime]:
     """Format start and end dates for report queries
     
     If no dates provided, defaults to today.
     If only start_date, end_date will be start_date + 1 day.
-    Dates should be in YYYY-MM-DD format.
+    Dates should be in YYYY-MM-DD format and are days in timezone, so
+    a day can be 23 or 25 hours long around DST changes.
     
     Returns:
         Tuple of (start_date, end_date) as UTC datetimes
     """
     # If no dates provided, use today as default
     if not start_date and not end_date:
-        end_date = datetime.now(pytz.UTC).replace(
-            hour=23, minute=59, second=59, microsecond=999999
-        )
-        start_date = end_date.replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        return start_date, end_date
+        today = datetime.now(pytz.UTC).astimezone(pytz.timezone(timezone)).date()
+        return day_start(today, timezone), day_end(today, timezone)
 
     # Parse date strings (expecting YYYY-MM-DD format)
     if not start_date:
         raise ValueError('start_date is required if end_date is provided')
-    start = datetime.strptime(start_date, '%Y-%m-%d').replace(
-        hour=0, minute=0, second=0, microsecond=0, tzinfo=pytz.UTC
-    )
+    start_day = datetime.strptime(start_date, '%Y-%m-%d').date()
 
     if end_date:
-        end = datetime.strptime(end_date, '%Y-%m-%d').replace(
-            hour=23, minute=59, second=59, microsecond=999999, tzinfo=pytz.UTC
-        )
+        end = day_end(datetime.strptime(end_date, '%Y-%m-%d').date(), timezone)
     else:
         # If no end_date provided, set it to one day after start_date
-        end = start + timedelta(days=1)
+        end = day_start(start_day + timedelta(days=1), timezone)
 
-    return start, end
\ No newline at end of file
+    return day_start(start_day, timezone), end
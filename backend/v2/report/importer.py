@@ -0,0 +1,244 @@
+"""Bulk import of reports from CSV
+
+The CSV needs a header row with the columns:
+    activity       Activity name (activity_name is accepted too, so the
+                   CSV export can be imported back)
+    date           ISO 8601 date or datetime, without an offset it is a
+                   wall time in the user's time zone
+    time_on_task   Hours, 0 or more
+    time_wasted    Hours, 0 or more (optional, defaults to 0)
+    comment        Up to 255 characters (optional)
+
+The file is read and written in chunks of IMPORT_CHUNK_SIZE rows, each
+committed on its own, so memory stays flat for files of any size and an
+interrupted import keeps the chunks it finished. Activities named in the
+file that the user doesn't have are created, once per chunk with a
+single insert. Rejected lines are reported with their line number.
+"""
+
+import csv
+import time
+from datetime import datetime
+from os import environ
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
+import pytz
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.report.functions import create_reports_in_bulk, get_user_timezone
+from v2.utils.etag import bump_data_version
+from v2.utils.timezones import localize
+
+# Rows parsed, inserted and committed at once
+IMPORT_CHUNK_SIZE = int(environ.get('IMPORT_CHUNK_SIZE', 20000))
+
+# Rejected lines listed in the result, the rest are only counted
+MAX_REPORTED_REJECTS = 1000
+
+# Attempts per chunk, a retry draws new random report unique_ids
+CHUNK_ATTEMPTS = 3
+
+REQUIRED_COLUMNS = ('activity', 'date', 'time_on_task')
+
+
+class ImportFormatError(ValueError):
+    """Raised when the CSV header lacks a required column"""
+
+
+class ImportResult:
+    """Progress of an import, passed to the progress callback per chunk"""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.activities_created = 0
+        self.rejects: List[Dict] = []
+        self.started = time.perf_counter()
+
+    def reject(self, line: int, message: str) -> None:
+        """Record a rejected line"""
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({'line': line, 'message': message})
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the import started"""
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict:
+        """Counters, throughput and the first rejected lines"""
+        elapsed = self.elapsed
+        return {
+            'imported': self.imported,
+            'rejected': self.rejected,
+            'activities_created': self.activities_created,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.imported / elapsed) if elapsed else 0,
+            'rejects': self.rejects,
+        }
+
+
+def _hours(value: str, column: str) -> float:
+    """Parse a non-negative number of hours"""
+    try:
+        hours = float(value)
+    except ValueError:
+        raise ValueError(f'{column} must be a number')
+    if not hours >= 0:
+        raise ValueError(f'{column} must be 0 or more')
+    return hours
+
+
+def parse_row(row: Dict[str, str], timezone: str, now: datetime) -> Dict:
+    """One CSV record as a report for create_reports_in_bulk
+
+    The activity is still a name. Applies the same rules as
+    CreateReportRequest, without its per-row overhead.
+
+    Raises:
+        ValueError: With the reason the row is rejected
+    """
+    name = (row.get('activity') or '').strip()
+    if not name or len(name) > 128:
+        raise ValueError('activity must be 1 to 128 characters')
+
+    try:
+        date = datetime.fromisoformat((row.get('date') or '').strip())
+    except ValueError:
+        raise ValueError('date must be an ISO 8601 date or datetime')
+    date = localize(date, timezone).astimezone(pytz.UTC)
+    if date > now:
+        raise ValueError('Report date cannot be in the future')
+
+    comment = row.get('comment') or None
+    if comment is not None and len(comment) > 255:
+        raise ValueError('comment must be at most 255 characters')
+
+    return {
+        'activity_id': name,
+        'date': date,
+        'time_on_task': _hours(row.get('time_on_task') or '', 'time_on_task'),
+        'time_wasted': _hours(row.get('time_wasted') or '0', 'time_wasted'),
+        'comment': comment,
+    }
+
+
+def resolve_activities(user_id: str, names: Iterable[str],
+                       known: Dict[str, str], result: ImportResult) -> None:
+    """Add the IDs of names to known, creating the missing activities
+
+    One query finds the user's existing activities, one insert creates
+    the others. They are committed right away so a chunk that is retried
+    finds them.
+    """
+    missing = set(names) - known.keys()
+    if not missing:
+        return
+
+    rows = storage.session.query(Activity.name, Activity.id).filter(
+        Activity.user_id == user_id,
+        Activity.name.in_(missing),
+        Activity.deleted.is_(None)
+    ).all()
+    known.update(rows)
+    missing -= known.keys()
+    if not missing:
+        return
+
+    new_rows = [
+        Activity.new_row(
+            name=name,
+            user_id=user_id,
+            daily_goal=0,
+            weekly_goal=0,
+            total_time_on_task=0
+        )
+        for name in sorted(missing)
+    ]
+    try:
+        storage.session.execute(insert(Activity), new_rows)
+        bump_data_version(user_id)
+        storage.save()
+    except Exception:
+        storage.rollback()
+        raise
+    known.update((row['name'], row['id']) for row in new_rows)
+    result.activities_created += len(new_rows)
+
+
+def _chunks(records: Iterable, size: int):
+    """Lists of up to size (line, record) pairs"""
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_reports(
+    user_id: str,
+    stream: TextIO,
+    timezone: Optional[str] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Optional[Callable[[ImportResult], None]] = None
+) -> ImportResult:
+    """Import the reports of a CSV text stream for a user
+
+    timezone is the user's profile zone, looked up when not given.
+    progress is called with the running result after every chunk.
+
+    Raises:
+        ImportFormatError: If the header lacks a required column
+    """
+    if timezone is None:
+        timezone = get_user_timezone(user_id)
+
+    reader = csv.DictReader(stream)
+    fieldnames = [name.strip().lower() for name in reader.fieldnames or ()]
+    if 'activity' not in fieldnames and 'activity_name' in fieldnames:
+        fieldnames[fieldnames.index('activity_name')] = 'activity'
+    missing = [column for column in REQUIRED_COLUMNS if column not in fieldnames]
+    if missing:
+        raise ImportFormatError(f"CSV is missing the columns: {', '.join(missing)}")
+    reader.fieldnames = fieldnames
+
+    result = ImportResult()
+    activity_ids: Dict[str, str] = {}
+    now = datetime.now(pytz.UTC)
+
+    # line_num is read after each record, so it is the record's last line
+    records = ((reader.line_num, row) for row in reader)
+    for chunk in _chunks(records, chunk_size):
+        reports = []
+        for line, row in chunk:
+            try:
+                reports.append(parse_row(row, timezone, now))
+            except ValueError as e:
+                result.reject(line, str(e))
+
+        if reports:
+            resolve_activities(
+                user_id, {report['activity_id'] for report in reports},
+                activity_ids, result)
+            for report in reports:
+                report['activity_id'] = activity_ids[report['activity_id']]
+
+            for attempt in range(CHUNK_ATTEMPTS):
+                try:
+                    create_reports_in_bulk(user_id, reports, timezone)
+                    break
+                except IntegrityError:
+                    # A generated unique_id already exists, draw new ones
+                    if attempt == CHUNK_ATTEMPTS - 1:
+                        raise
+            result.imported += len(reports)
+
+        if progress is not None:
+            progress(result)
+
+    return result
@@ -1,17 +1,38 @@
 """Report routes"""
 
+import io
+import time
+from datetime import datetime
 from v2 import router
-from flask import jsonify, request
+from flask import Response, jsonify, request, send_file, stream_with_context
 from v2.utils.middleware import auth_middleware
-from v2.report.validation import CreateReportRequest
+from v2.report.cache import report_cache
+from v2.report.export import EXPORT_FORMATS, export_reports
+from v2.report.importer import ImportFormatError, import_reports
+from v2.report.parquet import ParquetUnavailable, parquet_export_file
+from v2.utils.etag import data_etag, not_modified
+from v2.utils.timezones import DEFAULT_TIMEZONE
+from v2.report.validation import (
+    MAX_BATCH_SIZE,
+    CreateReportRequest,
+    validate_report_batch
+)
 from v2.report.functions import (
     format_dates,
     get_activity_by_id,
+    get_activity_ids,
     create_new_report,
-    get_profile_by_id,
-    get_reports_in_range
+    create_reports_in_bulk,
+    get_report_series,
+    get_reports_in_range,
+    get_user_timezone,
+    SERIES_BUCKETS,
+    report_serializer
 )
 
+# Longest range the report reads accept, one year of data
+MAX_REPORT_DAYS = 366
+
 
 @router.route('/report', methods=['POST'])
 @auth_middleware
@@ -20,7 +41,9 @@ def create_report():
     try:
         # Validate request data
         data = request.get_json() if request.is_json else request.form
-        report_data = CreateReportRequest.model_validate(data)
+        timezone = stored_timezone()
+        report_data = CreateReportRequest.model_validate(
+            data, context={'timezone': timezone})
         
         # Verify the activity exists and belongs to the user
         activity = get_activity_by_id(report_data.activity_id, request.user['id'])
@@ -29,34 +52,19 @@ def create_report():
                 'message': 'Activity not found'
             }), 404
             
-        # Create new report
+        # Create new report, this also updates the activity and profile totals
         new_report = create_new_report(
             activity=activity,
             date=report_data.date,
             time_on_task=report_data.time_on_task,
             time_wasted=report_data.time_wasted,
-            comment=report_data.comment
+            comment=report_data.comment,
+            timezone=timezone
         )
 
-        profile = get_profile_by_id(request.user['id'])
-        profile.total_productive_time = profile.total_productive_time + report_data.time_on_task
-        profile.total_wasted_time = profile.total_wasted_time + report_data.time_wasted
-
-        profile.save()
-        # Use ReportResponse for serialization
-        # report_response = ReportResponse.model_dump(new_report)
-        
         return jsonify({
             'message': 'Report created successfully',
-            'data': {
-                'id': new_report.id,
-                'unique_id': new_report.unique_id,
-                'activity_id': new_report.activity_id,
-                'date': new_report.date,
-                'time_on_task': new_report.time_on_task,
-                'time_wasted': new_report.time_wasted,
-                'comment': new_report.comment
-            }
+            'data': report_serializer.dump(new_report)
         }), 201
         
     except ValueError as e:
@@ -65,44 +73,304 @@ def create_report():
         return jsonify({'message': str(e)}), 500
 
 
+@router.route('/report/batch', methods=['POST'])
+@auth_middleware
+def create_report_batch():
+    """Create many reports at once, e.g. when replaying offline entries
+
+    Accepts a list of report payloads (or {"reports": [...]}). Valid
+    reports are stored even when others fail, the response lists the
+    per-item errors by their position in the request.
+    """
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('reports') if isinstance(data, dict) else data
+
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'message': 'Expected a non-empty list of reports'
+            }), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({
+                'message': f'A batch cannot contain more than {MAX_BATCH_SIZE} reports'
+            }), 413
+
+        timezone = stored_timezone()
+        valid, errors = validate_report_batch(items, timezone)
+
+        # Resolve every referenced activity with a single query
+        activity_ids = get_activity_ids(
+            request.user['id'],
+            list({report.activity_id for _, report in valid})
+        )
+
+        indexes = []
+        reports = []
+        for index, report in valid:
+            if report.activity_id not in activity_ids:
+                errors.append({'index': index, 'message': 'Activity not found'})
+                continue
+            indexes.append(index)
+            reports.append({
+                'activity_id': activity_ids[report.activity_id],
+                'date': report.date,
+                'time_on_task': report.time_on_task,
+                'time_wasted': report.time_wasted,
+                'comment': report.comment
+            })
+
+        created = create_reports_in_bulk(request.user['id'], reports, timezone)
+        errors.sort(key=lambda error: error['index'])
+
+        return jsonify({
+            'message': f'{len(created)} of {len(items)} reports created',
+            'data': {
+                'created': [
+                    {'index': index, 'id': row['id'], 'unique_id': row['unique_id']}
+                    for index, row in zip(indexes, created)
+                ],
+                'errors': errors
+            }
+        }), 201 if created else 400
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+
+@router.route('/report/import', methods=['POST'])
+@auth_middleware
+def import_report_csv():
+    """Import reports from an uploaded CSV
+
+    The CSV comes as the multipart field file, or as the raw request
+    body. It is parsed and stored in chunks while it is read.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    try:
+        result = import_reports(
+            request.user['id'],
+            io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''),
+            timezone=stored_timezone()
+        )
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+    return jsonify({
+        'message': f'{result.imported} reports imported, {result.rejected} rejected',
+        'data': result.to_dict()
+    }), 201 if result.imported else 400
+
+
+def user_timezone() -> str:
+    """Time zone of the authenticated user's profile"""
+    return request.user.get('timezone') or DEFAULT_TIMEZONE
+
+
+def stored_timezone() -> str:
+    """Time zone of the authenticated user's profile, read from the database
+
+    The writes use it instead of user_timezone(): the cached principal
+    can be up to a minute old, and a stale zone would put reports into
+    the wrong rollup days for good.
+    """
+    return get_user_timezone(request.user['id'])
+
+
+def parse_report_window(args, timezone: str = DEFAULT_TIMEZONE) -> tuple:
+    """Read and check the start_date/end_date query parameters
+
+    The dates are days in timezone.
+
+    Raises:
+        ValueError: With the message for the client
+    """
+    try:
+        start_date, end_date = format_dates(
+            args.get('start_date'),
+            args.get('end_date'),
+            timezone
+        )
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+
+    # Validate date range
+    if end_date < start_date:
+        raise ValueError('end_date cannot be before start_date')
+
+    # Limit the date range to prevent excessive queries
+    if (end_date - start_date).days > MAX_REPORT_DAYS:
+        raise ValueError('Date range cannot exceed a year')
+
+    return start_date, end_date
+
+
 @router.route('/report', methods=['GET'])
 @auth_middleware
 def get_report():
-    """Get all reports within a date range grouped by activity"""
+    """Get all reports within a date range grouped by activity
+
+    Answers 304 when If-None-Match holds the current ETag.
+    """
     try:
+        timezone = user_timezone()
         try:
-            start_date, end_date = format_dates(
-                request.args.get('start_date'),
-                request.args.get('end_date')
+            start_date, end_date = parse_report_window(request.args, timezone)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        # The resolved window is part of the ETag, the default "today"
+        # changes at midnight without any write
+        etag = data_etag(request.user['id'], 'report',
+                         start_date.isoformat(), end_date.isoformat())
+        response = not_modified(etag)
+        if response:
+            return response
+
+        # Get reports within date range, polled windows come from the cache
+        reports = report_cache.get(request.user['id'], start_date, end_date)
+        cache_status = 'HIT'
+        if reports is None:
+            cache_status = 'MISS'
+            computed_since = time.monotonic()
+            reports = get_reports_in_range(
+                user_id=request.user['id'],
+                start_date=start_date,
+                end_date=end_date,
+                timezone=timezone
             )
+            report_cache.set(request.user['id'], start_date, end_date,
+                             reports, computed_since)
 
-            # Validate date range
-            if end_date < start_date:
-                return jsonify({
-                    'message': 'end_date cannot be before start_date'
-                }), 400
-
-            # Limit the date range to prevent excessive queries
-            max_days = 366  # Maximum one year of data
-            if (end_date - start_date).days > max_days:
-                return jsonify({
-                    'message': 'Date range cannot exceed a year'
-                }), 400
-        except ValueError:
+        response = jsonify({
+            'message': 'Reports retrieved successfully',
+            'data': reports
+        })
+        response.headers['X-Cache'] = cache_status
+        response.set_etag(etag)
+        return response, 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+
+@router.route('/report/series', methods=['GET'])
+@auth_middleware
+def get_report_series_route():
+    """Get per-activity totals for each day, week or month of a date range
+
+    Query parameters:
+        bucket: day (default), week or month
+        start_date, end_date: Like GET /report
+
+    Answers 304 when If-None-Match holds the current ETag.
+    """
+    try:
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in SERIES_BUCKETS:
             return jsonify({
-                'message': 'Invalid date format. Use YYYY-MM-DD'
-        }), 400
+                'message': f"bucket must be one of {', '.join(SERIES_BUCKETS)}"
+            }), 400
+        timezone = user_timezone()
+        try:
+            start_date, end_date = parse_report_window(request.args, timezone)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        etag = data_etag(request.user['id'], 'series', bucket,
+                         start_date.isoformat(), end_date.isoformat())
+        response = not_modified(etag)
+        if response:
+            return response
 
-        # Get reports within date range
-        reports = get_reports_in_range(
+        series = get_report_series(
             user_id=request.user['id'],
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            bucket=bucket,
+            timezone=timezone
         )
 
+        response = jsonify({
+            'message': 'Report series retrieved successfully',
+            'data': series
+        })
+        response.set_etag(etag)
+        return response, 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+
+@router.route('/report/export', methods=['GET'])
+@auth_middleware
+def export_report():
+    """Stream every report of the user as NDJSON or CSV
+
+    The body is written while the rows are read, a batch at a time, so
+    exports of any size use the same amount of memory.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format == 'parquet':
+        return export_report_parquet()
+    if export_format not in EXPORT_FORMATS:
         return jsonify({
-            'message': 'Reports retrieved successfully',
-            'data': reports
-        }), 200
+            'message': f"format must be one of {', '.join(EXPORT_FORMATS)}, parquet"
+        }), 400
+
+    try:
+        chunks = export_reports(request.user['id'], export_format)
     except Exception as e:
         return jsonify({'message': str(e)}), 500
+
+    # Keeps the request (and its database session) open while streaming
+    response = Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="timecraft-reports.{export_format}"'
+    )
+    return response
+
+
+def export_report_parquet():
+    """Send the user's reports as one Parquet file
+
+    With since (an X-Export-Watermark of an earlier export) only reports
+    updated after it are included. The watermark trails the export by
+    WATERMARK_LAG, reports updated within it are sent again next time.
+    """
+    since = request.args.get('since')
+    if since:
+        try:
+            since = datetime.fromisoformat(since)
+        except ValueError:
+            return jsonify({'message': 'since must be an ISO 8601 timestamp'}), 400
+
+    try:
+        output, watermark = parquet_export_file(request.user['id'], since or None)
+    except ParquetUnavailable as e:
+        return jsonify({'message': str(e)}), 501
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+    response = send_file(
+        output,
+        mimetype='application/vnd.apache.parquet',
+        as_attachment=True,
+        download_name='timecraft-reports.parquet'
+    )
+    if watermark is not None:
+        response.headers['X-Export-Watermark'] = watermark.isoformat()
+    return response
+
+
+@router.route('/report/cache', methods=['GET'])
+@auth_middleware
+def get_report_cache_stats():
+    """Hit, miss and invalidation counters of the report cache"""
+    return jsonify({
+        'message': 'Report cache statistics',
+        'data': report_cache.stats()
+    }), 200
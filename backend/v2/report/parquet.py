@@ -0,0 +1,253 @@
+"""Parquet export of reports for analytics
+
+Reports joined with their activity are written as Parquet files built
+from Arrow record batches of EXPORT_BATCH_SIZE rows. Exports to a
+directory are partitioned by user and month:
+
+    <directory>/user_id=<user_id>/month=<YYYY-MM>/part-<run>.parquet
+
+and are incremental. <directory>/_watermark.json keeps the newest
+updated_at written so far, the next run only writes reports updated
+after it. Renaming or deleting an activity stamps its reports, so they
+are exported again with the change. updated_at is stamped before the
+commit, so a report committed late can carry a time older than rows
+already exported. The watermark therefore never passes the run's start
+minus WATERMARK_LAG, and the next run exports reports near the
+watermark again. A changed report can appear in several files, keep
+the row with the latest updated_at per report_id.
+
+pyarrow is optional, it is only needed by these exports and comes with
+the parquet extra of the backend package.
+"""
+
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterator, Optional
+import pytz
+from sqlalchemy import select
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Report import Report
+from v2.report.export import EXPORT_BATCH_SIZE
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+WATERMARK_FILE = '_watermark.json'
+
+# Longest time between stamping updated_at and committing a report
+WATERMARK_LAG = timedelta(minutes=1)
+
+# Parquet columns, in query order
+PARQUET_COLUMNS = (
+    'report_id', 'user_id', 'activity_id', 'activity_name', 'date',
+    'time_on_task', 'time_wasted', 'comment', 'activity_deleted', 'updated_at',
+)
+
+
+class ParquetUnavailable(Exception):
+    """Raised when pyarrow is not installed"""
+
+
+def parquet_schema():
+    """Arrow schema of the exported rows
+
+    Raises:
+        ParquetUnavailable: If pyarrow is not installed
+    """
+    if pyarrow is None:
+        raise ParquetUnavailable(
+            'Parquet exports need pyarrow, install the parquet extra '
+            '(uv sync --extra parquet)')
+    timestamp = pyarrow.timestamp('us')
+    return pyarrow.schema([
+        ('report_id', pyarrow.string()),
+        ('user_id', pyarrow.string()),
+        ('activity_id', pyarrow.string()),
+        ('activity_name', pyarrow.string()),
+        ('date', pyarrow.timestamp('us', tz='UTC')),
+        ('time_on_task', pyarrow.float64()),
+        ('time_wasted', pyarrow.float64()),
+        ('comment', pyarrow.string()),
+        ('activity_deleted', timestamp),
+        ('updated_at', timestamp),
+    ])
+
+
+def changed_report_batches(
+    since: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[list]:
+    """Reports updated after since, a list of rows per batch
+
+    Reports of deleted activities are included, with activity_deleted
+    set, so the export can drop them too. Rows follow PARQUET_COLUMNS and
+    are ordered by user and date, so every partition is contiguous.
+    """
+    statement = select(
+        Report.unique_id,
+        Activity.user_id,
+        Activity.unique_id,
+        Activity.name,
+        Report.date,
+        Report.time_on_task,
+        Report.time_wasted,
+        Report.comment,
+        Activity.deleted,
+        Report.updated_at
+    ).join(
+        Activity, Report.activity_id == Activity.id
+    ).where(
+        Report.deleted.is_(None)
+    ).order_by(
+        Activity.user_id,
+        Report.date,
+        Report.id
+    ).execution_options(
+        stream_results=True,
+        yield_per=batch_size
+    )
+    if since is not None:
+        statement = statement.where(Report.updated_at > since)
+    if user_id is not None:
+        statement = statement.where(Activity.user_id == user_id)
+    return storage.session.execute(statement).partitions()
+
+
+def partition_key(row) -> tuple[str, str]:
+    """(user_id, UTC month) partition of an exported row"""
+    date = row[4]
+    if date.tzinfo is not None:
+        date = date.astimezone(pytz.UTC)
+    return row[1], date.strftime('%Y-%m')
+
+
+def record_batch(rows: list, schema):
+    """Arrow record batch of rows"""
+    columns = list(zip(*rows))
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(column, type=field.type)
+         for column, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+def lagged_watermark(newest: Optional[datetime], started: datetime,
+                     since: Optional[datetime] = None) -> Optional[datetime]:
+    """Watermark of a run started at started that wrote up to newest
+
+    Stays WATERMARK_LAG behind started, reports stamped before that may
+    not have been committed yet. Never goes back before since.
+    """
+    if newest is None:
+        return since
+    watermark = min(newest, started - WATERMARK_LAG)
+    return watermark if since is None else max(since, watermark)
+
+
+def write_parquet(sink, batches: Iterator[list]) -> Optional[datetime]:
+    """Write batches as a single Parquet file to sink
+
+    Returns:
+        The newest updated_at written, None when there were no rows
+    """
+    schema = parquet_schema()
+    watermark = None
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            writer.write_batch(record_batch(rows, schema))
+            newest = max(row[-1] for row in rows)
+            watermark = newest if watermark is None else max(watermark, newest)
+    return watermark
+
+
+def parquet_export_file(user_id: str, since: Optional[datetime] = None):
+    """One user's reports as a Parquet file in a temporary file
+
+    Returns:
+        (file positioned at its start, watermark of the next export,
+        since when there were no rows)
+    """
+    parquet_schema()
+    started = datetime.now()
+    output = tempfile.TemporaryFile()
+    try:
+        newest = write_parquet(output, changed_report_batches(since, user_id))
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output, lagged_watermark(newest, started, since)
+
+
+def read_watermark(directory: str) -> Optional[datetime]:
+    """updated_at up to which directory holds every report, None if empty"""
+    try:
+        with open(os.path.join(directory, WATERMARK_FILE)) as file:
+            return datetime.fromisoformat(json.load(file)['updated_at'])
+    except FileNotFoundError:
+        return None
+
+
+def write_watermark(directory: str, watermark: datetime) -> None:
+    """Atomically record the watermark of directory"""
+    path = os.path.join(directory, WATERMARK_FILE)
+    with open(path + '.tmp', 'w') as file:
+        json.dump({'updated_at': watermark.isoformat()}, file)
+    os.replace(path + '.tmp', path)
+
+
+def export_parquet_dataset(directory: str, full: bool = False,
+                           batch_size: int = EXPORT_BATCH_SIZE) -> Dict:
+    """Write reports updated since the last run as partitioned Parquet
+
+    Each partition touched by this run gets one new file. The watermark
+    only moves once every file is written, so a failed run is repeated
+    in full by the next one. full ignores the watermark.
+
+    Returns:
+        Rows and files written, and the new watermark
+    """
+    schema = parquet_schema()
+    since = None if full else read_watermark(directory)
+    started = datetime.now()
+    run = f"{started.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    rows_written = 0
+    files = []
+    newest = None
+    writer = None
+    partition = None
+    try:
+        for rows in changed_report_batches(since, batch_size=batch_size):
+            for key, group in groupby(rows, key=partition_key):
+                if key != partition:
+                    if writer is not None:
+                        writer.close()
+                    partition = key
+                    path = os.path.join(directory, f'user_id={key[0]}',
+                                        f'month={key[1]}', f'part-{run}.parquet')
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    writer = pyarrow.parquet.ParquetWriter(path, schema)
+                    files.append(path)
+                writer.write_batch(record_batch(list(group), schema))
+
+            rows_written += len(rows)
+            batch_newest = max(row[-1] for row in rows)
+            newest = batch_newest if newest is None else max(newest, batch_newest)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    watermark = lagged_watermark(newest, started, since)
+    if watermark is not None and watermark != since:
+        write_watermark(directory, watermark)
+    return {'rows': rows_written, 'files': len(files), 'watermark': watermark}
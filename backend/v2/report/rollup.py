@@ -0,0 +1,212 @@
+"""Maintenance of the report_daily_rollup table"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Profile import Profile
+from v2.models.Report import Report
+from v2.models.ReportDailyRollup import ReportDailyRollup
+from v2.report.cache import report_cache
+from v2.utils.timezones import DEFAULT_TIMEZONE, local_date_expression, local_day
+import pytz
+
+# (user_id, activity_id, day) -> [time_on_task, time_wasted, report_count]
+RollupDeltas = Dict[Tuple[str, str, date], list]
+
+
+def rollup_day(report_date: datetime, timezone: str = DEFAULT_TIMEZONE) -> date:
+    """Get the rollup day (calendar day in the user's zone) of a report date"""
+    return local_day(report_date, timezone)
+
+
+def collect_rollup_deltas(rows: Iterable[dict],
+                          timezone: str = DEFAULT_TIMEZONE) -> RollupDeltas:
+    """Sum report values per rollup key
+
+    Each row needs user_id, activity_id, date, time_on_task and
+    time_wasted keys. The rows belong to users in timezone.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        key = (row['user_id'], row['activity_id'], rollup_day(row['date'], timezone))
+        deltas[key][0] += row['time_on_task']
+        deltas[key][1] += row['time_wasted']
+        deltas[key][2] += 1
+    return dict(deltas)
+
+
+def apply_rollup_deltas(deltas: RollupDeltas) -> None:
+    """Add deltas to the rollup rows in the current transaction
+
+    Uses the dialect's native upsert so concurrent writers to the same day
+    add up instead of overwriting each other. The caller commits.
+    """
+    if not deltas:
+        return
+
+    now = datetime.now()
+    values = [
+        {
+            'user_id': user_id,
+            'activity_id': activity_id,
+            'day': day,
+            'time_on_task': time_on_task,
+            'time_wasted': time_wasted,
+            'report_count': report_count,
+            'updated_at': now
+        }
+        for (user_id, activity_id, day), (time_on_task, time_wasted, report_count)
+        in deltas.items()
+    ]
+    table = ReportDailyRollup.__table__
+    dialect = storage.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day, table.c.activity_id],
+            set_={
+                'time_on_task': table.c.time_on_task + stmt.excluded.time_on_task,
+                'time_wasted': table.c.time_wasted + stmt.excluded.time_wasted,
+                'report_count': table.c.report_count + stmt.excluded.report_count,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        # Parameters rather than .values(), so the statement is compiled
+        # once instead of once per number of rows
+        storage.session.execute(stmt, values)
+    elif dialect in ('mysql', 'mariadb'):
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            time_on_task=table.c.time_on_task + stmt.inserted.time_on_task,
+            time_wasted=table.c.time_wasted + stmt.inserted.time_wasted,
+            report_count=table.c.report_count + stmt.inserted.report_count,
+            updated_at=stmt.inserted.updated_at
+        )
+        storage.session.execute(stmt, values)
+    else:
+        # No native upsert, update existing rows and insert the rest
+        for row in values:
+            result = storage.session.execute(
+                update(table)
+                .where(
+                    table.c.user_id == row['user_id'],
+                    table.c.day == row['day'],
+                    table.c.activity_id == row['activity_id']
+                )
+                .values(
+                    time_on_task=table.c.time_on_task + row['time_on_task'],
+                    time_wasted=table.c.time_wasted + row['time_wasted'],
+                    report_count=table.c.report_count + row['report_count'],
+                    updated_at=row['updated_at']
+                )
+            )
+            if result.rowcount == 0:
+                storage.session.execute(insert(table).values(**row))
+
+
+def rebuild_daily_rollups(user_id: Optional[str] = None) -> int:
+    """Recompute the rollup from the report table
+
+    Rebuilds every user's rollup, or only user_id's when given, with
+    INSERT ... SELECT statements that bucket reports by the day in each
+    user's time zone, and commits. Returns the number of rows written.
+    """
+    table = ReportDailyRollup.__table__
+    dialect = storage.session.get_bind().dialect.name
+    columns = ['user_id', 'day', 'activity_id', 'time_on_task',
+               'time_wasted', 'report_count', 'updated_at']
+
+    def source(day, *criteria):
+        """Grouped totals per user, day and activity"""
+        query = select(
+            Activity.user_id,
+            day,
+            Report.activity_id,
+            func.sum(Report.time_on_task),
+            func.sum(Report.time_wasted),
+            func.count(Report.id),
+            literal(datetime.now(), type_=table.c.updated_at.type)
+        ).join(
+            Activity, Activity.id == Report.activity_id
+        ).join(
+            Profile, Profile.user_id == Activity.user_id
+        ).where(
+            Report.deleted.is_(None),
+            *criteria
+        ).group_by(
+            Activity.user_id,
+            day,
+            Report.activity_id
+        )
+        if user_id:
+            query = query.where(Activity.user_id == user_id)
+        return query
+
+    clear = delete(table)
+    if user_id:
+        clear = clear.where(table.c.user_id == user_id)
+
+    try:
+        storage.session.execute(clear)
+        written = 0
+        if dialect in ('postgresql', 'mysql', 'mariadb'):
+            # The database converts with each row's profile zone
+            day = local_date_expression(dialect, Report.date, Profile.timezone)
+            statements = [source(day)]
+        else:
+            # One statement per zone, each with that zone's offsets inlined
+            statements = []
+            for timezone, first, last in zone_report_ranges(user_id):
+                day = local_date_expression(dialect, Report.date, timezone, first, last)
+                statements.append(source(day, Profile.timezone == timezone))
+
+        for statement in statements:
+            result = storage.session.execute(
+                insert(table).from_select(columns, statement)
+            )
+            written += result.rowcount
+        storage.save()
+        if user_id:
+            report_cache.invalidate(user_id)
+        else:
+            report_cache.clear()
+        return written
+    except Exception as e:
+        storage.rollback()
+        raise e
+
+
+def zone_report_ranges(user_id: Optional[str] = None):
+    """Time zones in use with the first and last report date in each
+
+    Dates are naive UTC, ready for utc_offset_expression.
+    """
+    query = storage.session.query(
+        Profile.timezone,
+        func.min(Report.date),
+        func.max(Report.date)
+    ).join(
+        Activity, Activity.user_id == Profile.user_id
+    ).join(
+        Report, Report.activity_id == Activity.id
+    ).group_by(
+        Profile.timezone
+    )
+    if user_id:
+        query = query.filter(Profile.user_id == user_id)
+
+    for timezone, first, last in query.all():
+        yield timezone, _naive_utc(first), _naive_utc(last)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Naive UTC datetime of a possibly aware one"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(pytz.UTC).replace(tzinfo=None)
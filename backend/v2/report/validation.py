@@ -1,9 +1,14 @@
 """Report validation schemas"""
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, ValidationInfo, field_validator
+from collections import defaultdict
 from datetime import datetime
 import pytz
-from typing import Dict, List
+from typing import Any, Dict, List, Tuple
+from v2.utils.timezones import DEFAULT_TIMEZONE, localize
+
+# Largest number of reports accepted by POST /api/report/batch
+MAX_BATCH_SIZE = 5000
 
 class CreateReportRequest(BaseModel):
     """Validation schema for report creation"""
@@ -15,10 +20,11 @@ class CreateReportRequest(BaseModel):
 
     @field_validator('date')
     @classmethod
-    def validate_date(cls, v: datetime) -> datetime:
-        # Convert naive datetime to UTC if no timezone is provided
-        if v.tzinfo is None:
-            v = v.replace(tzinfo=pytz.UTC)
+    def validate_date(cls, v: datetime, info: ValidationInfo) -> datetime:
+        # Naive datetimes are wall times in the user's zone, passed as the
+        # validation context's timezone (UTC when missing)
+        timezone = (info.context or {}).get('timezone') or DEFAULT_TIMEZONE
+        v = localize(v, timezone)
         
         # Compare with current UTC time
         now = datetime.now(pytz.UTC)
@@ -47,4 +53,41 @@ class DailyReportResponse(BaseModel):
     date: datetime
     total_productive_time: float
     total_wasted_time: float
-    activities: Dict[str, ActivityDailyStats]
\ No newline at end of file
+    activities: Dict[str, ActivityDailyStats]
+
+
+report_list_adapter = TypeAdapter(List[CreateReportRequest])
+
+
+def validate_report_batch(
+    items: List[Any],
+    timezone: str = DEFAULT_TIMEZONE
+) -> Tuple[List[Tuple[int, CreateReportRequest]], List[Dict]]:
+    """Validate a list of report payloads in one pass
+
+    Naive dates are read as wall times in timezone. Returns the valid
+    reports with their position in the list, and one {'index', 'message'}
+    error per invalid item.
+    """
+    context = {'timezone': timezone}
+    try:
+        return list(enumerate(
+            report_list_adapter.validate_python(items, context=context))), []
+    except ValidationError as e:
+        messages = defaultdict(list)
+        for error in e.errors():
+            index, *field = error['loc']
+            location = '.'.join(str(part) for part in field)
+            messages[index].append(
+                f"{location}: {error['msg']}" if location else error['msg'])
+
+    valid = [
+        (index, CreateReportRequest.model_validate(item, context=context))
+        for index, item in enumerate(items)
+        if index not in messages
+    ]
+    errors = [
+        {'index': index, 'message': '; '.join(message)}
+        for index, message in sorted(messages.items())
+    ]
+    return valid, errors
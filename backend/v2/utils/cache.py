@@ -0,0 +1,90 @@
+"""In-process LRU cache with per-entry time to live"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread safe LRU cache whose entries also expire after a TTL
+
+    Usage:
+        cache = TTLCache(maxsize=1024, ttl=60)
+        cache.set(key, value)           # expires after 60 seconds
+        cache.set(key, value, ttl=5)    # or sooner, never later
+        cache.get(key)                  # None when missing or expired
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get a value and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        """Store a value, evicting the least recently used entry if full
+
+        ttl can shorten the cache's default time to live for this entry
+        but never extend it. Entries with no time left are not stored.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key) -> None:
+        """Remove a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate) -> int:
+        """Remove every entry for which predicate(key, value) is true"""
+        with self._lock:
+            stale = [key for key, (_, value) in self._entries.items()
+                     if predicate(key, value)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters with the current size"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,55 @@
+"""Conditional GET support based on the per-user data version
+
+Every activity or report write bumps Profile.data_version in the same
+transaction, so a user's (data_version, request) pair identifies the
+exact response body. Checking If-None-Match then needs one primary key
+lookup instead of the endpoint's queries and serialization.
+"""
+
+import hashlib
+from flask import make_response, request
+from sqlalchemy import update
+from v2.models import storage
+from v2.models.Profile import Profile
+
+
+def get_data_version(user_id: str) -> int:
+    """Current data version of a user, 0 without a profile"""
+    version = storage.session.query(Profile.data_version).filter(
+        Profile.user_id == user_id
+    ).scalar()
+    return version or 0
+
+
+def bump_data_version(user_id: str) -> None:
+    """Increment a user's data version in the current transaction
+
+    Runs as UPDATE ... SET data_version = data_version + 1, so concurrent
+    writes never reuse a version. The caller commits.
+    """
+    storage.session.execute(
+        update(Profile)
+        .where(Profile.user_id == user_id)
+        .values(data_version=Profile.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def data_etag(user_id: str, *variant) -> str:
+    """Strong ETag of a user's data as seen by one representation
+
+    variant holds whatever else changes the body for the same data, like
+    the request path and query or a resolved date window.
+    """
+    version = get_data_version(user_id)
+    key = repr((user_id, version, variant)).encode()
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+
+def not_modified(etag: str):
+    """304 response when the request's If-None-Match matches etag, else None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response('', 304)
+    response.set_etag(etag)
+    return response
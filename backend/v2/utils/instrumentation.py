@@ -0,0 +1,267 @@
+"""Per-route latency, SQL statement and database time metrics
+
+init_app() times every request and counts the statements it issues
+through the storage engine (see v2/engine/queries.py). Each response
+gets a Server-Timing header:
+
+    Server-Timing: db;dur=3.2;desc="4 queries", app;dur=11.8
+
+and the totals per route are served in the Prometheus text format on
+GET /metrics (with METRICS_TOKEN or METRICS_PUBLIC set), next to the connection pool, cache and password hashing
+counters. A request issuing more than QUERY_BUDGET statements logs a
+warning, which is how N+1 query patterns show up.
+
+Statements of a streamed response body run after the response is
+recorded, they are not included.
+"""
+
+import hmac
+import logging
+import threading
+import time
+from os import environ
+from typing import Dict, Iterable, List, Tuple
+from flask import Flask, Response, g, request
+from v2.engine.queries import current_queries, stop_tracking, track_queries
+from v2.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Statements per request above which a warning is logged, 0 disables it
+QUERY_BUDGET = int(environ.get('QUERY_BUDGET', 20))
+
+# Bearer token required by /metrics
+METRICS_TOKEN = environ.get('METRICS_TOKEN')
+
+# Serves /metrics without a token, it is hidden when neither is set
+METRICS_PUBLIC = environ.get('METRICS_PUBLIC', '').lower() in (
+    '1', 'true', 'yes', 'on')
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RouteMetrics:
+    """Histograms and counters of one route"""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.rows = 0
+        self.responses: Dict[int, int] = {}
+
+
+class MetricsRegistry:
+    """Thread safe RouteMetrics keyed by (method, route)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float,
+               statements: int, db_time: float, rows: int) -> None:
+        """Record one finished request"""
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.rows += rows
+            metrics.responses[status] = metrics.responses.get(status, 0) + 1
+        metrics.latency.observe(seconds)
+        metrics.db_time.observe(db_time)
+        metrics.statements.observe(statements)
+
+    def routes(self) -> List[Tuple[Tuple[str, str], RouteMetrics]]:
+        """(method, route) and metrics pairs, sorted by route"""
+        with self._lock:
+            return sorted(self._routes.items(), key=lambda item: item[0][::-1])
+
+    def reset(self) -> None:
+        """Forget every route"""
+        with self._lock:
+            self._routes.clear()
+
+
+route_metrics = MetricsRegistry()
+
+
+def _labels(labels: Dict) -> str:
+    """Prometheus label set"""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def _number(value) -> str:
+    """Prometheus sample value"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class PrometheusWriter:
+    """Collects samples and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        """Sample lines of a metric family, created on first use"""
+        if name not in self._families:
+            self._families[name] = (kind, help_text, [])
+        return self._families[name][2]
+
+    def sample(self, name: str, kind: str, help_text: str, value,
+               **labels) -> None:
+        """Add a counter or gauge sample"""
+        self._family(name, kind, help_text).append(
+            f'{name}{_labels(labels)} {_number(value)}')
+
+    def histogram(self, name: str, help_text: str, snapshot: Dict,
+                  **labels) -> None:
+        """Add the samples of a Histogram snapshot"""
+        lines = self._family(name, 'histogram', help_text)
+        for bound, count in snapshot['buckets'].items():
+            le = '+Inf' if bound == float('inf') else repr(float(bound))
+            lines.append(f'{name}_bucket{_labels({**labels, "le": le})} {count}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(float(snapshot["sum"]))}')
+        lines.append(f'{name}_count{_labels(labels)} {snapshot["count"]}')
+
+    def render(self) -> str:
+        """Every family with its HELP and TYPE lines"""
+        out = []
+        for name, (kind, help_text, lines) in self._families.items():
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+
+
+def _numeric(stats: Dict) -> Iterable[Tuple[str, float]]:
+    """The int and float entries of a stats dictionary"""
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield key, value
+
+
+def render_metrics() -> str:
+    """Every metric of the process in the Prometheus text format"""
+    # Imported here, they pull in the models and the report routes
+    from v2.auth.functions import principal_cache
+    from v2.auth.hashing import password_hasher
+    from v2.models import storage
+    from v2.report.cache import report_cache
+
+    writer = PrometheusWriter()
+    for (method, route), metrics in route_metrics.routes():
+        labels = {'method': method, 'route': route}
+        for status, count in sorted(metrics.responses.items()):
+            writer.sample('timecraft_http_requests_total', 'counter',
+                          'Finished requests by route and status', count,
+                          **labels, status=status)
+        writer.histogram('timecraft_http_request_duration_seconds',
+                         'Request latency by route',
+                         metrics.latency.snapshot(), **labels)
+        writer.histogram('timecraft_db_statements_per_request',
+                         'SQL statements issued per request',
+                         metrics.statements.snapshot(), **labels)
+        writer.histogram('timecraft_db_time_seconds',
+                         'Seconds per request spent in SQL statements',
+                         metrics.db_time.snapshot(), **labels)
+        writer.sample('timecraft_db_rows_total', 'counter',
+                      'Rows returned or changed by SQL statements',
+                      metrics.rows, **labels)
+
+    for key, value in _numeric(storage.pool_status()):
+        writer.sample(f'timecraft_db_pool_{key}', 'gauge',
+                      f'Connection pool {key.replace("_", " ")}', value)
+    for key, value in _numeric(principal_cache.stats()):
+        writer.sample(f'timecraft_principal_cache_{key}', 'gauge',
+                      f'Principal cache {key}', value)
+    for key, value in _numeric(report_cache.stats()):
+        writer.sample(f'timecraft_report_cache_{key}', 'gauge',
+                      f'Report cache {key}', value)
+
+    hashing = password_hasher.stats()
+    for key, value in _numeric(hashing):
+        writer.sample(f'timecraft_password_hash_{key}', 'gauge',
+                      f'Password hashing {key.replace("_", " ")}', value)
+    for key in ('hash_latency', 'verify_latency', 'queue_wait'):
+        writer.histogram(f'timecraft_password_{key}_seconds',
+                         f'Password {key.replace("_", " ")}', hashing[key])
+
+    return writer.render()
+
+
+def _route() -> str:
+    """The route pattern of the request, so IDs don't make new series"""
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return '<unmatched>'
+
+
+def _start_request() -> None:
+    """Start the clock and the statement count of a request"""
+    g.request_started = time.perf_counter()
+    track_queries(f'{request.method} {_route()}')
+
+
+def _finish_request(response: Response) -> Response:
+    """Record the request and add its Server-Timing header"""
+    started = g.pop('request_started', None)
+    queries = current_queries()
+    if started is None or queries is None:
+        return response
+    stop_tracking()
+    elapsed = time.perf_counter() - started
+    route = _route()
+
+    route_metrics.record(request.method, route, response.status_code,
+                         elapsed, queries.statements, queries.db_time,
+                         queries.rows)
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={queries.db_time * 1000:.1f};desc="{queries.statements} queries", '
+        f'app;dur={elapsed * 1000:.1f}'
+    )
+    if QUERY_BUDGET and queries.statements > QUERY_BUDGET:
+        logger.warning('%s %s issued %d SQL statements, over the budget of %d',
+                       request.method, route, queries.statements, QUERY_BUDGET)
+    return response
+
+
+def _teardown_request(error) -> None:
+    """Stop counting statements, also after unhandled errors"""
+    stop_tracking()
+
+
+def metrics_endpoint():
+    """Prometheus metrics of this process
+
+    Answers 404 unless METRICS_TOKEN or METRICS_PUBLIC is set.
+    """
+    if not METRICS_TOKEN and not METRICS_PUBLIC:
+        return Response('Not Found\n', status=404, mimetype='text/plain')
+    if METRICS_TOKEN:
+        expected = f'Bearer {METRICS_TOKEN}'
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), expected.encode()):
+            return Response('Unauthorized\n', status=401,
+                            mimetype='text/plain')
+    return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def init_app(app: Flask) -> None:
+    """Instrument every request of app and serve GET /metrics"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
@@ -0,0 +1,59 @@
+"""Flask JSON provider backed by orjson when it is installed"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Drop-in replacement for Flask's provider that encodes with orjson
+
+    Output matches DefaultJSONProvider: keys are sorted when sort_keys is
+    set, dates go through the same default hook (HTTP dates), and pretty
+    printing follows compact and debug mode. Without orjson, or for
+    objects orjson cannot encode, the stdlib implementation is used.
+    """
+
+    def _options(self, pretty: bool = False) -> int:
+        """orjson option flags mirroring the provider's settings"""
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize obj to a JSON string"""
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes"""
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build a response, encoding straight to bytes"""
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(
+                obj,
+                default=self.default,
+                option=self._options(pretty) | orjson.OPT_APPEND_NEWLINE
+            )
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,78 @@
+"""Latency histograms shared by the instrumented parts of the API"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a fast query to a slow password hash
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Thread safe cumulative histogram in the Prometheus style
+
+    Usage:
+        latency = Histogram()
+        latency.observe(0.12)
+        with latency.time():
+            do_work()
+        latency.snapshot()    # count, sum and cumulative bucket counts
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every observation"""
+        with self._lock:
+            # One count per bucket plus the +Inf bucket
+            self._counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the with block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th quantile
+
+        None without observations, inf when it falls past the last bucket.
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets, self._counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return float('inf')
+
+    def snapshot(self) -> dict:
+        """Count, sum and cumulative counts keyed by upper bound"""
+        with self._lock:
+            cumulative = {}
+            seen = 0
+            for bound, count in zip(self.buckets, self._counts):
+                seen += count
+                cumulative[bound] = seen
+            cumulative[float('inf')] = self.count
+            return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
@@ -5,7 +5,7 @@ from flask import request, abort, jsonify
 from jose import JWTError, jwt
 from os import environ
 from v2.models import storage
-from v2.auth.functions import get_user_by_email
+from v2.auth.functions import get_principal
 
 def auth_middleware(f):
     """Decorator to protect routes that require authentication
@@ -43,8 +43,8 @@ def auth_middleware(f):
                 algorithms=[environ.get('ALGORITHM')]
             )
             
-            # Get user from database
-            current_user = get_user_by_email(payload.get('email'))
+            # Get user from the principal cache or the database
+            current_user = get_principal(payload.get('email'), payload.get('exp'))
             
             if not current_user:
                 return jsonify({
@@ -0,0 +1,122 @@
+"""Per-user time zones for day boundaries, in Python and in SQL
+
+Reports are stored in UTC. A user's days, weeks and months run in the zone
+of their profile, so every "which day is this" question goes through here.
+"""
+
+import bisect
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from sqlalchemy import Date, String, case, cast, func, literal
+import pytz
+
+DEFAULT_TIMEZONE = 'UTC'
+
+
+def validate_timezone(name: str) -> str:
+    """Check that name is an IANA time zone and return it
+
+    Raises:
+        ValueError: If the zone is unknown
+    """
+    try:
+        return pytz.timezone(name).zone
+    except (pytz.UnknownTimeZoneError, AttributeError):
+        raise ValueError(f'Unknown time zone: {name}')
+
+
+def localize(value: datetime, timezone: str) -> datetime:
+    """Attach timezone to a naive datetime, aware ones are returned as is
+
+    Wall times skipped or repeated by a DST change resolve to standard
+    time, like pytz does by default.
+    """
+    if value.tzinfo is not None:
+        return value
+    offset = _fixed_day_offset(timezone, value.date())
+    if offset is not None:
+        return value.replace(tzinfo=offset)
+    return pytz.timezone(timezone).localize(value)
+
+
+@lru_cache(maxsize=4096)
+def _fixed_day_offset(timezone: str, day: date) -> dt_timezone | None:
+    """timezone's offset on day, None when it changes that day
+
+    pytz's localize searches the zone's transitions on every call, bulk
+    imports localize one date per row.
+    """
+    zone = pytz.timezone(timezone)
+    first = zone.localize(datetime.combine(day, time.min)).utcoffset()
+    last = zone.localize(datetime.combine(day, time.max)).utcoffset()
+    return dt_timezone(first) if first == last else None
+
+
+def local_day(value: datetime, timezone: str) -> date:
+    """Calendar day of an aware (or naive UTC) datetime in timezone"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=pytz.UTC)
+    return value.astimezone(pytz.timezone(timezone)).date()
+
+
+def day_start(day: date, timezone: str) -> datetime:
+    """UTC instant at which day begins in timezone"""
+    zone = pytz.timezone(timezone)
+    return zone.localize(datetime.combine(day, time.min)).astimezone(pytz.UTC)
+
+
+def day_end(day: date, timezone: str) -> datetime:
+    """Last UTC instant of day in timezone
+
+    23, 24 or 25 hours after day_start, depending on DST.
+    """
+    return day_start(day + timedelta(days=1), timezone) - timedelta(microseconds=1)
+
+
+def utc_offset_expression(column, timezone: str, first: datetime, last: datetime):
+    """SQL expression for timezone's UTC offset in seconds at column
+
+    For databases without time zone support. The zone's transitions
+    between first and last (naive UTC) become a CASE on column, so the
+    offset is right on both sides of every DST change in that period.
+    """
+    zone = pytz.timezone(timezone)
+    transitions = getattr(zone, '_utc_transition_times', None)
+    if not transitions:
+        # UTC and other zones without transitions have a fixed offset
+        return literal(int(zone.utcoffset(first).total_seconds()))
+
+    offsets = [int(info[0].total_seconds()) for info in zone._transition_info]
+    index = max(bisect.bisect_right(transitions, first) - 1, 0)
+    whens = []
+    for transition, offset in zip(transitions[index + 1:], offsets[index + 1:]):
+        if transition > last:
+            break
+        whens.append((column < transition, offsets[index]))
+        index += 1
+
+    if not whens:
+        return literal(offsets[index])
+    return case(*whens, else_=offsets[index])
+
+
+def local_date_expression(dialect: str, column, timezone,
+                          first: datetime | None = None,
+                          last: datetime | None = None):
+    """SQL expression for the calendar day of a UTC timestamp column
+
+    timezone can be a zone name or a column holding one. PostgreSQL and
+    MySQL convert natively, MySQL needs its time zone tables loaded.
+    SQLite needs a zone name and the first/last UTC timestamps the column
+    can hold, see utc_offset_expression.
+    """
+    if dialect == 'postgresql':
+        return cast(func.timezone(timezone, column), Date)
+    if dialect in ('mysql', 'mariadb'):
+        return func.date(func.convert_tz(column, '+00:00', timezone))
+    if not isinstance(timezone, str):
+        raise ValueError(f'{dialect} needs a time zone name, not a column')
+    if first is None or last is None:
+        first, last = datetime.min, datetime.max
+    offset = utc_offset_expression(column, timezone, first, last)
+    return func.date(column, cast(offset, String) + ' seconds')
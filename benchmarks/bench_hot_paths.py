@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+""" Benchmarks the storage and reporting hot paths against a saved baseline
+
+Usage:
+    python benchmarks/bench_hot_paths.py run [--save baseline.json]
+                                             [-k FILTER] [--rounds 7]
+    python benchmarks/bench_hot_paths.py compare baseline.json [current.json]
+                                             [--threshold 10] [--stat min]
+
+run times every benchmark (or those whose name contains a -k FILTER) and
+prints the time per call, --save writes the results as JSON. compare
+checks results against a baseline, timing the current tree when no
+second file is given, and exits with status 1 when a benchmark got more
+than --threshold percent slower.
+
+Runs against BENCH_DATABASE_URL when it is set, otherwise against a
+throwaway SQLite file removed at exit. DATABASE_URL is deliberately
+ignored so benchmarks never write into a development database. Each
+benchmark seeds its data with a fixed --seed inside
+tests.rollback.rolled_back(), so nothing is kept afterwards. Runs on the same
+machine and database are comparable; a baseline from another machine or
+database is not, compare warns about that.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Make the v2 package and the test helpers importable and point v2 at
+# the benchmark database
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'backend'))
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+if os.environ.get('BENCH_DATABASE_URL'):
+    os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+else:
+    DATABASE_DIRECTORY = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, DATABASE_DIRECTORY, ignore_errors=True)
+    os.environ['DATABASE_URL'] = (
+        'sqlite:///' + os.path.join(DATABASE_DIRECTORY, 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+os.environ.setdefault('ALGORITHM', 'HS256')
+# Slow statements are not written to a slow_queries.log in the work tree
+os.environ.setdefault('SLOW_QUERY_LOG', '')
+
+from flask import Flask  # noqa: E402
+from v2.auth.functions import (  # noqa: E402
+    create_access_token,
+    principal_cache,
+)
+from v2.models import storage  # noqa: E402
+from v2.models.Activity import Activity  # noqa: E402
+from v2.models.Profile import Profile  # noqa: E402
+from v2.models.User import User  # noqa: E402
+from v2.report.functions import (  # noqa: E402
+    format_dates,
+    get_activity_by_id,
+    get_reports_in_range,
+)
+from v2.utils.middleware import auth_middleware  # noqa: E402
+from seed import seed_users  # noqa: E402
+from tests.rollback import rolled_back  # noqa: E402
+
+# (activities, years of reports) of the range report data points
+REPORT_SIZES = ((5, 0.25), (10, 1), (20, 3))
+
+# Benchmark name and the setup returning the function to time
+CASES = {}
+
+
+def case(name):
+    """ Registers a setup(rng) under name """
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def cycle(rng, values):
+    """ A function returning values in a seeded random order, one per call """
+    values = list(values)
+    rng.shuffle(values)
+    position = [0]
+
+    def next_value():
+        position[0] = (position[0] + 1) % len(values)
+        return values[position[0]]
+    return next_value
+
+
+def seed_profiles(rng, users, activities, years):
+    """ Seeds users with benchmarks/seed.py and returns their profiles """
+    prefix = f'bench-{uuid.uuid4().hex[:8]}'
+    seed_users(rng, 0, users, activities, years, prefix, 'not-a-hash')
+    storage.session.commit()
+    return storage.session.query(Profile).filter(
+        Profile.username.like(f'{prefix}-%')).all()
+
+
+@case('storage.get_user')
+def bench_get_user(rng):
+    """ Storage.get_user by unique ID among 100 users """
+    user_ids = [profile.user_id for profile in seed_profiles(rng, 100, 1, 0)]
+    unique_ids = cycle(rng, [
+        unique_id for (unique_id,) in storage.session.query(
+            User.unique_id).filter(User.id.in_(user_ids))
+    ])
+    return lambda: storage.get_user(unique_ids())
+
+
+@case('get_activity_by_id')
+def bench_get_activity_by_id(rng):
+    """ get_activity_by_id among 20 users with 20 activities each """
+    user_ids = [profile.user_id for profile in seed_profiles(rng, 20, 20, 0)]
+    pairs = cycle(rng, storage.session.query(
+        Activity.unique_id, Activity.user_id).filter(
+            Activity.user_id.in_(user_ids)).all())
+
+    def run():
+        activity_id, user_id = pairs()
+        return get_activity_by_id(activity_id, user_id)
+    return run
+
+
+def bench_reports_in_range(n_activities, years, rollup):
+    """ get_reports_in_range over the last year of one user
+
+    Whole days are answered from the rollup, a window shifted by a
+    minute aggregates the report table.
+    """
+    def setup(rng):
+        profile = seed_profiles(rng, 1, n_activities, years)[0]
+        today = date.today()
+        start, end = format_dates(str(today - timedelta(days=365)),
+                                  str(today), profile.timezone)
+        if not rollup:
+            start += timedelta(minutes=1)
+        return lambda: get_reports_in_range(profile.user_id, start, end,
+                                            profile.timezone)
+    return setup
+
+
+for n_activities, years in REPORT_SIZES:
+    for rollup in (True, False):
+        case(f'get_reports_in_range[{"rollup" if rollup else "reports"},'
+             f'{n_activities}x{years:g}y]')(
+            bench_reports_in_range(n_activities, years, rollup))
+
+
+def make_activity(rng):
+    """ A transient Activity with every column set """
+    return Activity(
+        name=f'activity-{rng.randrange(1000)}', description='Deep work',
+        daily_goal=rng.choice((1, 2, 3)), weekly_goal=rng.choice((5, 10)),
+        total_time_on_task=rng.random() * 100, user_id='bench',
+        created_at=datetime(2024, 1, 1) + timedelta(minutes=rng.randrange(10000))
+    )
+
+
+@case('BaseModel.to_dict')
+def bench_to_dict(rng):
+    """ to_dict of an Activity """
+    activity = make_activity(rng)
+    return activity.to_dict
+
+
+@case('BaseModel.__init__')
+def bench_init(rng):
+    """ Activity construction, which generates the id and unique_id """
+    return lambda: Activity(name='activity', daily_goal=1, weekly_goal=5,
+                            user_id='bench')
+
+
+def protected_client():
+    """ A test client of an app with one route behind auth_middleware """
+    app = Flask(__name__)
+
+    @app.route('/protected')
+    @auth_middleware
+    def protected():
+        return '', 204
+    return app.test_client()
+
+
+def bench_auth_middleware(cached):
+    """ A request through auth_middleware, the principal cached or not """
+    def setup(rng):
+        profile = seed_profiles(rng, 1, 1, 0)[0]
+        user = storage.session.get(User, profile.user_id)
+        token = create_access_token(user.email, user.id, timedelta(hours=1))
+        headers = {'Authorization': f'Bearer {token}'}
+        client = protected_client()
+
+        def run():
+            if not cached:
+                principal_cache.clear()
+            response = client.get('/protected', headers=headers)
+            assert response.status_code == 204, response.get_data()
+        return run
+    return setup
+
+
+case('auth_middleware')(bench_auth_middleware(cached=True))
+case('auth_middleware[uncached]')(bench_auth_middleware(cached=False))
+
+
+def measure(fn, rounds):
+    """ Seconds per call of each round, a round lasting at least 0.2s """
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    return loops, [t / loops for t in timer.repeat(rounds, loops)]
+
+
+def run_benchmarks(names, rounds, seed):
+    """ Times the named benchmarks and returns the results document """
+    results = {}
+    for name in names:
+        with rolled_back(storage):
+            fn = CASES[name](random.Random(seed))
+            storage.session.commit()
+            loops, timings = measure(fn, rounds)
+        results[name] = {
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'mean': statistics.fmean(timings),
+            'rounds': rounds,
+            'loops': loops,
+        }
+        print(f'{name:<36} {results[name]["min"] * 1e6:>12.2f} us '
+              f'{results[name]["median"] * 1e6:>12.2f} us {loops:>8}')
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'machine': environment(),
+        'seed': seed,
+        'benchmarks': results,
+    }
+
+
+def environment():
+    """ What the timings depend on besides the code """
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'database': storage.session.get_bind().dialect.name,
+    }
+
+
+def compare(baseline, current, threshold, stat):
+    """ Prints the change of every benchmark, returns the regressed names """
+    if baseline['machine'] != current['machine']:
+        print('warning: the baseline comes from another machine or database:',
+              json.dumps(baseline['machine']))
+    print(f"{'benchmark':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    regressed = []
+    for name in sorted(set(baseline['benchmarks']) | set(current['benchmarks'])):
+        before = baseline['benchmarks'].get(name)
+        after = current['benchmarks'].get(name)
+        if before is None or after is None:
+            label = 'new' if before is None else 'missing'
+            print(f"{name:<36} {'':>12} {'':>12} {label:>8}")
+            continue
+        change = (after[stat] - before[stat]) / before[stat] * 100
+        flag = ''
+        if change > threshold:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<36} {before[stat] * 1e6:>10.2f}us '
+              f'{after[stat] * 1e6:>10.2f}us {change:>+7.1f}%{flag}')
+    return regressed
+
+
+def selected(filters):
+    """ Names of the benchmarks matching any of filters, all without one """
+    return [name for name in CASES
+            if not filters or any(f in name for f in filters)]
+
+
+def main():
+    """ Runs or compares the benchmarks """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--rounds', type=int, default=7)
+    common.add_argument('--seed', type=int, default=1)
+    common.add_argument('-k', dest='filters', action='append',
+                        help='Only benchmarks whose name contains this')
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', parents=[common],
+                                     help='Time the benchmarks')
+    run_parser.add_argument('--save', metavar='FILE',
+                            help='Write the results as JSON')
+
+    compare_parser = commands.add_parser(
+        'compare', parents=[common],
+        help='Fail when a benchmark regressed against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current', nargs='?',
+                                help='Saved results, the tree is timed when missing')
+    compare_parser.add_argument('--threshold', type=float, default=10,
+                                help='Allowed slowdown in percent')
+    compare_parser.add_argument('--stat', choices=('min', 'median', 'mean'),
+                                default='min')
+    compare_parser.add_argument('--save', metavar='FILE',
+                                help='Write the current results as JSON')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if args.filters:
+            baseline['benchmarks'] = {
+                name: result for name, result in baseline['benchmarks'].items()
+                if any(f in name for f in args.filters)
+            }
+
+    if args.command == 'compare' and args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        names = selected(args.filters)
+        if args.command == 'compare':
+            names = [name for name in names if name in baseline['benchmarks']]
+        print(f"{'benchmark':<36} {'min':>15} {'median':>15} {'loops':>8}")
+        current = run_benchmarks(names, args.rounds, args.seed)
+        print()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.command == 'compare':
+        regressed = compare(baseline, current, args.threshold, args.stat)
+        if regressed:
+            print(f'{len(regressed)} benchmark(s) more than {args.threshold:g}% '
+                  f'slower: {", ".join(regressed)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
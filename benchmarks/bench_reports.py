@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+""" Benchmarks the range report as activity and report counts grow
+
+Usage:
+    python benchmarks/bench_reports.py [--activities 10 50 200]
+                                       [--reports 10 100] [--repeat 5]
+
+Runs against DATABASE_URL when it is set, otherwise against a throwaway
+SQLite file. Each data point seeds a fresh user and compares the grouped
+aggregate query with the previous one-query-per-activity implementation.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytz
+
+# Make the v2 package importable and fall back to a local SQLite database
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault(
+    'DATABASE_URL',
+    'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+)
+# Slow statements are not written to a slow_queries.log in the work tree
+os.environ.setdefault('SLOW_QUERY_LOG', '')
+
+from sqlalchemy import insert  # noqa: E402
+from v2.models import storage  # noqa: E402
+from v2.models.User import User  # noqa: E402
+from v2.models.Profile import Profile  # noqa: E402
+from v2.models.Activity import Activity  # noqa: E402
+from v2.models.Report import Report  # noqa: E402
+from v2.report.functions import (  # noqa: E402
+    get_activity_reports,
+    get_reports_in_range,
+    get_user_activities,
+)
+
+START = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+END = datetime(2024, 12, 31, 23, 59, 59, 999999, tzinfo=pytz.UTC)
+
+
+def legacy_reports_in_range(user_id, start_date, end_date):
+    """ The previous N+1 implementation, kept as the comparison point """
+    total_productive_time = 0
+    total_wasted_time = 0
+    activities_data = {}
+    for activity in get_user_activities(user_id):
+        reports = get_activity_reports(activity, start_date, end_date)
+        if reports:
+            productive_time = sum(r.time_on_task for r in reports)
+            wasted_time = sum(r.time_wasted for r in reports)
+            total_productive_time += productive_time
+            total_wasted_time += wasted_time
+            activities_data[activity.name] = {
+                'total_time_on_task': productive_time,
+                'total_time_wasted': wasted_time,
+            }
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_productive_time': total_productive_time,
+        'total_wasted_time': total_wasted_time,
+        'activities': activities_data
+    }
+
+
+def _row(**values):
+    """ Column values BaseModel.__init__ would otherwise generate """
+    now = datetime.now()
+    return {
+        'id': str(uuid.uuid4()),
+        'unique_id': uuid.uuid4().hex[:8],
+        'created_at': now,
+        'updated_at': now,
+        **values
+    }
+
+
+def seed_user(n_activities, n_reports):
+    """ Creates a user with n_activities, each holding n_reports """
+    user = _row(email=f'{uuid.uuid4().hex}@bench.local', password='x')
+    profile = _row(
+        user_id=user['id'], full_name='Bench', username=uuid.uuid4().hex,
+        profile_picture_url='', bio='', location='',
+        weekly_work_hours_goal=40, number_of_work_days=5,
+        total_productive_time=0, total_wasted_time=0
+    )
+    activities = [
+        _row(name=f'activity-{i}', daily_goal=1, weekly_goal=5,
+             total_time_on_task=0, user_id=user['id'])
+        for i in range(n_activities)
+    ]
+    step = timedelta(days=365) / max(n_reports, 1)
+    reports = [
+        _row(activity_id=activity['id'], date=START + step * j,
+             time_on_task=1.5, time_wasted=0.25)
+        for activity in activities
+        for j in range(n_reports)
+    ]
+
+    session = storage.session
+    session.execute(insert(User), [user])
+    session.execute(insert(Profile), [profile])
+    session.execute(insert(Activity), activities)
+    if reports:
+        session.execute(insert(Report), reports)
+    session.commit()
+    return user['id']
+
+
+def best_of(repeat, fn, *args):
+    """ Returns the fastest of `repeat` runs in milliseconds """
+    timings = []
+    for _ in range(repeat):
+        storage.session.expunge_all()
+        started = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    """ Runs the benchmark grid and prints a table """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--activities', type=int, nargs='+',
+                        default=[10, 50, 200])
+    parser.add_argument('--reports', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'activities':>10} {'reports':>8} {'rows':>8} "
+          f"{'legacy ms':>10} {'grouped ms':>11} {'speedup':>8}")
+    for n_activities in args.activities:
+        for n_reports in args.reports:
+            user_id = seed_user(n_activities, n_reports)
+            legacy = best_of(args.repeat, legacy_reports_in_range,
+                             user_id, START, END)
+            grouped = best_of(args.repeat, get_reports_in_range,
+                              user_id, START, END)
+            print(f'{n_activities:>10} {n_reports:>8} '
+                  f'{n_activities * n_reports:>8} {legacy:>10.2f} '
+                  f'{grouped:>11.2f} {legacy / grouped:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+""" Benchmarks serializing activity lists into a JSON response
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 1000] [--repeat 100]
+
+Compares the previous path (a hand built dict per activity, stdlib json
+pretty printed like JSONIFY_PRETTYPRINT_REGULAR) with the shared
+ModelSerializer and FastJSONProvider. No database is needed, the
+activities are transient model instances.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Make the v2 package importable, models need a DATABASE_URL to import
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault(
+    'DATABASE_URL',
+    'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+)
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from v2.models.Activity import Activity  # noqa: E402
+from v2.activity.functions import activity_serializer  # noqa: E402
+from v2.utils import json_provider  # noqa: E402
+from v2.utils.json_provider import FastJSONProvider  # noqa: E402
+
+
+def make_activities(n_rows):
+    """ Builds n_rows activities with every serialized field set """
+    started = datetime(2024, 1, 1)
+    return [
+        Activity(name=f'activity-{i}', description='Deep work on the thesis',
+                 daily_goal=2, weekly_goal=10, total_time_on_task=i * 0.5,
+                 user_id='bench', created_at=started + timedelta(minutes=i))
+        for i in range(n_rows)
+    ]
+
+
+def legacy_dump(activities):
+    """ The previous per-endpoint dict building """
+    return [
+        {
+            'id': activity.id,
+            'unique_id': activity.unique_id,
+            'name': activity.name,
+            'description': activity.description,
+            'daily_goal': activity.daily_goal,
+            'weekly_goal': activity.weekly_goal,
+            'total_time_on_task': activity.total_time_on_task,
+            'created_at': activity.created_at.isoformat(),
+            'updated_at': activity.updated_at.isoformat()
+        }
+        for activity in activities
+    ]
+
+
+def best_of(repeat, fn):
+    """ Returns the fastest of `repeat` runs in milliseconds and the result """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def main():
+    """ Runs each serialization path and prints a table """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    legacy = DefaultJSONProvider(app)
+    legacy.compact = False
+    legacy_compact = DefaultJSONProvider(app)
+    legacy_compact.compact = True
+    fast = FastJSONProvider(app)
+    fast.compact = True
+    activities = make_activities(args.rows)
+
+    def respond(provider, dump):
+        """ Serializes the activities into a response body """
+        return provider.response({
+            'message': 'Activities retrieved successfully',
+            'data': dump(activities),
+            'next_cursor': None
+        }).get_data()
+
+    paths = [
+        ('legacy dicts, pretty stdlib', lambda: respond(legacy, legacy_dump)),
+        ('serializer, compact stdlib',
+         lambda: respond(legacy_compact, activity_serializer.dump_many)),
+        (f"serializer, compact {'orjson' if json_provider.orjson else 'stdlib'}",
+         lambda: respond(fast, activity_serializer.dump_many)),
+    ]
+    print(f"{'path':<30} {'ms':>8} {'bytes':>9} {'speedup':>8}")
+    baseline = None
+    with app.app_context():
+        for name, fn in paths:
+            elapsed, body = best_of(args.repeat, fn)
+            baseline = baseline or elapsed
+            print(f'{name:<30} {elapsed:>8.2f} {len(body):>9} '
+                  f'{baseline / elapsed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
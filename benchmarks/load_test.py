@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+""" Replays a mix of API calls from concurrent users and reports latencies
+
+Usage:
+    python benchmarks/load_test.py [--threads 8] [--duration 30]
+                                   [--requests N] [--users 100]
+                                   [--url http://localhost:5000]
+                                   [--seed-users N] [--json results.json]
+
+Each thread is a user seeded by benchmarks/seed.py (same --prefix and
+--password) that logs in, lists its activities and then loops over
+
+    login            POST /api/auth/login
+    create-report    POST /api/report
+    list-activities  GET /api/activity
+    range-report     GET /api/report?start_date=..&end_date=..
+
+picked by the --mix weights, until --duration seconds passed or
+--requests calls were made. Without --url the calls go through the Flask
+test client in this process, against DATABASE_URL (SQLite or a local
+PostgreSQL), with --url they are real HTTP requests to a running server.
+--seed-users seeds that many users first, handy with the default
+throwaway SQLite database.
+
+Prints the requests, errors (status 400 and up), throughput and the
+p50/p95/p99 latencies per endpoint and overall, --json also writes them
+to a file so runs can be compared before each deploy.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+DEFAULT_MIX = {
+    'login': 5,
+    'create-report': 25,
+    'list-activities': 35,
+    'range-report': 35,
+}
+
+# Login of the i-th user seeded by benchmarks/seed.py
+EMAIL = '{prefix}-{i}@loadtest.example.com'
+
+# Days covered by a range report, today, a week, a month and a quarter
+REPORT_SPANS = (0, 6, 29, 89)
+
+
+class InProcessClient:
+    """ Calls the app through the Flask test client """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def call(self, method, path, body=None, token=None):
+        """ Returns the status code and the decoded JSON body """
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.client.open(path, method=method, json=body,
+                                    headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """ Calls a running server over HTTP """
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def call(self, method, path, body=None, token=None):
+        """ Returns the status code and the decoded JSON body """
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data,
+                                         headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+
+class Results:
+    """ Latencies and errors per endpoint of one thread """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def merge(self, other):
+        """ Adds the calls of other """
+        for name, latencies in other.latencies.items():
+            self.latencies[name].extend(latencies)
+        for name, errors in other.errors.items():
+            self.errors[name] += errors
+
+
+class Budget:
+    """ Shared stop condition, a deadline and an optional request count """
+
+    def __init__(self, duration, requests):
+        self.deadline = time.monotonic() + duration if duration else None
+        self.remaining = requests
+        self._lock = threading.Lock()
+
+    def take(self):
+        """ False once the run is over """
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return False
+        if self.remaining is None:
+            return True
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class VirtualUser:
+    """ One seeded user calling the API in a loop """
+
+    def __init__(self, client, email, password, mix, rng, results):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.rng = rng
+        self.results = results
+        self.token = None
+        self.activities = []
+
+    def timed(self, name, method, path, body=None):
+        """ Makes one call and records its latency """
+        started = time.perf_counter()
+        try:
+            status, payload = self.client.call(method, path, body, self.token)
+        except Exception:
+            status, payload = None, None
+        self.results.latencies[name].append(time.perf_counter() - started)
+        if status is None or status >= 400:
+            self.results.errors[name] += 1
+        return status, payload
+
+    def login(self):
+        """ POST /api/auth/login """
+        status, payload = self.timed('login', 'POST', '/api/auth/login', {
+            'email': self.email, 'password': self.password})
+        if status == 200:
+            self.token = payload['data']['token']
+        return status
+
+    def list_activities(self):
+        """ GET /api/activity """
+        status, payload = self.timed('list-activities', 'GET', '/api/activity')
+        if status == 200:
+            self.activities = [a['unique_id'] for a in payload['data']]
+        return status
+
+    def create_report(self):
+        """ POST /api/report on one of the user's activities """
+        if not self.activities:
+            return self.list_activities()
+        when = datetime.now(timezone.utc) - timedelta(
+            minutes=self.rng.randint(1, 7 * 24 * 60))
+        time_on_task = self.rng.choice((0.25, 0.5, 1, 1.5, 2, 3))
+        return self.timed('create-report', 'POST', '/api/report', {
+            'activity_id': self.rng.choice(self.activities),
+            'date': when.isoformat(),
+            'time_on_task': time_on_task,
+            'time_wasted': self.rng.choice((0, 0, 0.25, 0.5)),
+        })[0]
+
+    def range_report(self):
+        """ GET /api/report over a day, week, month or quarter """
+        end = date.today() - timedelta(days=self.rng.randint(0, 365))
+        start = end - timedelta(days=self.rng.choice(REPORT_SPANS))
+        return self.timed(
+            'range-report', 'GET',
+            f'/api/report?start_date={start:%Y-%m-%d}&end_date={end:%Y-%m-%d}'
+        )[0]
+
+    def run(self, budget):
+        """ Calls the API until the budget runs out """
+        actions = {
+            'login': self.login,
+            'create-report': self.create_report,
+            'list-activities': self.list_activities,
+            'range-report': self.range_report,
+        }
+        if budget.take() and self.login() == 200 and budget.take():
+            self.list_activities()
+        while self.token and budget.take():
+            name = self.rng.choices(self.names, self.weights)[0]
+            if actions[name]() == 401 and name != 'login':
+                # The token expired, log in again on the next turn
+                self.login()
+
+
+def percentile(ordered, p):
+    """ Nearest rank percentile of a sorted list """
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(name, latencies, errors, elapsed):
+    """ Requests, errors, throughput and latency percentiles in ms """
+    ordered = sorted(latencies)
+    return {
+        'endpoint': name,
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'max_ms': (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+
+def run(client_factory, threads, users, prefix, password, mix, duration,
+        requests, seed):
+    """ Runs the load test and returns the summary per endpoint """
+    budget = Budget(duration, requests)
+    results = [Results() for _ in range(threads)]
+    virtual_users = [
+        VirtualUser(client_factory(), EMAIL.format(prefix=prefix, i=i % users),
+                    password, mix, random.Random(seed + i), results[i])
+        for i in range(threads)
+    ]
+    workers = [threading.Thread(target=user.run, args=(budget,))
+               for user in virtual_users]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    total = Results()
+    for result in results:
+        total.merge(result)
+    rows = [summarize(name, total.latencies[name], total.errors[name], elapsed)
+            for name in DEFAULT_MIX if total.latencies[name]]
+    rows.append(summarize(
+        'all', [t for latencies in total.latencies.values() for t in latencies],
+        sum(total.errors.values()), elapsed))
+    return {'threads': threads, 'elapsed': elapsed, 'endpoints': rows}
+
+
+def parse_mix(values):
+    """ name=weight pairs over the default mix """
+    mix = dict(DEFAULT_MIX)
+    for value in values or ():
+        name, _, weight = value.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'Unknown endpoint {name}')
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main():
+    """ Runs the load test and prints a table """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Seconds to run, 0 to only stop at --requests')
+    parser.add_argument('--requests', type=int,
+                        help='Stop after this many calls')
+    parser.add_argument('--users', type=int, default=100,
+                        help='Seeded users to spread the threads over')
+    parser.add_argument('--prefix', default='load')
+    parser.add_argument('--password', default='load-test-password')
+    parser.add_argument('--mix', nargs='+', metavar='ENDPOINT=WEIGHT',
+                        help=f'Override weights of {", ".join(DEFAULT_MIX)}')
+    parser.add_argument('--url', help='Base URL of a running server')
+    parser.add_argument('--seed-users', type=int, default=0,
+                        help='Seed this many users before the run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='FILE',
+                        help='Also write the results as JSON')
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error('Give a --duration or a number of --requests')
+    mix = parse_mix(args.mix)
+
+    if args.url:
+        def client_factory():
+            return HttpClient(args.url)
+    else:
+        # Make the v2 package importable and fall back to a local SQLite
+        # database, like the other benchmarks
+        sys.path.append(str(Path(__file__).resolve().parents[1] / 'backend'))
+        os.environ.setdefault(
+            'DATABASE_URL',
+            'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load.db')
+        )
+        # Slow statements are not written to a slow_queries.log in the
+        # work tree
+        os.environ.setdefault('SLOW_QUERY_LOG', '')
+        from v2.app import app
+
+        def client_factory():
+            return InProcessClient(app)
+
+    if args.seed_users:
+        from seed import seed_dataset
+        seed_dataset(args.seed_users, 8, 1, args.seed, args.prefix,
+                     args.password)
+        args.users = args.seed_users
+
+    summary = run(client_factory, args.threads, args.users, args.prefix,
+                  args.password, mix, args.duration, args.requests, args.seed)
+
+    print(f"{'endpoint':<16} {'requests':>9} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for row in summary['endpoints']:
+        print(f"{row['endpoint']:<16} {row['requests']:>9} {row['errors']:>7} "
+              f"{row['throughput']:>8.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+              f"{row['max_ms']:>8.1f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({**summary, 'mix': mix, 'url': args.url}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
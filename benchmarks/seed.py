@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+""" Seeds a database with synthetic users, activities and years of reports
+
+Usage:
+    python benchmarks/seed.py [--users 100] [--activities 8] [--years 2]
+                              [--seed 1] [--prefix load] [--password ...]
+
+Writes to DATABASE_URL when it is set, otherwise to a throwaway SQLite
+file. User i logs in as <prefix>-<i>@loadtest.example.com with --password, which
+is what benchmarks/load_test.py expects. The same --seed gives the same
+dataset apart from the IDs, a second run into the same database needs
+another --prefix.
+
+Users log something on most weekdays and on some weekend days, one to
+four reports a day between 07:00 and 22:00 in their own timezone. A few
+activities get most of the time, report lengths are quarter hours
+skewed towards short sessions and part of each one is wasted. Rows are
+written with bulk inserts, together with the rollup and the activity and
+profile totals the API would have kept.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytz
+
+# Make the v2 package importable and fall back to a local SQLite database
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'backend'))
+os.environ.setdefault(
+    'DATABASE_URL',
+    'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'seed.db')
+)
+# Slow statements are not written to a slow_queries.log in the work tree
+os.environ.setdefault('SLOW_QUERY_LOG', '')
+
+from sqlalchemy import insert  # noqa: E402
+from v2.auth.hashing import password_hasher  # noqa: E402
+from v2.models import storage  # noqa: E402
+from v2.models.User import User  # noqa: E402
+from v2.models.Profile import Profile  # noqa: E402
+from v2.models.Activity import Activity  # noqa: E402
+from v2.models.Report import Report  # noqa: E402
+from v2.report.functions import insert_reports  # noqa: E402
+from v2.report.rollup import (  # noqa: E402
+    apply_rollup_deltas,
+    collect_rollup_deltas,
+)
+
+DEFAULT_PASSWORD = 'load-test-password'
+
+TIMEZONES = ('UTC', 'Europe/London', 'Europe/Berlin', 'Africa/Addis_Ababa',
+             'America/New_York', 'America/Los_Angeles', 'Asia/Tokyo')
+
+ACTIVITY_NAMES = ('Deep work', 'Email', 'Meetings', 'Reading', 'Coding',
+                  'Writing', 'Exercise', 'Language practice', 'Planning',
+                  'Code review', 'Research', 'Side project')
+
+# Chance of logging anything on a weekday and on a weekend day
+ACTIVE_WEEKDAY = 0.85
+ACTIVE_WEEKEND = 0.35
+
+# Reports on an active day and how often each count happens
+REPORTS_PER_DAY = (1, 2, 3, 4)
+REPORTS_PER_DAY_WEIGHTS = (30, 35, 25, 10)
+
+
+def email(prefix, i):
+    """ Login of the i-th seeded user """
+    return f'{prefix}-{i}@loadtest.example.com'
+
+
+def quarter_hours(hours):
+    """ hours rounded to a quarter hour """
+    return round(hours * 4) / 4
+
+
+def user_reports(rng, activities, timezone, first_day, last_day):
+    """ Report rows of one user between first_day and last_day
+
+    activities are Activity rows, the first ones are picked the most
+    (Zipf weights).
+    """
+    zone = pytz.timezone(timezone)
+    weights = [1 / (rank + 1) for rank in range(len(activities))]
+    rows = []
+    day = first_day
+    while day <= last_day:
+        active = ACTIVE_WEEKDAY if day.weekday() < 5 else ACTIVE_WEEKEND
+        if rng.random() < active:
+            count = rng.choices(REPORTS_PER_DAY, REPORTS_PER_DAY_WEIGHTS)[0]
+            for activity in rng.choices(activities, weights, k=count):
+                # Median session of an hour, a long tail up to 8 hours
+                time_on_task = min(8, max(
+                    0.25, quarter_hours(rng.lognormvariate(0, 0.6))))
+                time_wasted = quarter_hours(
+                    time_on_task * rng.betavariate(2, 8))
+                local = datetime(day.year, day.month, day.day,
+                                 rng.randint(7, 21), rng.choice((0, 15, 30, 45)))
+                rows.append(Report.new_row(
+                    activity_id=activity['id'],
+                    date=zone.localize(local).astimezone(pytz.UTC),
+                    time_on_task=time_on_task,
+                    time_wasted=time_wasted,
+                    comment=None
+                ))
+        day += timedelta(days=1)
+    return rows
+
+
+def seed_users(rng, first, count, n_activities, years, prefix, hashed):
+    """ Inserts users first to first + count with their data
+
+    Returns the number of reports written.
+    """
+    last_day = date.today() - timedelta(days=1)
+    first_day = last_day - timedelta(days=round(365.25 * years))
+    users, profiles, activities, reports = [], [], [], []
+    deltas = defaultdict(list)
+
+    for i in range(first, first + count):
+        user = User.new_row(email=email(prefix, i), password=hashed)
+        timezone = rng.choice(TIMEZONES)
+        names = rng.sample(ACTIVITY_NAMES, min(n_activities, len(ACTIVITY_NAMES)))
+        names += [f'Activity {n}' for n in range(len(names), n_activities)]
+        user_activities = [
+            Activity.new_row(
+                name=name, description=None, user_id=user['id'],
+                daily_goal=rng.choice((0.5, 1, 2, 3)),
+                weekly_goal=rng.choice((2, 5, 10, 15)),
+                total_time_on_task=0
+            )
+            for name in names
+        ]
+        rows = user_reports(rng, user_activities, timezone, first_day, last_day)
+
+        totals = defaultdict(float)
+        for row in rows:
+            totals[row['activity_id']] += row['time_on_task']
+        for activity in user_activities:
+            activity['total_time_on_task'] = totals[activity['id']]
+
+        profiles.append(Profile.new_row(
+            user_id=user['id'], full_name=f'Load Test {i}',
+            username=f'{prefix}-{i}', profile_picture_url='', bio='',
+            location='', weekly_work_hours_goal=rng.choice((20, 30, 40)),
+            number_of_work_days=rng.choice((4, 5, 6)),
+            total_productive_time=sum(row['time_on_task'] for row in rows),
+            total_wasted_time=sum(row['time_wasted'] for row in rows),
+            timezone=timezone, data_version=0
+        ))
+        users.append(user)
+        activities.extend(user_activities)
+        reports.extend(rows)
+        deltas[timezone].extend(
+            {**row, 'user_id': user['id']} for row in rows)
+
+    session = storage.session
+    session.execute(insert(User.__table__), users)
+    session.execute(insert(Profile.__table__), profiles)
+    session.execute(insert(Activity.__table__), activities)
+    if reports:
+        insert_reports(reports)
+    for timezone, rows in deltas.items():
+        apply_rollup_deltas(collect_rollup_deltas(rows, timezone))
+    session.commit()
+    return len(reports)
+
+
+def seed_dataset(users, activities, years, seed=1, prefix='load',
+                 password=DEFAULT_PASSWORD, batch_size=20):
+    """ Seeds users users, batch_size of them per transaction
+
+    Returns the number of reports written.
+    """
+    rng = random.Random(seed)
+    # Every user shares one hash, hashing is the slow part otherwise
+    hashed = password_hasher.hash(password)
+    written = 0
+    for first in range(0, users, batch_size):
+        written += seed_users(rng, first, min(batch_size, users - first),
+                              activities, years, prefix, hashed)
+    return written
+
+
+def main():
+    """ Seeds the database and prints what was written """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--activities', type=int, default=8)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--prefix', default='load',
+                        help='Start of the seeded emails and usernames')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--batch-size', type=int, default=20,
+                        help='Users per transaction')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    reports = seed_dataset(args.users, args.activities, args.years, args.seed,
+                           args.prefix, args.password, args.batch_size)
+    elapsed = time.perf_counter() - started
+    print(f'{args.users} users, {args.users * args.activities} activities, '
+          f'{reports} reports in {elapsed:.1f}s '
+          f'({reports / max(elapsed, 1e-9):,.0f} reports/s)')
+    print(f'Log in as {email(args.prefix, 0)} .. '
+          f'{email(args.prefix, args.users - 1)} with password {args.password}')
+    print(f"DATABASE_URL={os.environ['DATABASE_URL']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+""" Rolled back storage transactions for the tests and benchmarks
+
+Sessions inside rolled_back() share one connection and turn their
+commits and rollbacks into SAVEPOINTs, so nothing the block writes is
+kept. The connection is shared by every thread, so only one thread at a
+time may use the database inside the block.
+"""
+from contextlib import contextmanager
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+
+@contextmanager
+def rolled_back(storage):
+    """ Runs the block in a transaction that is rolled back at its end """
+    storage.close()
+    connection = storage.engine.connect()
+    transaction = connection.begin()
+    sqlite = connection.dialect.name == 'sqlite'
+    if sqlite:
+        # pysqlite only opens a transaction before INSERT, UPDATE and
+        # DELETE, so releasing the first SAVEPOINT would commit it
+        driver_connection = connection.connection.driver_connection
+        driver_connection.isolation_level = None
+        connection.exec_driver_sql('BEGIN')
+
+    sessions = storage.sessions
+    storage.sessions = scoped_session(sessionmaker(
+        bind=connection, expire_on_commit=False,
+        join_transaction_mode='create_savepoint'))
+    try:
+        yield connection
+    finally:
+        storage.sessions.remove()
+        storage.sessions = sessions
+        transaction.rollback()
+        if sqlite:
+            driver_connection.isolation_level = ''
+        connection.close()
@@ -1,10 +1,12 @@
 #!/usr/bin/python3
 """ This module contains tests for timecraft.py """
+import json
 import unittest
 import sys
+import uuid
 from io import StringIO
 from unittest.mock import patch
-from timecraft import TcCommand
+from timecraft import TcCommand, run_batch
 from models import storage
 from models.basemodel import BaseModel
 from models.user import User
@@ -29,5 +31,78 @@ class TestCommmands(unittest.TestCase):
         self.assert_stdout("Bye!", 'quit')
 
 
+class TestBatch(unittest.TestCase):
+    """ Tests running report commands from a file with --batch """
+
+    def setUp(self):
+        """ Creates a user with a task logged on two days """
+        storage.rollback()
+        self.user = User(username=f'batch-{uuid.uuid4().hex[:8]}',
+                         weekly_work_hours_goal=40, number_of_work_days=5,
+                         total_productive_time=3.5, total_wasted_time=1)
+        storage.new(self.user)
+        storage.save()
+        self.task = Task(task_name=f'study-{uuid.uuid4().hex[:8]}',
+                         daily_goal=2, weekly_goal=10,
+                         user_id=self.user.unique_id)
+        storage.new(self.task)
+        storage.save()
+        for day, time_on_task in ((4, 2), (5, 1.5)):
+            storage.new(DailyLog(month="March", day=day, year=2024,
+                                 date=f"March.{day}.2024",
+                                 task_id=self.task.unique_id,
+                                 time_on_task=time_on_task, time_wasted=0.5,
+                                 day_of_week="Monday"))
+        storage.save()
+
+    def run_lines(self, *lines):
+        """ Returns the failures and parsed output of a batch """
+        out = StringIO()
+        failures = run_batch(lines, out)
+        return failures, [json.loads(line) for line in
+                          out.getvalue().splitlines()]
+
+    def test_reports(self):
+        """ Every report command prints one JSON object """
+        user_id = self.user.unique_id
+        failures, results = self.run_lines(
+            f"daily_report {user_id} 2024-03-04",
+            "",
+            "# comment",
+            f"weekly_report {user_id} 2024-03-06",
+            f"monthly_report {user_id} March 2024",
+            f"all_tasks {user_id}",
+            f"total_productive_time {user_id}")
+
+        self.assertEqual(failures, 0)
+        self.assertEqual([result['line'] for result in results],
+                         [1, 4, 5, 6, 7])
+        daily, weekly, monthly, tasks, productive = \
+            [result['report'] for result in results]
+        self.assertEqual(daily['ttot_day'], 2)
+        self.assertEqual(daily['tasks'],
+                         [{'name': self.task.task_name, 'ttot': 2}])
+        self.assertEqual(weekly['ttot_week'], 3.5)
+        self.assertEqual(weekly['twt_week'], 1)
+        self.assertEqual(monthly['ttot_month'], 3.5)
+        self.assertEqual(tasks['tasks'][0]['name'], self.task.task_name)
+        self.assertEqual(productive, {'tpt': 3.5})
+
+    def test_errors(self):
+        """ Bad lines are reported and do not stop the batch """
+        user_id = self.user.unique_id
+        failures, results = self.run_lines(
+            "fly_report x",
+            "daily_report",
+            "daily_report nobody00",
+            f"daily_report {user_id} March-4",
+            f"daily_report {user_id} 1999-01-01")
+
+        self.assertEqual(failures, 4)
+        self.assertEqual([('error' in result) for result in results],
+                         [True, True, True, True, False])
+        self.assertIsNone(results[4]['report'])
+
+
 if __name__ == '__main__':
     unittest.main()
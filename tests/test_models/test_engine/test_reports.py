@@ -0,0 +1,191 @@
+#!/usr/bin/python
+""" This module contains tests for the report queries of storage.py """
+import random
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from models import storage
+from models.user import User
+from models.task import Task
+from models.dailylog import DailyLog
+
+
+def tally(tasks):
+    """ The per-task list the old report endpoints built """
+    task_names = set(task['name'] for task in tasks)
+    task_tally_dict = {name: 0 for name in task_names}
+    for task in tasks:
+        for name in task_names:
+            if task['name'] == name:
+                task_tally_dict[name] += task['ttot']
+    return [{'name': name, 'ttot': tally} for name, tally in
+            task_tally_dict.items()]
+
+
+def old_daily_report(user_id, date):
+    """ The daily report as computed before the grouped queries """
+    logs = storage.get_logs_of_the_day(date)
+    if not logs:
+        return None
+    tasks = []
+    ttot_day = 0
+    twt_day = 0
+    for log in logs:
+        task = storage.get_task(log.task_id)
+        if task.user_id == user_id:
+            tasks.append({'name': task.task_name, 'ttot': log.time_on_task})
+            ttot_day += log.time_on_task
+            twt_day += log.time_wasted
+    return {
+        'ttot_day': ttot_day,
+        'twt_day': twt_day,
+        'date': date.replace(".", " "),
+        'weekday': datetime.strptime(date, "%B.%d.%Y").strftime("%A"),
+        'tasks': tally(tasks),
+    }
+
+
+def old_weekly_report(user_id, date):
+    """ The weekly report as computed before the grouped queries """
+    start_date = date - timedelta(days=date.weekday())
+    end_date = start_date + timedelta(days=6)
+    tasks = []
+    ttot_week = 0
+    twt_week = 0
+    day = start_date
+    while day < end_date:
+        for log in storage.get_logs_of_the_day(day.strftime("%B.%-d.%Y")):
+            task = storage.get_task(log.task_id)
+            if task.user_id == user_id:
+                tasks.append({'name': task.task_name,
+                              'ttot': log.time_on_task})
+                ttot_week += log.time_on_task
+                twt_week += log.time_wasted
+        day += timedelta(days=1)
+    return {
+        'ttot_week': ttot_week,
+        'twt_week': twt_week,
+        'start_date': start_date.strftime("%a, %d %b, %Y"),
+        'end_date': end_date.strftime("%a, %d %b, %Y"),
+        'tasks': tally(tasks),
+    }
+
+
+def old_monthly_report(user_id, month, year):
+    """ The monthly report as computed before the grouped queries """
+    logs_of_the_month = [log for log in storage.get_logs_of_the_day()
+                         if log.year == year and log.month == month]
+    if not logs_of_the_month:
+        return None
+    tasks = []
+    ttot_month = 0
+    twt_month = 0
+    for log in logs_of_the_month:
+        task = storage.get_task(log.task_id)
+        if task.user_id == user_id:
+            tasks.append({'name': task.task_name, 'ttot': log.time_on_task})
+            ttot_month += log.time_on_task
+            twt_month += log.time_wasted
+    return {
+        'ttot_month': ttot_month,
+        'twt_month': twt_month,
+        'month': month,
+        'year': year,
+        'tasks': tally(tasks),
+    }
+
+
+def normalized(report):
+    """ A report with its tasks in name order, the old order was random """
+    if report is None:
+        return None
+    return dict(report, tasks=sorted(report['tasks'],
+                                     key=lambda task: task['name']))
+
+
+class TestReportQueries(unittest.TestCase):
+    """ Compares the grouped report queries with the old loops """
+
+    @classmethod
+    def setUpClass(cls):
+        """ Seeds three users with tasks and random logs in 2031 """
+        storage.rollback()
+        rng = random.Random(19)
+        prefix = uuid.uuid4().hex[:6]
+        cls.users = []
+        tasks = []
+        for number in range(3):
+            user = User(username=f'report-{prefix}-{number}',
+                        weekly_work_hours_goal=40, number_of_work_days=5,
+                        total_productive_time=0, total_wasted_time=0)
+            storage.new(user)
+            cls.users.append(user)
+        storage.save()
+        for number in range(7):
+            task = Task(task_name=f'task-{prefix}-{number}', daily_goal=1,
+                        weekly_goal=5,
+                        user_id=cls.users[number % 3].unique_id)
+            storage.new(task)
+            tasks.append(task)
+        storage.save()
+
+        day = datetime(2031, 1, 1)
+        while day.year == 2031 and day.month <= 3:
+            # Quarter hours add up the same in any order
+            for task in rng.sample(tasks, rng.randint(0, 4)):
+                storage.new(DailyLog(
+                    month=day.strftime("%B"), day=day.day, year=day.year,
+                    date=day.strftime("%B.%-d.%Y"), task_id=task.unique_id,
+                    time_on_task=rng.randint(0, 24) / 4,
+                    time_wasted=rng.randint(0, 8) / 4,
+                    day_of_week=day.strftime("%A")))
+            day += timedelta(days=1)
+        storage.save()
+
+    def test_daily_report(self):
+        """ Every day of the seeded months matches the old report """
+        for user in self.users:
+            day = datetime(2031, 1, 1)
+            while day.month <= 3:
+                date = day.strftime("%B.%-d.%Y")
+                self.assertEqual(
+                    normalized(storage.daily_report(user.unique_id, date)),
+                    normalized(old_daily_report(user.unique_id, date)))
+                day += timedelta(days=1)
+
+    def test_daily_report_without_logs(self):
+        """ A day nobody logged has no report """
+        self.assertIsNone(
+            storage.daily_report(self.users[0].unique_id, "April.1.2031"))
+
+    def test_weekly_report(self):
+        """ Every week, from any of its days, matches the old report """
+        for user in self.users:
+            day = datetime(2030, 12, 29, 15, 30)
+            while day < datetime(2031, 4, 7):
+                self.assertEqual(
+                    normalized(storage.weekly_report(user.unique_id, day)),
+                    normalized(old_weekly_report(user.unique_id, day)))
+                day += timedelta(days=3)
+
+    def test_monthly_report(self):
+        """ Every month matches the old report, empty ones have none """
+        for user in self.users + [User()]:
+            for month in ("January", "February", "March", "April"):
+                self.assertEqual(
+                    normalized(storage.monthly_report(
+                        user.unique_id, month, 2031)),
+                    normalized(old_monthly_report(user.unique_id, month, 2031)))
+        self.assertIsNone(
+            storage.monthly_report(self.users[0].unique_id, "April", 2031))
+
+    def test_tasks_in_name_order(self):
+        """ The tasks of a report come in name order """
+        report = storage.monthly_report(self.users[0].unique_id, "March", 2031)
+        names = [task['name'] for task in report['tasks']]
+        self.assertTrue(names)
+        self.assertEqual(names, sorted(names))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+#!/usr/bin/python3
+""" Tests for the v2 API
+
+v2 reads its configuration when it is first imported, so point it at
+TEST_DATABASE_URL or, by default, an in-memory SQLite database before
+any test module imports it. DATABASE_URL is deliberately ignored so the
+tests never write into a development database.
+
+The in-memory database is shared by the connections of this process and
+named after the pytest-xdist worker, so parallel workers get one each.
+It uses SQLite's memdb VFS rather than a shared cache: shared cache
+connections lock whole tables and fail concurrent writers at once, memdb
+keeps the usual locking and busy timeout. The database lives as long as
+a connection to it is open, which keepalive is.
+"""
+import os
+import sqlite3
+
+MEMORY_DATABASE = 'file:/timecraft_test_{}?vfs=memdb'.format(
+    os.environ.get('PYTEST_XDIST_WORKER', 'main'))
+
+if os.environ.get('TEST_DATABASE_URL'):
+    os.environ['DATABASE_URL'] = os.environ['TEST_DATABASE_URL']
+else:
+    os.environ['DATABASE_URL'] = f'sqlite:///{MEMORY_DATABASE}&uri=true'
+    keepalive = sqlite3.connect(MEMORY_DATABASE, uri=True)
+os.environ.setdefault('SECRET_KEY', 'timecraft-test-secret')
+os.environ.setdefault('ALGORITHM', 'HS256')
+# The cheapest bcrypt cost keeps the auth tests fast
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+# Slow statements are not written to a slow_queries.log in the work tree
+os.environ.setdefault('SLOW_QUERY_LOG', '')
@@ -0,0 +1,32 @@
+#!/usr/bin/python3
+""" Fixtures of the v2 tests
+
+The schema is created once per process, when v2.models is imported.
+Every test then runs inside tests.rollback.rolled_back(), so whatever
+it writes, commits included, is gone when it ends. Tests using the
+database from several threads at once can't share its connection, and
+tests counting statements or commits would see its SAVEPOINTs instead;
+marked with committed they run against the database directly and keep
+their data.
+"""
+import pytest
+from tests.rollback import rolled_back
+from v2.models import storage
+
+
+def pytest_configure(config):
+    """ Registers the committed marker """
+    config.addinivalue_line(
+        'markers',
+        'committed: run without the per-test rollback, for tests using '
+        'the database from several threads or counting its statements')
+
+
+@pytest.fixture(autouse=True)
+def rollback(request):
+    """ Rolls back everything the test wrote """
+    if request.node.get_closest_marker('committed'):
+        yield
+        return
+    with rolled_back(storage):
+        yield
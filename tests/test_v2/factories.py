@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+""" Helpers that create v2 objects for tests """
+import uuid
+from datetime import timedelta
+from v2.models import storage
+from v2.models.User import User
+from v2.models.Profile import Profile
+from v2.models.Activity import Activity
+from v2.auth.functions import create_access_token
+from v2.report.functions import create_new_report
+
+
+def create_profile(**kwargs):
+    """ Creates and saves a User with its Profile """
+    suffix = uuid.uuid4().hex[:12]
+    user = User(email=f'{suffix}@example.com', password='not-a-hash')
+    user.save()
+
+    fields = {
+        'full_name': 'Test User',
+        'username': f'user_{suffix}',
+        'profile_picture_url': '',
+        'bio': '',
+        'location': '',
+        'weekly_work_hours_goal': 40,
+        'number_of_work_days': 5,
+        'total_productive_time': 0,
+        'total_wasted_time': 0,
+    }
+    fields.update(kwargs)
+    profile = Profile(user_id=user.id, **fields)
+    profile.save()
+    return profile
+
+
+def create_activity(profile, name=None, **kwargs):
+    """ Creates and saves an Activity owned by profile """
+    fields = {
+        'daily_goal': 2,
+        'weekly_goal': 10,
+        'total_time_on_task': 0,
+    }
+    fields.update(kwargs)
+    activity = Activity(
+        name=name or f'activity_{uuid.uuid4().hex[:8]}',
+        user_id=profile.user_id,
+        **fields
+    )
+    activity.save()
+    return activity
+
+
+def create_report(activity, date, time_on_task=1, time_wasted=0, **kwargs):
+    """ Creates a Report for activity the way the API does """
+    return create_new_report(
+        activity=activity,
+        date=date,
+        time_on_task=time_on_task,
+        time_wasted=time_wasted,
+        **kwargs
+    )
+
+
+def auth_headers(profile):
+    """ Returns an Authorization header for the profile's user """
+    user = storage.session.query(User).filter(
+        User.id == profile.user_id).first()
+    token = create_access_token(user.email, user.id, timedelta(minutes=20))
+    return {'Authorization': f'Bearer {token}'}
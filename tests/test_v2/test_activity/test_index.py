@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/activity/index.py """
+import unittest
+from datetime import datetime, timedelta
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile)
+from v2.app import app
+
+
+class TestGetActivities(unittest.TestCase):
+    """ Tests GET /api/activity """
+
+    def setUp(self):
+        """ Creates a profile with five activities """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.headers = auth_headers(self.profile)
+        created_at = datetime(2024, 1, 1)
+        self.names = []
+        for i in range(5):
+            activity = create_activity(self.profile, f'activity {i}')
+            # Two activities share a created_at to exercise the id tiebreak
+            activity.created_at = created_at + timedelta(minutes=i // 2)
+            activity.save()
+            self.names.append(activity.name)
+
+    def get(self, **params):
+        """ Calls the endpoint and returns the JSON body """
+        response = self.client.get('/api/activity', query_string=params,
+                                   headers=self.headers)
+        return response.status_code, response.get_json()
+
+    def test_all_activities(self):
+        """ Without a limit every activity is returned """
+        status, body = self.get()
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body['data']), 5)
+        self.assertIsNone(body['next_cursor'])
+        self.assertEqual(set(body['data'][0]), {
+            'id', 'unique_id', 'name', 'description', 'daily_goal',
+            'weekly_goal', 'total_time_on_task', 'created_at',
+            'updated_at'})
+
+    def test_pages_cover_everything_once(self):
+        """ Following next_cursor visits each activity exactly once """
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            status, body = self.get(**params)
+            self.assertEqual(status, 200)
+            self.assertLessEqual(len(body['data']), 2)
+            seen.extend(activity['id'] for activity in body['data'])
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_fields_projection(self):
+        """ fields= limits the returned keys """
+        status, body = self.get(fields='name,created_at')
+        self.assertEqual(status, 200)
+        self.assertEqual(set(body['data'][0]), {'name', 'created_at'})
+        self.assertEqual(body['data'][0]['created_at'],
+                         '2024-01-01T00:00:00')
+
+    def test_bad_parameters(self):
+        """ Invalid limits, fields and cursors are rejected """
+        self.assertEqual(self.get(limit=0)[0], 400)
+        self.assertEqual(self.get(limit='ten')[0], 400)
+        self.assertEqual(self.get(fields='name,password')[0], 400)
+        self.assertEqual(self.get(cursor='garbage')[0], 400)
+
+
+class TestActivityOwnership(unittest.TestCase):
+    """ Tests that users can't change each other's activities """
+
+    def setUp(self):
+        """ Creates an activity and a second user """
+        self.client = app.test_client()
+        self.owner = create_profile()
+        self.activity = create_activity(self.owner, 'study')
+        self.url = f'/api/activity/{self.activity.unique_id}'
+        self.other = auth_headers(create_profile())
+
+    def test_update(self):
+        """ PATCH of another user's activity is not found """
+        response = self.client.patch(self.url, headers=self.other,
+                                     json={'name': 'taken over'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.patch(self.url, headers=auth_headers(self.owner),
+                                     json={'name': 'reading'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete(self):
+        """ DELETE of another user's activity is not found """
+        response = self.client.delete(self.url, headers=self.other)
+        self.assertEqual(response.status_code, 404)
+        response = self.client.delete(self.url, headers=auth_headers(self.owner))
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
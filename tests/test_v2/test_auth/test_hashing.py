@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/auth/hashing.py """
+import threading
+import unittest
+from unittest.mock import patch
+from passlib.context import CryptContext
+from tests.test_v2.factories import create_profile
+from v2.app import app
+from v2.auth.functions import get_user_by_id
+from v2.auth.hashing import (
+    BCRYPT_ROUNDS, HasherBusy, PasswordHasher, password_hasher)
+
+
+def context(rounds):
+    """ A bcrypt CryptContext pinned to rounds """
+    return CryptContext(schemes=['bcrypt'], bcrypt__default_rounds=rounds,
+                        bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+
+
+class BlockingContext:
+    """ Context whose hash() waits until released """
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def hash(self, password):
+        """ Blocks the worker """
+        self.started.set()
+        self.release.wait(5)
+        return 'hashed'
+
+
+class TestPasswordHasher(unittest.TestCase):
+    """ Tests the bounded hashing pool """
+
+    def test_hash_and_verify(self):
+        """ Hashes verify and current hashes need no update """
+        hasher = PasswordHasher(context(4), workers=1, queue_depth=1)
+        hashed = hasher.hash('secret')
+        self.assertEqual(hasher.verify_and_update('secret', hashed), (True, None))
+        self.assertEqual(hasher.verify_and_update('wrong', hashed), (False, None))
+        stats = hasher.stats()
+        self.assertEqual(stats['hash_latency']['count'], 1)
+        self.assertEqual(stats['verify_latency']['count'], 2)
+
+    def test_outdated_cost_is_rehashed(self):
+        """ A hash made with another cost comes back upgraded """
+        hashed = context(5).hash('secret')
+        hasher = PasswordHasher(context(4), workers=1, queue_depth=0)
+        verified, new_hash = hasher.verify_and_update('secret', hashed)
+        self.assertTrue(verified)
+        self.assertTrue(new_hash.startswith('$2b$04$'))
+
+    def test_saturated_pool_rejects(self):
+        """ Calls past workers + queue_depth fail fast """
+        blocking = BlockingContext()
+        hasher = PasswordHasher(blocking, workers=1, queue_depth=0)
+        worker = threading.Thread(target=hasher.hash, args=('a',))
+        worker.start()
+        self.assertTrue(blocking.started.wait(5))
+        try:
+            with self.assertRaises(HasherBusy):
+                hasher.hash('b')
+        finally:
+            blocking.release.set()
+            worker.join()
+        self.assertEqual(hasher.stats()['rejected'], 1)
+        # The slot is free again once the running hash finished
+        self.assertEqual(hasher.hash('c'), 'hashed')
+
+
+class TestLogin(unittest.TestCase):
+    """ Tests POST /api/auth/login with the hashing pool """
+
+    def setUp(self):
+        """ Creates a user whose password was hashed with another cost """
+        self.client = app.test_client()
+        profile = create_profile()
+        self.user = get_user_by_id(profile.user_id)
+        self.user.password = context(BCRYPT_ROUNDS + 1).hash('secret')
+        self.user.save()
+
+    def login(self, password='secret'):
+        """ Calls the endpoint """
+        return self.client.post('/api/auth/login', json={
+            'email': self.user.email, 'password': password})
+
+    def test_login_upgrades_hash(self):
+        """ A successful login stores a hash with the configured cost """
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.user.password.startswith(f'$2b${BCRYPT_ROUNDS:02d}$'))
+
+    def test_wrong_password(self):
+        """ A wrong password is rejected and the hash kept """
+        password = self.user.password
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.user.password, password)
+
+    def test_busy(self):
+        """ A saturated pool answers 503 with Retry-After """
+        with patch.object(password_hasher, 'verify_and_update',
+                          side_effect=HasherBusy('busy')):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,261 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/engine/migrate_v1.py """
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from datetime import date, datetime
+import pytz
+from sqlalchemy import create_engine, insert
+from tests.test_v2.factories import create_profile
+from tests.test_v2.test_report.test_rollup import rollup_rows
+from v2.engine.migrate_v1 import (
+    V1Migration, parse_v1_date, v1_daily_log, v1_metadata, v1_tasks, v1_users)
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Profile import Profile
+from v2.models.Report import Report
+from v2.models.User import User
+from v2.report.rollup import rebuild_daily_rollups
+
+CREATED = datetime(2024, 3, 1, 12, 0)
+
+
+class TestParseV1Date(unittest.TestCase):
+    """ Tests reading the dates of v1 daily logs """
+
+    def test_date_string(self):
+        """ The date string wins over the separate columns """
+        self.assertEqual(parse_v1_date('March.5.2024', 'May', 1, 2020),
+                         date(2024, 3, 5))
+
+    def test_abbreviated_month(self):
+        """ Abbreviated month names are accepted, in any case """
+        self.assertEqual(parse_v1_date('sep.30.2023', None, None, None),
+                         date(2023, 9, 30))
+
+    def test_fallback_to_columns(self):
+        """ Logs without a date string use month, day and year """
+        self.assertEqual(parse_v1_date(None, 'February', 29, 2024),
+                         date(2024, 2, 29))
+
+    def test_invalid(self):
+        """ Unknown months and impossible days are refused """
+        with self.assertRaises(ValueError):
+            parse_v1_date('Smarch.5.2024', 'Smarch', 5, 2024)
+        with self.assertRaises(ValueError):
+            parse_v1_date('February.30.2024', 'February', 30, 2024)
+
+
+class TestV1Migration(unittest.TestCase):
+    """ Tests copying a v1 database into the v2 tables """
+
+    def setUp(self):
+        """ Creates a v1 SQLite database with two users, three tasks and
+        seven logs, two of which cannot be migrated """
+        self.directory = tempfile.mkdtemp()
+        self.source = f"sqlite:///{os.path.join(self.directory, 'v1.db')}"
+        self.checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        self.prefix = uuid.uuid4().hex[:6]
+        self.rows = 0
+
+        engine = create_engine(self.source)
+        v1_metadata.create_all(engine)
+        users = [self.user('ada', 10), self.user('bob', 4)]
+        tasks = [
+            self.task('study', users[0], 3),
+            self.task('reading', users[0], 1),
+            self.task('chores', users[1], 4),
+        ]
+        logs = [
+            self.log(tasks[0], 'March.4.2024', 1, 0.5),
+            self.log(tasks[0], 'March.5.2024', 2, 0),
+            self.log(tasks[1], None, 1, 0, month='March', day=5, year=2024),
+            self.log(tasks[2], 'April.1.2024', 3, 1),
+            self.log(tasks[2], 'April.1.2024', 1, 0),
+            self.log(tasks[2], 'Never.1.2024', 1, 0),
+            self.log({'unique_id': 'missing0'}, 'April.2.2024', 1, 0),
+        ]
+        with engine.begin() as connection:
+            connection.execute(insert(v1_users), users)
+            connection.execute(insert(v1_tasks), tasks)
+            connection.execute(insert(v1_daily_log), logs)
+        engine.dispose()
+        self.users, self.tasks, self.logs = users, tasks, logs
+
+    def tearDown(self):
+        """ Removes the v1 database and the checkpoint """
+        shutil.rmtree(self.directory)
+
+    def new_id(self) -> str:
+        """ A v1 id, ids sort in creation order """
+        self.rows += 1
+        return f'{self.prefix}-{self.rows:04d}'
+
+    def user(self, name: str, productive: float) -> dict:
+        """ A v1 users row """
+        return {
+            'id': self.new_id(), 'created_at': CREATED,
+            'updated_at': CREATED, 'unique_id': uuid.uuid4().hex[:8],
+            'username': f'{name}-{self.prefix}',
+            'email': f'{name}-{self.prefix}@example.com',
+            'password': 'hash', 'weekly_work_hours_goal': 40,
+            'number_of_work_days': 5, 'total_productive_time': productive,
+            'total_wasted_time': 0,
+        }
+
+    def task(self, name: str, user: dict, total: float) -> dict:
+        """ A v1 tasks row of user """
+        return {
+            'id': self.new_id(), 'created_at': CREATED,
+            'updated_at': CREATED, 'unique_id': uuid.uuid4().hex[:8],
+            'task_name': f'{name}-{self.prefix}', 'total_time_on_task': total,
+            'daily_goal': 1, 'weekly_goal': 5, 'user_id': user['unique_id'],
+        }
+
+    def log(self, task: dict, value, time_on_task: float, time_wasted: float,
+            month='January', day=1, year=2000) -> dict:
+        """ A v1 daily_log row of task """
+        return {
+            'id': self.new_id(), 'created_at': CREATED,
+            'updated_at': CREATED, 'unique_id': uuid.uuid4().hex[:8],
+            'month': month, 'day': day, 'year': year,
+            'task_id': task['unique_id'], 'time_on_task': time_on_task,
+            'time_wasted': time_wasted, 'day_of_week': 'Monday', 'date': value,
+        }
+
+    def migrated_reports(self) -> dict:
+        """ Returns {id: (activity_id, date, time_on_task)} of the v1 logs """
+        rows = storage.session.query(
+            Report.id, Report.activity_id, Report.date, Report.time_on_task
+        ).filter(Report.id.in_([log['id'] for log in self.logs]))
+        return {row.id: tuple(row[1:]) for row in rows}
+
+    def test_migrates_everything(self):
+        """ Users, profiles, activities and reports keep their ids and
+        values, and logs land at the start of their day """
+        stats = V1Migration(self.source, batch_size=2,
+                            timezone='Europe/Moscow').run()
+
+        self.assertEqual(stats.tables['users']['written'], 2)
+        self.assertEqual(stats.tables['tasks']['written'], 3)
+        self.assertEqual(stats.tables['daily_log']['written'], 5)
+        self.assertEqual(stats.tables['daily_log']['rejected'], 2)
+        self.assertEqual({reject['id'] for reject in stats.rejects},
+                         {self.logs[5]['id'], self.logs[6]['id']})
+
+        ada = storage.session.get(User, self.users[0]['id'])
+        self.assertEqual(ada.unique_id, self.users[0]['unique_id'])
+        self.assertEqual(ada.email, self.users[0]['email'])
+        profile = storage.session.query(Profile).filter_by(user_id=ada.id).one()
+        self.assertEqual(profile.username, self.users[0]['username'])
+        self.assertEqual(profile.total_productive_time, 10)
+        self.assertEqual(profile.timezone, 'Europe/Moscow')
+
+        chores = storage.session.get(Activity, self.tasks[2]['id'])
+        self.assertEqual(chores.user_id, self.users[1]['id'])
+        self.assertEqual(chores.name, self.tasks[2]['task_name'])
+
+        reports = self.migrated_reports()
+        self.assertEqual(len(reports), 5)
+        activity_id, day, time_on_task = reports[self.logs[2]['id']]
+        self.assertEqual(activity_id, self.tasks[1]['id'])
+        self.assertEqual(time_on_task, 1)
+        # Midnight in Moscow, three hours before midnight UTC
+        if day.tzinfo is not None:
+            day = day.astimezone(pytz.UTC).replace(tzinfo=None)
+        self.assertEqual(day, datetime(2024, 3, 4, 21, 0))
+
+    def assert_bob_rejected(self, stats):
+        """ bob, the chores task and its logs were all rejected """
+        self.assertEqual(stats.tables['users']['written'], 1)
+        self.assertEqual(stats.tables['users']['rejected'], 1)
+        self.assertEqual(stats.tables['tasks']['written'], 2)
+        self.assertEqual(stats.tables['tasks']['rejected'], 1)
+        self.assertEqual(stats.tables['daily_log']['written'], 3)
+        self.assertEqual(stats.tables['daily_log']['rejected'], 4)
+        self.assertIsNone(storage.session.get(User, self.users[1]['id']))
+        self.assertIsNone(storage.session.get(Activity, self.tasks[2]['id']))
+        self.assertEqual(rollup_rows(self.users[1]['id']), {})
+        self.assertEqual(len(self.migrated_reports()), 3)
+
+    def test_taken_username(self):
+        """ A user whose username is taken is rejected with its tasks
+        and logs """
+        create_profile(username=self.users[1]['username'])
+        stats = V1Migration(self.source, batch_size=2).run()
+        self.assert_bob_rejected(stats)
+        self.assertIn(f"Username {self.users[1]['username']} is taken",
+                      [reject['message'] for reject in stats.rejects])
+
+    def test_taken_email(self):
+        """ A user whose email is taken is rejected instead of failing
+        the batch """
+        profile = create_profile()
+        user = storage.session.get(User, profile.user_id)
+        user.email = self.users[1]['email']
+        storage.save()
+        stats = V1Migration(self.source, batch_size=2).run()
+        self.assert_bob_rejected(stats)
+
+    def test_dry_run_rejects_tasks_of_rejected_users(self):
+        """ A dry run reports the tasks and logs of rejected users """
+        create_profile(username=self.users[1]['username'])
+        stats = V1Migration(self.source, batch_size=2, dry_run=True).run()
+        self.assertEqual(stats.tables['tasks']['rejected'], 1)
+        self.assertEqual(stats.tables['daily_log']['written'], 3)
+        self.assertEqual(stats.tables['daily_log']['rejected'], 4)
+
+    def test_rollup_matches_rebuild(self):
+        """ The rollup written per batch equals a rebuilt one """
+        V1Migration(self.source, batch_size=2).run()
+        for user in self.users:
+            before = rollup_rows(user['id'])
+            self.assertTrue(before)
+            rebuild_daily_rollups(user['id'])
+            self.assertEqual(rollup_rows(user['id']), before)
+
+    def test_dry_run_writes_nothing(self):
+        """ A dry run counts what it would write and writes nothing """
+        stats = V1Migration(self.source, batch_size=2,
+                            checkpoint_path=self.checkpoint,
+                            dry_run=True).run()
+
+        self.assertEqual(stats.tables['users']['written'], 2)
+        self.assertEqual(stats.tables['daily_log']['read'], 7)
+        self.assertIsNone(storage.session.get(User, self.users[0]['id']))
+        self.assertEqual(self.migrated_reports(), {})
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_after_interruption(self):
+        """ A rerun with the checkpoint finishes without duplicates """
+        def interrupt(stats):
+            if stats.table == 'daily_log':
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            V1Migration(self.source, batch_size=2,
+                        checkpoint_path=self.checkpoint,
+                        progress=interrupt).run()
+        self.assertEqual(len(self.migrated_reports()), 2)
+
+        stats = V1Migration(self.source, batch_size=2,
+                            checkpoint_path=self.checkpoint).run()
+        self.assertEqual(stats.tables['users']['read'], 0)
+        self.assertEqual(stats.tables['daily_log']['read'], 5)
+        self.assertEqual(len(self.migrated_reports()), 5)
+
+    def test_rerun_skips_migrated_rows(self):
+        """ Without a checkpoint, rows already copied are skipped """
+        V1Migration(self.source, batch_size=3).run()
+        stats = V1Migration(self.source, batch_size=3).run()
+
+        self.assertEqual(stats.tables['users']['skipped'], 2)
+        self.assertEqual(stats.tables['daily_log']['skipped'], 5)
+        self.assertEqual(stats.tables['daily_log']['written'], 0)
+        self.assertEqual(len(self.migrated_reports()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/engine/slow_queries.py """
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, call, patch
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile, create_report)
+from v2.app import app
+from v2.engine import slow_queries
+from v2.engine.queries import stop_tracking, track_queries
+from v2.engine.slow_queries import configure_log, explain, explained, redact
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Report import Report
+
+
+class TestRedact(unittest.TestCase):
+    """ Tests hiding parameter values """
+
+    def test_redact(self):
+        """ Strings lose their content, numbers and dates stay """
+        self.assertEqual(
+            redact(('secret@example.com', 3, 1.5, None,
+                    datetime(2024, 6, 1), b'xy')),
+            ['<str len=18>', 3, 1.5, None, '2024-06-01T00:00:00',
+             '<bytes len=2>'])
+        self.assertEqual(redact({'email': 'a@b.c'}), {'email': '<str len=5>'})
+
+
+class TestSlowQueryLog(unittest.TestCase):
+    """ Tests logging statements over the threshold """
+
+    def setUp(self):
+        """ Logs every statement and forgets cached plans """
+        patcher = patch.object(slow_queries, 'SLOW_QUERY_MS', 1e-9)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        explained.clear()
+        self.profile = create_profile()
+        self.activity = create_activity(self.profile, 'study')
+        create_report(self.activity, datetime(2024, 6, 1, 10))
+
+    def records(self, logs):
+        """ The logged records as dictionaries """
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_full_scan(self):
+        """ A filter on an unindexed column is logged as a full scan """
+        with self.assertLogs('timecraft.slow_queries') as logs:
+            storage.session.query(Report).filter(
+                Report.comment == 'private note').all()
+
+        record = self.records(logs)[-1]
+        self.assertIn('FROM report', record['statement'])
+        self.assertEqual(record['dialect'], 'sqlite')
+        self.assertIn('<str len=12>', record['parameters'])
+        self.assertNotIn('private note', json.dumps(record))
+        self.assertTrue(record['full_scan'], record['plan'])
+        self.assertIsNone(record['route'])
+        self.assertGreater(record['duration_ms'], 0)
+
+    def test_index_search(self):
+        """ A lookup by primary key is not a full scan """
+        with self.assertLogs('timecraft.slow_queries') as logs:
+            storage.session.query(Activity).filter(
+                Activity.id == self.activity.id).all()
+
+        record = self.records(logs)[-1]
+        self.assertFalse(record['full_scan'], record['plan'])
+        self.assertTrue(any('USING' in line for line in record['plan']))
+
+    def test_timed_once(self):
+        """ The log reports the duration QueryStats recorded """
+        stats = track_queries()
+        self.addCleanup(stop_tracking)
+        with self.assertLogs('timecraft.slow_queries') as logs:
+            storage.session.query(Report).limit(1).all()
+
+        records = self.records(logs)
+        self.assertEqual(len(records), stats.statements)
+        self.assertAlmostEqual(
+            sum(record['duration_ms'] for record in records),
+            stats.db_time * 1000, places=2)
+
+    def test_threshold(self):
+        """ Statements faster than the threshold are not logged """
+        with patch.object(slow_queries, 'SLOW_QUERY_MS', 60000), \
+                self.assertNoLogs('timecraft.slow_queries'):
+            storage.session.query(Report).limit(1).all()
+
+    def test_route(self):
+        """ Statements of a request name its route """
+        client = app.test_client()
+        with self.assertLogs('timecraft.slow_queries') as logs:
+            client.get('/api/activity', headers=auth_headers(self.profile))
+
+        routes = {record['route'] for record in self.records(logs)}
+        self.assertIn('GET /api/activity', routes)
+
+    def test_writes(self):
+        """ Writes are logged without a plan """
+        with self.assertLogs('timecraft.slow_queries') as logs:
+            create_report(self.activity, datetime(2024, 6, 2, 10))
+
+        inserts = [record for record in self.records(logs)
+                   if record['statement'].startswith('INSERT INTO report')]
+        self.assertTrue(inserts)
+        self.assertIsNone(inserts[0]['plan'])
+
+    def test_rotating_file(self):
+        """ configure_log writes JSON lines to a file """
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'slow.log')
+        configure_log(path)
+        self.addCleanup(configure_log, None)
+
+        storage.session.query(Report).limit(1).all()
+        with open(path) as file:
+            lines = [json.loads(line) for line in file]
+        self.assertTrue(lines)
+        self.assertIn('plan', lines[-1])
+
+
+class TestExplain(unittest.TestCase):
+    """ Tests capturing plans outside of SQLite """
+
+    def test_failure_is_rolled_back(self):
+        """ A failed EXPLAIN is undone to its SAVEPOINT """
+        conn = MagicMock()
+        conn.dialect.name = 'postgresql'
+        cursor = conn.connection.cursor.return_value
+
+        def execute(statement, parameters=None):
+            if statement.startswith('EXPLAIN'):
+                raise RuntimeError('syntax error')
+        cursor.execute.side_effect = execute
+
+        with self.assertRaises(RuntimeError):
+            explain(conn, 'SELECT 1', {})
+        self.assertEqual(cursor.execute.call_args_list, [
+            call('SAVEPOINT slow_query_explain'),
+            call('EXPLAIN SELECT 1', {}),
+            call('ROLLBACK TO SAVEPOINT slow_query_explain'),
+            call('RELEASE SAVEPOINT slow_query_explain'),
+        ])
+        cursor.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/engine/storage.py """
+import threading
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+from tests.rollback import rolled_back
+from tests.test_v2.factories import (
+    create_activity, create_profile, create_report)
+from v2.engine.pool import InstrumentedQueuePool, pool_options
+from v2.engine.storage import Storage
+from v2.models import storage
+from v2.models.User import User
+
+
+class TestSessionLifecycle(unittest.TestCase):
+    """ Tests that sessions are scoped to the current thread """
+
+    def test_same_session_within_a_thread(self):
+        """ Repeated access in one thread returns the same session """
+        self.assertIs(storage.session, storage.session)
+
+    def test_threads_get_their_own_session(self):
+        """ Every thread gets a separate session """
+        sessions = []
+
+        def grab():
+            sessions.append(storage.session)
+            storage.close()
+
+        workers = [threading.Thread(target=grab) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        ids = {id(session) for session in sessions + [storage.session]}
+        self.assertEqual(len(ids), 4)
+
+    def test_close_discards_the_session(self):
+        """ close() makes the next access start a fresh session """
+        before = storage.session
+        storage.close()
+        self.assertIsNot(storage.session, before)
+
+    def test_pool_status(self):
+        """ pool_status() reports the pool metrics """
+        storage.session.connection()
+        status = storage.pool_status()
+        self.assertIn('pool', status)
+        self.assertGreaterEqual(status['checkouts'], 1)
+
+
+class TestInjectedEngine(unittest.TestCase):
+    """ Tests a Storage built on an engine of its own """
+
+    def setUp(self):
+        """ Creates a storage on a private in-memory database """
+        self.engine = create_engine('sqlite://')
+        self.storage = Storage(self.engine)
+        self.storage.reload()
+
+    def tearDown(self):
+        """ Closes the session and the engine """
+        self.storage.close()
+        self.engine.dispose()
+
+    def users(self):
+        """ Number of users in the private database """
+        return self.storage.session.query(User).count()
+
+    def test_uses_the_engine(self):
+        """ Sessions are bound to the injected engine """
+        self.assertIs(self.storage.engine, self.engine)
+        self.assertIs(self.storage.session.get_bind(), self.engine)
+
+    def test_rolled_back(self):
+        """ Commits inside rolled_back() are undone when it ends """
+        with rolled_back(self.storage):
+            self.storage.new(User(email='kept@example.com'))
+            self.storage.save()
+            self.storage.close()
+            self.assertEqual(self.users(), 1)
+        self.assertEqual(self.users(), 0)
+
+    def test_rollback_inside_rolled_back(self):
+        """ A rollback inside the block keeps what was committed before """
+        with rolled_back(self.storage):
+            self.storage.new(User(email='kept@example.com'))
+            self.storage.save()
+            self.storage.new(User(email='dropped@example.com'))
+            self.storage.rollback()
+            self.assertEqual(self.users(), 1)
+
+
+class TestPoolOptions(unittest.TestCase):
+    """ Tests the pool configuration read from the environment """
+
+    def test_server_database_uses_queue_pool(self):
+        """ Server databases get the instrumented QueuePool """
+        options = pool_options('postgresql://u:p@localhost/db')
+        self.assertIs(options['poolclass'], InstrumentedQueuePool)
+        self.assertTrue(issubclass(options['poolclass'], QueuePool))
+        self.assertEqual(options['pool_size'], 5)
+        self.assertTrue(options['pool_pre_ping'])
+
+    def test_sqlite_keeps_default_pool(self):
+        """ SQLite only gets pre-ping """
+        self.assertEqual(pool_options('sqlite://'), {'pool_pre_ping': True})
+
+
+class TestLookups(unittest.TestCase):
+    """ Tests the indexed lookups of Storage """
+
+    def setUp(self):
+        """ Creates a profile with two activities and a report """
+        self.profile = create_profile()
+        self.study = create_activity(self.profile, 'study')
+        self.read = create_activity(self.profile, 'read')
+        self.date = datetime(2021, 7, 14, 10, 30)
+        self.report = create_report(self.study, self.date, 2, 1)
+
+    def test_get_user(self):
+        """ get_user() finds a user by unique_id """
+        user = storage.session.query(User).filter(
+            User.id == self.profile.user_id).first()
+        self.assertEqual(storage.get_user(user.unique_id).id, user.id)
+        self.assertIsNone(storage.get_user('missing!'))
+
+    def test_get_task(self):
+        """ get_task() finds an activity by unique_id """
+        self.assertEqual(
+            storage.get_task(self.read.unique_id).id, self.read.id)
+        self.assertIsNone(storage.get_task('missing!'))
+
+    def test_get_tasks(self):
+        """ get_tasks() fetches several activities in one query """
+        tasks = storage.get_tasks(
+            [self.study.unique_id, self.read.unique_id, 'missing!'])
+        self.assertEqual({task.id for task in tasks},
+                         {self.study.id, self.read.id})
+        self.assertEqual(storage.get_tasks([]), [])
+
+    def test_get_logs_of_the_day(self):
+        """ get_logs_of_the_day() filters reports by date """
+        logs = storage.get_logs_of_the_day(self.report.date)
+        self.assertIn(self.report.id, [log.id for log in logs])
+        self.assertEqual(storage.get_logs_of_the_day(datetime(1999, 1, 1)),
+                         [])
+
+
+if __name__ == "__main__":
+    unittest.main()
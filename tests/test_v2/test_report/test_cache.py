@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/report/cache.py """
+import abc
+import time
+import unittest
+from datetime import datetime
+import pytz
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile)
+from v2.app import app
+from v2.report.cache import MemoryBackend, RedisBackend, ReportCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+JUNE = (datetime(2024, 6, 1, tzinfo=pytz.UTC),
+        datetime(2024, 6, 30, 23, 59, 59, 999999, tzinfo=pytz.UTC))
+JULY = (datetime(2024, 7, 1, tzinfo=pytz.UTC),
+        datetime(2024, 7, 31, 23, 59, 59, 999999, tzinfo=pytz.UTC))
+REPORT = {'total_productive_time': 1.5, 'total_wasted_time': 0.5,
+          'activities': {'study': {'total_time_on_task': 1.5,
+                                   'total_time_wasted': 0.5}}}
+
+
+class ReportCacheTests(abc.ABC):
+    """ Behaviour every backend shares, mixed into a TestCase """
+
+    @abc.abstractmethod
+    def backend(self):
+        """ The backend under test """
+
+    def setUp(self):
+        """ Caches June and July for one user and June for another """
+        self.cache = ReportCache(self.backend(), ttl=60)
+        since = time.monotonic()
+        for user_id, window in (('a', JUNE), ('a', JULY), ('b', JUNE)):
+            self.cache.set(user_id, *window, dict(REPORT), since)
+
+    def test_hit_and_miss(self):
+        """ Cached windows hit with their dates, others miss """
+        self.assertEqual(self.cache.get('a', *JUNE),
+                         {'start_date': JUNE[0], 'end_date': JUNE[1], **REPORT})
+        self.assertIsNone(self.cache.get('c', *JUNE))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_invalidate_dates(self):
+        """ Only the user's windows containing a date are dropped """
+        self.cache.invalidate('a', [datetime(2024, 6, 15, 12, tzinfo=pytz.UTC)])
+        self.assertIsNone(self.cache.get('a', *JUNE))
+        self.assertIsNotNone(self.cache.get('a', *JULY))
+        self.assertIsNotNone(self.cache.get('b', *JUNE))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_invalidate_user(self):
+        """ Without dates every window of the user is dropped """
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a', *JUNE))
+        self.assertIsNone(self.cache.get('a', *JULY))
+        self.assertIsNotNone(self.cache.get('b', *JUNE))
+
+    def test_stale_result_is_not_stored(self):
+        """ A result read before a write of the same user is discarded """
+        since = time.monotonic()
+        self.cache.invalidate('a')
+        self.cache.set('a', *JUNE, dict(REPORT), since)
+        self.assertIsNone(self.cache.get('a', *JUNE))
+
+
+class TestMemoryBackend(ReportCacheTests, unittest.TestCase):
+    """ Tests ReportCache in process """
+
+    def backend(self):
+        """ A small in-process backend """
+        return MemoryBackend(maxsize=16, ttl=60)
+
+    def test_lru_eviction(self):
+        """ The least recently used window goes first """
+        cache = ReportCache(MemoryBackend(maxsize=1, ttl=60), ttl=60)
+        cache.set('a', *JUNE, dict(REPORT), time.monotonic())
+        cache.set('a', *JULY, dict(REPORT), time.monotonic())
+        self.assertIsNone(cache.get('a', *JUNE))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestRedisBackend(ReportCacheTests, unittest.TestCase):
+    """ Tests ReportCache against a Redis stand-in """
+
+    def backend(self):
+        """ A backend on a private fake server """
+        return RedisBackend(fakeredis.FakeRedis(), ttl=60)
+
+
+class TestGetReportCache(unittest.TestCase):
+    """ Tests GET /api/report with the cache """
+
+    def setUp(self):
+        """ Creates a profile with an activity and one June report """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.activity = create_activity(self.profile, 'study')
+        self.headers = auth_headers(self.profile)
+        self.post('2024-06-10T10:00:00Z')
+
+    def post(self, date):
+        """ Adds a one hour report """
+        response = self.client.post('/api/report', headers=self.headers, json={
+            'activity_id': self.activity.unique_id, 'date': date,
+            'time_on_task': 1, 'time_wasted': 0})
+        self.assertEqual(response.status_code, 201)
+
+    def get(self):
+        """ Reads June, returns the X-Cache header and the total """
+        response = self.client.get('/api/report', headers=self.headers, query_string={
+            'start_date': '2024-06-01', 'end_date': '2024-06-30'})
+        self.assertEqual(response.status_code, 200)
+        return (response.headers['X-Cache'],
+                response.get_json()['data']['total_productive_time'])
+
+    def test_repeated_polls_hit(self):
+        """ The second poll of a window is served from the cache """
+        self.assertEqual(self.get(), ('MISS', 1))
+        self.assertEqual(self.get(), ('HIT', 1))
+
+    def test_report_in_window_invalidates(self):
+        """ A new report inside the window is visible on the next poll """
+        self.get()
+        self.post('2024-06-20T10:00:00Z')
+        self.assertEqual(self.get(), ('MISS', 2))
+
+    def test_report_outside_window_keeps_entry(self):
+        """ Reports outside the window leave it cached """
+        self.get()
+        self.post('2024-08-20T10:00:00Z')
+        self.assertEqual(self.get(), ('HIT', 1))
+
+    def test_activity_rename_invalidates(self):
+        """ Renaming an activity drops the user's windows """
+        self.get()
+        response = self.client.patch(
+            f'/api/activity/{self.activity.unique_id}',
+            headers=self.headers, json={'name': 'reading'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(), ('MISS', 1))
+
+    def test_stats(self):
+        """ The counters are exposed """
+        self.get()
+        self.get()
+        response = self.client.get('/api/report/cache', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.get_json()['data']['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
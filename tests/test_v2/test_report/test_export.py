@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/report/export.py """
+import csv
+import io
+import json
+import tracemalloc
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile, create_report)
+from v2.app import app
+from v2.models import storage
+from v2.models.Report import Report
+from v2.report.export import EXPORT_COLUMNS
+
+
+def seed_reports(activity, count):
+    """ Inserts count reports for activity, bypassing the totals """
+    first = datetime(2020, 1, 1)
+    # Random 8 character ids would collide at this volume
+    prefix = uuid.uuid4().hex[:3]
+    for offset in range(0, count, 5000):
+        storage.session.execute(insert(Report), [
+            {
+                'id': str(uuid.uuid4()),
+                'unique_id': f'{prefix}{i:05x}',
+                'created_at': first,
+                'updated_at': first,
+                'activity_id': activity.id,
+                'date': first + timedelta(minutes=i),
+                'time_on_task': 1,
+                'time_wasted': 0.5,
+                'comment': 'seeded report with a comment of moderate length',
+            }
+            for i in range(offset, min(offset + 5000, count))
+        ])
+    storage.session.commit()
+
+
+class TestExport(unittest.TestCase):
+    """ Tests GET /api/report/export """
+
+    def setUp(self):
+        """ Creates a profile with a few reports, and someone else's """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.headers = auth_headers(self.profile)
+        activity = create_activity(self.profile, 'study')
+        for hour in (9, 11, 10):
+            create_report(activity, datetime(2024, 6, 1, hour), comment=f'h{hour}')
+        other = create_activity(create_profile(), 'other')
+        create_report(other, datetime(2024, 6, 1, 12))
+
+    def export(self, **params):
+        """ Requests an export and returns the response """
+        return self.client.get('/api/report/export', query_string=params,
+                               headers=self.headers)
+
+    def test_ndjson(self):
+        """ One object per report of the user, oldest first """
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertTrue(response.is_streamed)
+        rows = [json.loads(line) for line in response.get_data().splitlines()]
+        self.assertEqual([row['comment'] for row in rows], ['h9', 'h10', 'h11'])
+        self.assertEqual(set(rows[0]), set(EXPORT_COLUMNS))
+        self.assertEqual(rows[0]['activity_name'], 'study')
+        self.assertEqual(rows[0]['date'], '2024-06-01T09:00:00+00:00')
+
+    def test_csv(self):
+        """ A header, then one row per report """
+        response = self.export(format='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual([row[6] for row in rows[1:]], ['h9', 'h10', 'h11'])
+
+    def test_unknown_format(self):
+        """ Formats other than ndjson and csv are rejected """
+        self.assertEqual(self.export(format='xml').status_code, 400)
+
+
+class TestExportMemory(unittest.TestCase):
+    """ Tests that exports stream instead of loading every row """
+
+    def setUp(self):
+        """ Warms up the route so imports and caches are not measured """
+        app.test_client().get('/api/report/export',
+                              headers=auth_headers(create_profile()))
+
+    def peak(self, count, export_format):
+        """ Peak traced memory while streaming count reports
+
+        tracemalloc is used rather than the process's peak RSS, which is a
+        high-water mark over the whole test run.
+        """
+        profile = create_profile()
+        seed_reports(create_activity(profile), count)
+        headers = auth_headers(profile)
+        storage.close()
+
+        tracemalloc.start()
+        try:
+            response = app.test_client().get(
+                '/api/report/export', query_string={'format': export_format},
+                headers=headers, buffered=False)
+            lines = 0
+            for chunk in response.response:
+                lines += chunk.count(b'\n')
+            response.close()
+            return lines, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_flat_memory(self):
+        """ Ten times the rows need about the same memory """
+        for export_format, header in (('ndjson', 0), ('csv', 1)):
+            with self.subTest(export_format):
+                small_lines, small_peak = self.peak(4000, export_format)
+                large_lines, large_peak = self.peak(40000, export_format)
+                self.assertEqual((small_lines, large_lines),
+                                 (4000 + header, 40000 + header))
+                self.assertLess(large_peak, small_peak * 2)
+                self.assertLess(large_peak, 4 * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
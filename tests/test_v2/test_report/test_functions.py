@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/report/functions.py """
+import unittest
+from datetime import date, datetime, timedelta
+import pytz
+from tests.test_v2.factories import (
+    create_activity, create_profile, create_report)
+from v2.report.functions import (
+    bucket_start, bucket_starts, get_report_series, get_reports_in_range)
+
+
+class TestGetReportsInRange(unittest.TestCase):
+    """ Tests the range report aggregation """
+
+    def setUp(self):
+        """ Seeds a profile with reports inside and outside a window """
+        self.start = datetime(2024, 3, 1, tzinfo=pytz.UTC)
+        self.end = datetime(2024, 3, 31, 23, 59, 59, 999999,
+                            tzinfo=pytz.UTC)
+        self.profile = create_profile()
+
+        self.study = create_activity(self.profile, 'study')
+        self.read = create_activity(self.profile, 'read')
+        self.idle = create_activity(self.profile, 'idle')
+
+        create_report(self.study, datetime(2024, 3, 2, 9), 2, 0.5)
+        create_report(self.study, datetime(2024, 3, 20, 9), 3, 0)
+        create_report(self.read, datetime(2024, 3, 5, 9), 1.5, 1)
+        # Outside of the window
+        create_report(self.read, datetime(2024, 4, 1, 9), 10, 10)
+        create_report(self.idle, datetime(2024, 2, 28, 9), 10, 10)
+
+    def test_totals_per_activity(self):
+        """ Sums reports per activity within the window """
+        result = get_reports_in_range(
+            self.profile.user_id, self.start, self.end)
+
+        self.assertEqual(result['start_date'], self.start)
+        self.assertEqual(result['end_date'], self.end)
+        self.assertEqual(result['total_productive_time'], 6.5)
+        self.assertEqual(result['total_wasted_time'], 1.5)
+        self.assertEqual(result['activities'], {
+            'study': {'total_time_on_task': 5, 'total_time_wasted': 0.5},
+            'read': {'total_time_on_task': 1.5, 'total_time_wasted': 1},
+        })
+
+    def test_deleted_activity_is_skipped(self):
+        """ Soft deleted activities don't show up in the report """
+        self.read.deleted = datetime.now()
+        self.read.save()
+
+        result = get_reports_in_range(
+            self.profile.user_id, self.start, self.end)
+
+        self.assertEqual(list(result['activities']), ['study'])
+        self.assertEqual(result['total_productive_time'], 5)
+
+    def test_empty_window(self):
+        """ A window without reports returns zero totals """
+        result = get_reports_in_range(
+            self.profile.user_id,
+            datetime(2023, 1, 1, tzinfo=pytz.UTC),
+            datetime(2023, 1, 2, tzinfo=pytz.UTC))
+
+        self.assertEqual(result['total_productive_time'], 0)
+        self.assertEqual(result['total_wasted_time'], 0)
+        self.assertEqual(result['activities'], {})
+
+
+
+class TestGetReportSeries(unittest.TestCase):
+    """ Tests the bucketed report series """
+
+    def setUp(self):
+        """ Seeds reports on a Sunday, a Monday and in the next month """
+        self.start = datetime(2024, 3, 1, tzinfo=pytz.UTC)
+        self.end = datetime(2024, 4, 30, 23, 59, 59, 999999, tzinfo=pytz.UTC)
+        self.profile = create_profile()
+        self.study = create_activity(self.profile, 'study')
+        self.read = create_activity(self.profile, 'read')
+
+        create_report(self.study, datetime(2024, 3, 10, 9), 2, 0.5)  # Sunday
+        create_report(self.study, datetime(2024, 3, 11, 9), 3, 0)    # Monday
+        create_report(self.read, datetime(2024, 4, 2, 9), 1, 1)
+        # Outside of the window
+        create_report(self.read, datetime(2024, 5, 1, 9), 10, 10)
+
+    def series(self, bucket):
+        """ The series of the window """
+        return get_report_series(
+            self.profile.user_id, self.start, self.end, bucket)
+
+    def test_days_are_dense(self):
+        """ Every day has a value, days without reports are zero """
+        result = self.series('day')
+        self.assertEqual(len(result['buckets']), 61)
+        self.assertEqual(result['buckets'][0], '2024-03-01')
+        study = result['activities']['study']['time_on_task']
+        self.assertEqual(len(study), 61)
+        self.assertEqual(study[9:11], [2, 3])
+        self.assertEqual(sum(study), 5)
+        self.assertEqual(sum(result['total_time_on_task']), 6)
+
+    def test_weeks_start_on_monday(self):
+        """ Sunday and the following Monday fall into different weeks """
+        result = self.series('week')
+        self.assertEqual(result['buckets'][0], '2024-02-26')
+        study = dict(zip(result['buckets'],
+                         result['activities']['study']['time_on_task']))
+        self.assertEqual(study['2024-03-04'], 2)
+        self.assertEqual(study['2024-03-11'], 3)
+
+    def test_months(self):
+        """ Months are labelled with their first day """
+        result = self.series('month')
+        self.assertEqual(result['buckets'], ['2024-03-01', '2024-04-01'])
+        self.assertEqual(result['activities']['study']['time_on_task'], [5, 0])
+        self.assertEqual(result['activities']['read']['time_wasted'], [0, 1])
+        self.assertEqual(result['total_time_wasted'], [0.5, 1])
+
+    def test_unknown_bucket(self):
+        """ Only day, week and month are accepted """
+        with self.assertRaises(ValueError):
+            self.series('year')
+
+    def test_bucket_starts(self):
+        """ Python bucketing covers every day exactly once """
+        first, last = date(2023, 12, 25), date(2024, 3, 3)
+        for bucket in ('day', 'week', 'month'):
+            starts = bucket_starts(first, last, bucket)
+            day = first
+            while day <= last:
+                self.assertIn(bucket_start(day, bucket), starts)
+                day += timedelta(days=1)
+            self.assertEqual(starts, sorted(set(starts)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/report/importer.py """
+import io
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import pytz
+from sqlalchemy.exc import IntegrityError
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile, create_report)
+from tests.test_v2.test_report.test_rollup import rollup_rows
+from v2.app import app
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Profile import Profile
+from v2.models.Report import Report
+from v2.report import functions
+from v2.report.importer import ImportFormatError, import_reports
+from v2.report.rollup import rebuild_daily_rollups
+
+CSV = '''activity,date,time_on_task,time_wasted,comment
+study,2024-06-01T09:00:00,1.5,0.5,first
+reading,2024-06-01T22:30:00,2,,
+study,2024-06-02,0.5,0,
+study,not a date,1,0,
+study,2024-06-03T09:00:00,-1,0,
+,2024-06-03T09:00:00,1,0,
+study,2999-01-01T00:00:00,1,0,
+'''
+
+
+class TestImportReports(unittest.TestCase):
+    """ Tests importing a CSV into one user's reports """
+
+    def setUp(self):
+        """ Creates a profile in UTC+3 with one existing activity """
+        self.profile = create_profile(timezone='Europe/Moscow')
+        self.study = create_activity(self.profile, 'study')
+
+    def activities(self):
+        """ Returns {name: (id, total_time_on_task)} of the profile """
+        rows = storage.session.query(
+            Activity.name, Activity.id, Activity.total_time_on_task
+        ).filter(Activity.user_id == self.profile.user_id)
+        return {name: (id, total) for name, id, total in rows}
+
+    def test_import(self):
+        """ Valid lines are stored, the others reported by line """
+        progress = []
+        result = import_reports(self.profile.user_id, io.StringIO(CSV),
+                                chunk_size=3, progress=progress.append)
+
+        self.assertEqual((result.imported, result.rejected), (3, 4))
+        self.assertEqual(result.activities_created, 1)
+        self.assertEqual(len(progress), 3)
+        self.assertEqual([reject['line'] for reject in result.rejects],
+                         [5, 6, 7, 8])
+        self.assertIn('future', result.rejects[3]['message'])
+
+        activities = self.activities()
+        self.assertEqual(set(activities), {'study', 'reading'})
+        self.assertEqual(activities['study'][0], self.study.id)
+        self.assertEqual(activities['study'][1], 2)
+        self.assertEqual(activities['reading'][1], 2)
+
+        # Naive dates are wall times in the user's zone
+        dates = storage.session.query(Report.date).filter(
+            Report.activity_id == self.study.id).order_by(Report.date).all()
+        self.assertEqual(
+            [pytz.UTC.localize(date) if date.tzinfo is None else date
+             for date, in dates],
+            [datetime(2024, 6, 1, 6, tzinfo=pytz.UTC),
+             datetime(2024, 6, 1, 21, tzinfo=pytz.UTC)])
+        # Stored like ORM inserts, so comparisons hit the exact instant
+        self.assertEqual(storage.session.query(Report).filter(
+            Report.activity_id == self.study.id,
+            Report.date == datetime(2024, 6, 1, 6, tzinfo=pytz.UTC)
+        ).count(), 1)
+
+        profile = storage.session.query(Profile).filter(
+            Profile.user_id == self.profile.user_id).one()
+        self.assertEqual(
+            (profile.total_productive_time, profile.total_wasted_time), (4, 0.5))
+
+        before = rollup_rows(self.profile.user_id)
+        rebuild_daily_rollups(self.profile.user_id)
+        self.assertEqual(rollup_rows(self.profile.user_id), before)
+
+    def test_missing_column(self):
+        """ A header without the required columns is refused """
+        with self.assertRaises(ImportFormatError):
+            import_reports(self.profile.user_id,
+                           io.StringIO('name,date\nstudy,2024-06-01\n'))
+
+    def test_export_round_trip(self):
+        """ The CSV export of one user imports into another """
+        create_report(self.study, datetime(2024, 6, 1, 9, tzinfo=pytz.UTC),
+                      comment='with, a comma')
+        create_report(self.study, datetime(2024, 6, 2, 9, tzinfo=pytz.UTC))
+        exported = app.test_client().get(
+            '/api/report/export?format=csv', headers=auth_headers(self.profile))
+
+        other = create_profile()
+        result = import_reports(
+            other.user_id, io.StringIO(exported.get_data(as_text=True)))
+        self.assertEqual((result.imported, result.rejected), (2, 0))
+        comments = storage.session.query(Report.comment).join(Activity).filter(
+            Activity.user_id == other.user_id).order_by(Report.date).all()
+        self.assertEqual(comments, [('with, a comma',), (None,)])
+
+    def test_collision_is_retried(self):
+        """ A chunk hitting a taken unique_id is written again """
+        insert_reports = functions.insert_reports
+        calls = []
+
+        def flaky(rows):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise IntegrityError('INSERT', None, Exception('unique_id'))
+            insert_reports(rows)
+
+        with patch.object(functions, 'insert_reports', flaky):
+            result = import_reports(self.profile.user_id, io.StringIO(CSV))
+        self.assertEqual(calls, [3, 3])
+        self.assertEqual(result.imported, 3)
+        self.assertEqual(self.activities()['study'][1], 2)
+
+    def test_copy_errors_are_wrapped(self):
+        """ The driver's error of a failed COPY is an IntegrityError """
+        class UniqueViolation(Exception):
+            pass
+
+        connection = MagicMock()
+        connection.dialect.name = 'postgresql'
+        connection.dialect.loaded_dbapi.IntegrityError = UniqueViolation
+        cursor = connection.connection.cursor.return_value
+        cursor.copy_expert.side_effect = UniqueViolation('duplicate key')
+        row = Report.new_row(activity_id=self.study.id,
+                             date=datetime(2024, 6, 1, tzinfo=pytz.UTC),
+                             time_on_task=1, time_wasted=0, comment=None)
+        with patch.object(functions, 'storage') as storage_mock:
+            storage_mock.session.connection.return_value = connection
+            with self.assertRaises(IntegrityError) as raised:
+                functions.insert_reports([row])
+        self.assertIsInstance(raised.exception.orig, UniqueViolation)
+        cursor.close.assert_called_once()
+
+
+class TestImportEndpoint(unittest.TestCase):
+    """ Tests POST /api/report/import """
+
+    def setUp(self):
+        """ Creates a profile """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.headers = auth_headers(self.profile)
+
+    def test_upload(self):
+        """ Multipart uploads and raw bodies are both accepted """
+        response = self.client.post(
+            '/api/report/import', headers=self.headers,
+            data={'file': (io.BytesIO(CSV.encode()), 'reports.csv')})
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()['data']
+        self.assertEqual((data['imported'], data['rejected']), (3, 4))
+
+        response = self.client.post(
+            '/api/report/import', headers=self.headers, data=CSV.encode(),
+            content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['data']['activities_created'], 0)
+
+    def test_bad_header(self):
+        """ A CSV without the required columns answers 400 """
+        response = self.client.post(
+            '/api/report/import', headers=self.headers,
+            data=b'name\nstudy\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
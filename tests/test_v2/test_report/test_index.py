@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/report/index.py """
+import threading
+import unittest
+import pytest
+from sqlalchemy import event, func
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile)
+from v2.app import app
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.models.Profile import Profile
+from v2.models.ReportDailyRollup import ReportDailyRollup
+
+
+class TestCreateReport(unittest.TestCase):
+    """ Tests POST /api/report """
+
+    def setUp(self):
+        """ Creates a profile with an activity """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.activity = create_activity(self.profile, 'study')
+        self.headers = auth_headers(self.profile)
+        self.payload = {
+            'activity_id': self.activity.unique_id,
+            'date': '2024-06-01T10:00:00Z',
+            'time_on_task': 1,
+            'time_wasted': 0.5,
+        }
+
+    def totals(self):
+        """ Reads the running totals straight from the database """
+        storage.close()
+        session = storage.session
+        activity = session.query(Activity.total_time_on_task).filter(
+            Activity.id == self.activity.id).scalar()
+        profile = session.query(
+            Profile.total_productive_time, Profile.total_wasted_time
+        ).filter(Profile.user_id == self.profile.user_id).one()
+        rollup = session.query(
+            func.sum(ReportDailyRollup.time_on_task),
+            func.sum(ReportDailyRollup.report_count)
+        ).filter(ReportDailyRollup.activity_id == self.activity.id).one()
+        return activity, tuple(profile), tuple(rollup)
+
+    @pytest.mark.committed
+    def test_single_commit(self):
+        """ A report and its totals are written with one commit """
+        engine = storage.session.get_bind()
+        commits = []
+
+        def on_commit(conn):
+            commits.append(conn)
+
+        event.listen(engine, 'commit', on_commit)
+        try:
+            response = self.client.post(
+                '/api/report', json=self.payload, headers=self.headers)
+        finally:
+            event.remove(engine, 'commit', on_commit)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(self.totals(), (1, (1, 0.5), (1, 1)))
+
+    def test_unknown_activity(self):
+        """ Reports for activities of other users are rejected """
+        other = create_activity(create_profile())
+        payload = dict(self.payload, activity_id=other.unique_id)
+        response = self.client.post(
+            '/api/report', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    @pytest.mark.committed
+    def test_concurrent_reports_keep_every_update(self):
+        """ Parallel report posts all end up in the totals """
+        workers = 16
+        statuses = []
+        start = threading.Barrier(workers)
+
+        def post():
+            client = app.test_client()
+            start.wait()
+            response = client.post(
+                '/api/report', json=self.payload, headers=self.headers)
+            statuses.append(response.status_code)
+
+        threads = [threading.Thread(target=post) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [201] * workers)
+        self.assertEqual(self.totals(), (
+            workers, (workers, workers * 0.5), (workers, workers)))
+
+
+class TestCreateReportBatch(unittest.TestCase):
+    """ Tests POST /api/report/batch """
+
+    def setUp(self):
+        """ Creates a profile with two activities """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.study = create_activity(self.profile, 'study')
+        self.read = create_activity(self.profile, 'read')
+        self.headers = auth_headers(self.profile)
+
+    def report(self, activity_id, date='2024-06-01T10:00:00Z', **kwargs):
+        """ Builds a report payload """
+        payload = {'activity_id': activity_id, 'date': date,
+                   'time_on_task': 2, 'time_wasted': 1}
+        payload.update(kwargs)
+        return payload
+
+    def test_partial_batch(self):
+        """ Valid reports are stored and invalid ones reported by index """
+        other = create_activity(create_profile())
+        reports = [
+            self.report(self.study.unique_id),
+            self.report(self.study.unique_id, '2024-06-02T10:00:00Z'),
+            self.report(self.study.unique_id, time_on_task=-1),
+            self.report(other.unique_id),
+            self.report(self.read.unique_id, time_wasted=0),
+            {'activity_id': self.read.unique_id},
+        ]
+        response = self.client.post('/api/report/batch',
+                                    json={'reports': reports},
+                                    headers=self.headers)
+        data = response.get_json()['data']
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['index'] for item in data['created']],
+                         [0, 1, 4])
+        self.assertEqual([error['index'] for error in data['errors']],
+                         [2, 3, 5])
+        self.assertIn('time_on_task', data['errors'][0]['message'])
+        self.assertEqual(data['errors'][1]['message'], 'Activity not found')
+
+        storage.close()
+        session = storage.session
+        self.assertEqual(session.query(Activity.total_time_on_task).filter(
+            Activity.id == self.study.id).scalar(), 4)
+        self.assertEqual(session.query(
+            Profile.total_productive_time, Profile.total_wasted_time
+        ).filter(Profile.user_id == self.profile.user_id).one(), (6, 2))
+        self.assertEqual(session.query(
+            func.sum(ReportDailyRollup.report_count)
+        ).filter(ReportDailyRollup.user_id == self.profile.user_id
+                 ).scalar(), 3)
+
+    def test_bare_list_and_limits(self):
+        """ Accepts a bare list and rejects empty or oversized batches """
+        response = self.client.post(
+            '/api/report/batch', json=[self.report(self.read.unique_id)],
+            headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.post('/api/report/batch', json=[],
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            '/api/report/batch',
+            json=[self.report(self.read.unique_id)] * 5001,
+            headers=self.headers)
+        self.assertEqual(response.status_code, 413)
+
+    def test_nothing_valid(self):
+        """ A batch without any valid report is a bad request """
+        response = self.client.post(
+            '/api/report/batch', json=[{'activity_id': 'nope'}],
+            headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.get_json()['data']['errors']), 1)
+
+
+
+class TestGetReportSeries(unittest.TestCase):
+    """ Tests GET /api/report/series """
+
+    def setUp(self):
+        """ Creates a profile with an activity """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.activity = create_activity(self.profile, 'study')
+        self.headers = auth_headers(self.profile)
+
+    def get(self, **params):
+        """ Calls the endpoint """
+        response = self.client.get('/api/report/series', query_string=params,
+                                   headers=self.headers)
+        return response.status_code, response.get_json()
+
+    def test_week_series(self):
+        """ A report lands in its week """
+        self.client.post('/api/report', headers=self.headers, json={
+            'activity_id': self.activity.unique_id,
+            'date': '2024-06-05T10:00:00Z', 'time_on_task': 2,
+            'time_wasted': 0})
+        status, body = self.get(bucket='week', start_date='2024-06-01',
+                                end_date='2024-06-30')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['bucket'], 'week')
+        self.assertEqual(body['data']['buckets'][:2], ['2024-05-27', '2024-06-03'])
+        self.assertEqual(body['data']['activities']['study']['time_on_task'][:2], [0, 2])
+
+    def test_invalid_requests(self):
+        """ Unknown buckets and over long ranges are rejected """
+        self.assertEqual(self.get(bucket='year')[0], 400)
+        status, body = self.get(start_date='2023-01-01', end_date='2024-06-30')
+        self.assertEqual(status, 400)
+        self.assertEqual(body['message'], 'Date range cannot exceed a year')
+
+
+class TestReportTimezone(unittest.TestCase):
+    """ Tests that reports are read in the user's zone """
+
+    def setUp(self):
+        """ Creates a profile three hours ahead of UTC """
+        self.client = app.test_client()
+        self.profile = create_profile(timezone='Europe/Moscow')
+        self.activity = create_activity(self.profile, 'study')
+        self.headers = auth_headers(self.profile)
+
+    def test_naive_date_is_local(self):
+        """ A date without offset is a wall time in the user's zone """
+        response = self.client.post('/api/report', headers=self.headers, json={
+            'activity_id': self.activity.unique_id,
+            'date': '2024-06-01T01:00:00',
+            'time_on_task': 2,
+            'time_wasted': 0,
+        })
+        self.assertEqual(response.status_code, 201, response.get_json())
+
+        def total(day):
+            response = self.client.get(
+                f'/api/report?start_date={day}', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            return response.get_json()['data']['total_productive_time']
+
+        self.assertEqual(total('2024-06-01'), 2)
+        self.assertEqual(total('2024-05-31'), 0)
+
+    def test_write_uses_stored_zone(self):
+        """ A zone changed behind the cached principal still applies """
+        self.client.get('/api/activity', headers=self.headers)
+        storage.session.query(Profile).filter(
+            Profile.user_id == self.profile.user_id
+        ).update({'timezone': 'America/New_York'})
+        storage.save()
+
+        response = self.client.post('/api/report', headers=self.headers, json={
+            'activity_id': self.activity.unique_id,
+            'date': '2024-06-01T23:00:00-04:00',
+            'time_on_task': 2,
+            'time_wasted': 0,
+        })
+        self.assertEqual(response.status_code, 201, response.get_json())
+        # 23:00 in New York is already 06:00 the next day in Moscow
+        days = storage.session.query(ReportDailyRollup.day).filter(
+            ReportDailyRollup.user_id == self.profile.user_id).all()
+        self.assertEqual([str(day) for (day,) in days], ['2024-06-01'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/report/parquet.py """
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile, create_report)
+from v2.app import app
+from v2.report.parquet import (
+    PARQUET_COLUMNS, WATERMARK_LAG, export_parquet_dataset, pyarrow,
+    read_watermark)
+
+if pyarrow is not None:
+    import pyarrow.parquet
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestParquetExport(unittest.TestCase):
+    """ Tests the partitioned and the per-user Parquet exports """
+
+    def setUp(self):
+        """ Seeds reports in two months """
+        self.profile = create_profile()
+        self.activity = create_activity(self.profile, 'study')
+        for date in (datetime(2024, 5, 31, 23), datetime(2024, 6, 1, 1),
+                     datetime(2024, 6, 2, 1)):
+            create_report(self.activity, date)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Removes the exported files """
+        shutil.rmtree(self.directory)
+
+    def partitions(self):
+        """ Returns {month: rows} of the profile's exported files """
+        user_dir = os.path.join(self.directory, f'user_id={self.profile.user_id}')
+        months = {}
+        for month_dir in sorted(os.listdir(user_dir)):
+            tables = [
+                pyarrow.parquet.read_table(os.path.join(user_dir, month_dir, name))
+                for name in sorted(os.listdir(os.path.join(user_dir, month_dir)))
+            ]
+            months[month_dir.split('=')[1]] = sum(t.num_rows for t in tables)
+        return months
+
+    def exported(self):
+        """ Returns the rows of the profile's exported files """
+        user_dir = os.path.join(self.directory, f'user_id={self.profile.user_id}')
+        rows = []
+        for root, _, names in os.walk(user_dir):
+            for name in sorted(names):
+                rows += pyarrow.parquet.read_table(
+                    os.path.join(root, name)).to_pylist()
+        return rows
+
+    @patch('v2.report.parquet.WATERMARK_LAG', timedelta(0))
+    def test_incremental(self):
+        """ Later runs only write reports updated since the watermark """
+        first = export_parquet_dataset(self.directory, batch_size=2)
+        self.assertGreaterEqual(first['rows'], 3)
+        self.assertEqual(self.partitions(), {'2024-05': 1, '2024-06': 2})
+        self.assertEqual(read_watermark(self.directory), first['watermark'])
+
+        self.assertEqual(export_parquet_dataset(self.directory)['rows'], 0)
+
+        create_report(self.activity, datetime(2024, 7, 1, 12))
+        third = export_parquet_dataset(self.directory)
+        self.assertEqual(third['rows'], 1)
+        self.assertGreater(third['watermark'], first['watermark'])
+        self.assertEqual(self.partitions(),
+                         {'2024-05': 1, '2024-06': 2, '2024-07': 1})
+
+    def test_watermark_lags(self):
+        """ Reports stamped shortly before a run are exported again """
+        first = export_parquet_dataset(self.directory)
+        self.assertLessEqual(first['watermark'], datetime.now() - WATERMARK_LAG)
+        self.assertEqual(export_parquet_dataset(self.directory)['rows'],
+                         first['rows'])
+
+    @patch('v2.report.parquet.WATERMARK_LAG', timedelta(0))
+    def test_activity_changes(self):
+        """ Renaming or deleting an activity exports its reports again """
+        client = app.test_client()
+        headers = auth_headers(self.profile)
+        url = f'/api/activity/{self.activity.unique_id}'
+        user_dir = os.path.join(self.directory, f'user_id={self.profile.user_id}')
+        export_parquet_dataset(self.directory)
+        shutil.rmtree(user_dir)
+
+        response = client.patch(url, headers=headers, json={'name': 'reading'})
+        self.assertEqual(response.status_code, 200, response.get_json())
+        export_parquet_dataset(self.directory)
+        rows = self.exported()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['activity_name'] for row in rows}, {'reading'})
+        shutil.rmtree(user_dir)
+
+        response = client.delete(url, headers=headers)
+        self.assertEqual(response.status_code, 200, response.get_json())
+        export_parquet_dataset(self.directory)
+        rows = self.exported()
+        self.assertEqual(len(rows), 3)
+        for row in rows:
+            self.assertIsNotNone(row['activity_deleted'])
+
+    def test_schema(self):
+        """ Rows carry the activity and UTC dates """
+        export_parquet_dataset(self.directory, full=True)
+        path = os.path.join(self.directory, f'user_id={self.profile.user_id}',
+                            'month=2024-05')
+        table = pyarrow.parquet.read_table(
+            os.path.join(path, os.listdir(path)[0]))
+        self.assertEqual(tuple(table.column_names), PARQUET_COLUMNS)
+        row = table.to_pylist()[0]
+        self.assertEqual(row['activity_name'], 'study')
+        self.assertEqual(row['activity_id'], self.activity.unique_id)
+        self.assertEqual(row['date'].isoformat(), '2024-05-31T23:00:00+00:00')
+
+    @patch('v2.report.parquet.WATERMARK_LAG', timedelta(0))
+    def test_endpoint(self):
+        """ format=parquet returns one file, since skips older reports """
+        client = app.test_client()
+        headers = auth_headers(self.profile)
+        response = client.get('/api/report/export?format=parquet',
+                              headers=headers)
+        self.assertEqual(response.status_code, 200)
+        table = pyarrow.parquet.read_table(io.BytesIO(response.get_data()))
+        self.assertEqual(table.num_rows, 3)
+
+        watermark = response.headers['X-Export-Watermark']
+        response = client.get('/api/report/export', headers=headers,
+                              query_string={'format': 'parquet', 'since': watermark})
+        table = pyarrow.parquet.read_table(io.BytesIO(response.get_data()))
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(response.headers['X-Export-Watermark'], watermark)
+
+        response = client.get('/api/report/export?format=parquet&since=soon',
+                              headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
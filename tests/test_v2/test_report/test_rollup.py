@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/report/rollup.py """
+import unittest
+from datetime import date, datetime, timedelta
+import pytz
+from tests.test_v2.factories import (
+    create_activity, create_profile, create_report)
+from v2.models import storage
+from v2.models.ReportDailyRollup import ReportDailyRollup
+from v2.profile.functions import update_profile
+from v2.profile.validation import ProfileUpdateRequest
+from v2.report.functions import (
+    format_dates, get_reports_in_range, rollup_days)
+from v2.report.rollup import rebuild_daily_rollups
+
+
+def rollup_rows(user_id):
+    """ Returns a user's rollup as {(activity_id, day): (tot, tw, count)} """
+    rows = storage.session.query(ReportDailyRollup).filter(
+        ReportDailyRollup.user_id == user_id)
+    return {
+        (row.activity_id, row.day):
+            (row.time_on_task, row.time_wasted, row.report_count)
+        for row in rows
+    }
+
+
+class TestDailyRollup(unittest.TestCase):
+    """ Tests that the rollup follows the report table """
+
+    def setUp(self):
+        """ Seeds two activities with reports on a few days """
+        self.profile = create_profile()
+        self.study = create_activity(self.profile, 'study')
+        self.read = create_activity(self.profile, 'read')
+
+        create_report(self.study, datetime(2024, 5, 1, 8), 1, 0.5)
+        create_report(self.study, datetime(2024, 5, 1, 20), 2, 0)
+        create_report(self.read, datetime(2024, 5, 1, 23, 30), 1, 1)
+        # 01:30 in UTC+3 is still May 1st in UTC
+        create_report(self.read, datetime(
+            2024, 5, 2, 1, 30, tzinfo=pytz.FixedOffset(180)), 4, 0)
+        create_report(self.read, datetime(2024, 5, 3, 0, 0), 3, 0)
+
+    def test_rows_follow_reports(self):
+        """ create_new_report adds to one row per activity and UTC day """
+        self.assertEqual(rollup_rows(self.profile.user_id), {
+            (self.study.id, date(2024, 5, 1)): (3, 0.5, 2),
+            (self.read.id, date(2024, 5, 1)): (5, 1, 2),
+            (self.read.id, date(2024, 5, 3)): (3, 0, 1),
+        })
+
+    def test_rebuild_matches_incremental(self):
+        """ The backfill produces the same rows as the write path """
+        incremental = rollup_rows(self.profile.user_id)
+
+        rebuild_daily_rollups(self.profile.user_id)
+
+        self.assertEqual(rollup_rows(self.profile.user_id), incremental)
+
+    def test_rollup_and_raw_reports_agree(self):
+        """ Whole-day and partial-day ranges report the same totals """
+        start = datetime(2024, 5, 1, tzinfo=pytz.UTC)
+        whole_days = get_reports_in_range(
+            self.profile.user_id, start,
+            start + timedelta(days=2) - timedelta(microseconds=1))
+        # Not day aligned, so this one aggregates the report table
+        raw = get_reports_in_range(
+            self.profile.user_id, start,
+            start + timedelta(days=2) - timedelta(seconds=1))
+
+        self.assertEqual(whole_days['activities'], raw['activities'])
+        self.assertEqual(whole_days['total_productive_time'], 8)
+
+    def test_rollup_days(self):
+        """ Only ranges on UTC day boundaries map to rollup days """
+        start = datetime(2024, 5, 1, tzinfo=pytz.UTC)
+        self.assertEqual(
+            rollup_days(start, start.replace(hour=23, minute=59, second=59,
+                                             microsecond=999999)),
+            (date(2024, 5, 1), date(2024, 5, 1)))
+        self.assertEqual(
+            rollup_days(start, start + timedelta(days=1)),
+            (date(2024, 5, 1), date(2024, 5, 1)))
+        self.assertIsNone(rollup_days(start, start + timedelta(hours=5)))
+        self.assertIsNone(
+            rollup_days(start.astimezone(pytz.FixedOffset(180)) +
+                        timedelta(hours=1), start + timedelta(days=1)))
+
+
+class TestTimezoneRollup(unittest.TestCase):
+    """ Tests that rollup days are the user's local days """
+
+    def setUp(self):
+        """ Seeds reports near midnight and DST changes in New York """
+        self.profile = create_profile(timezone='America/New_York')
+        self.activity = create_activity(self.profile)
+        self.dates = [
+            datetime(2024, 3, 10, 4, 30, tzinfo=pytz.UTC),   # Mar 9, 23:30 EST
+            datetime(2024, 3, 11, 3, 30, tzinfo=pytz.UTC),   # Mar 10, 23:30 EDT
+            datetime(2024, 11, 3, 5, 30, tzinfo=pytz.UTC),   # Nov 3, 01:30 EDT
+            datetime(2024, 11, 3, 6, 30, tzinfo=pytz.UTC),   # Nov 3, 01:30 EST
+            datetime(2024, 11, 4, 4, 30, tzinfo=pytz.UTC),   # Nov 3, 23:30 EST
+        ]
+        for report_date in self.dates:
+            create_report(self.activity, report_date)
+
+    def days(self):
+        """ Returns the rollup as {day: report_count} """
+        return {
+            day: count
+            for (_, day), (_, _, count) in rollup_rows(self.profile.user_id).items()
+        }
+
+    def test_local_days(self):
+        """ Incremental rows use local days and match a rebuild """
+        self.assertEqual(self.days(), {
+            date(2024, 3, 9): 1,
+            date(2024, 3, 10): 1,
+            date(2024, 11, 3): 3,
+        })
+        before = rollup_rows(self.profile.user_id)
+        rebuild_daily_rollups(self.profile.user_id)
+        self.assertEqual(rollup_rows(self.profile.user_id), before)
+
+    def test_windows(self):
+        """ Windows follow local midnights, and read the rollup """
+        start, end = format_dates('2024-03-10', None, 'America/New_York')
+        self.assertEqual(start, datetime(2024, 3, 10, 5, tzinfo=pytz.UTC))
+        self.assertEqual(end, datetime(2024, 3, 11, 4, tzinfo=pytz.UTC))
+        self.assertEqual(end - start, timedelta(hours=23))
+
+        start, end = format_dates('2024-11-03', '2024-11-03', 'America/New_York')
+        report = get_reports_in_range(
+            self.profile.user_id, start, end, 'America/New_York')
+        self.assertEqual(report['total_productive_time'], 3)
+
+    def test_timezone_change(self):
+        """ Moving to another zone rebuilds the rollup in its days """
+        update_profile(self.profile.user_id, ProfileUpdateRequest(timezone='UTC'))
+        self.assertEqual(self.days(), {
+            date(2024, 3, 10): 1,
+            date(2024, 3, 11): 1,
+            date(2024, 11, 3): 2,
+            date(2024, 11, 4): 1,
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
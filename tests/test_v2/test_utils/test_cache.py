@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/utils/cache.py """
+import time
+import unittest
+from v2.utils.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """ Tests the LRU and TTL eviction of TTLCache """
+
+    def test_get_and_set(self):
+        """ Stored values are returned and counted as hits """
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        """ The entry used longest ago goes first """
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        """ Entries are dropped once their TTL passed """
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+
+    def test_ttl_is_capped(self):
+        """ A per-entry TTL can't extend the cache TTL """
+        cache = TTLCache(maxsize=2, ttl=0.01)
+        cache.set('a', 1, ttl=60)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+        cache.set('b', 2, ttl=-1)
+        self.assertEqual(len(cache), 0)
+
+    def test_delete_where(self):
+        """ delete_where() removes matching entries only """
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set(('x', 1), 'keep')
+        cache.set(('y', 1), 'drop')
+        cache.set(('y', 2), 'drop')
+        self.assertEqual(cache.delete_where(lambda key, _: key[0] == 'y'), 2)
+        self.assertEqual(cache.get(('x', 1)), 'keep')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/utils/etag.py """
+import unittest
+import pytest
+from sqlalchemy import event
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile, create_report)
+from datetime import datetime
+from v2.app import app
+from v2.models import storage
+from v2.utils.etag import bump_data_version, get_data_version
+
+
+class TestDataVersion(unittest.TestCase):
+    """ Tests the per-user version counter """
+
+    def setUp(self):
+        """ Creates a profile with an activity """
+        self.profile = create_profile()
+        self.activity = create_activity(self.profile, 'study')
+
+    def test_bump(self):
+        """ Bumping adds one once committed """
+        version = get_data_version(self.profile.user_id)
+        bump_data_version(self.profile.user_id)
+        storage.save()
+        self.assertEqual(get_data_version(self.profile.user_id), version + 1)
+
+    def test_reports_bump(self):
+        """ Creating a report bumps the version """
+        version = get_data_version(self.profile.user_id)
+        create_report(self.activity, datetime(2024, 6, 1))
+        self.assertEqual(get_data_version(self.profile.user_id), version + 1)
+
+    def test_unknown_user(self):
+        """ Users without a profile are at version 0 """
+        self.assertEqual(get_data_version('nobody'), 0)
+
+
+class TestConditionalGet(unittest.TestCase):
+    """ Tests ETag and If-None-Match on the read endpoints """
+
+    def setUp(self):
+        """ Creates a profile with an activity and a report """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.activity = create_activity(self.profile, 'study')
+        create_report(self.activity, datetime(2024, 6, 1, 10))
+        self.headers = auth_headers(self.profile)
+        self.urls = [
+            '/api/activity',
+            f'/api/activity/{self.activity.unique_id}',
+            '/api/report?start_date=2024-06-01&end_date=2024-06-30',
+        ]
+
+    def get(self, url, etag=None):
+        """ GETs url, conditionally when etag is given """
+        headers = dict(self.headers)
+        if etag:
+            headers['If-None-Match'] = f'"{etag}"'
+        return self.client.get(url, headers=headers)
+
+    def test_not_modified(self):
+        """ The current ETag is answered with an empty 304 """
+        for url in self.urls:
+            etag = self.get(url).get_etag()[0]
+            response = self.get(url, etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.get_data(), b'')
+            self.assertEqual(response.get_etag()[0], etag)
+
+    @pytest.mark.committed
+    def test_not_modified_skips_queries(self):
+        """ A 304 only reads the data version """
+        url = self.urls[0]
+        etag = self.get(url).get_etag()[0]
+        statements = []
+
+        def on_execute(*args):
+            statements.append(args)
+
+        engine = storage.session.get_bind()
+        event.listen(engine, 'before_cursor_execute', on_execute)
+        try:
+            self.assertEqual(self.get(url, etag).status_code, 304)
+        finally:
+            event.remove(engine, 'before_cursor_execute', on_execute)
+        self.assertEqual(len(statements), 1)
+
+    def test_writes_change_etags(self):
+        """ Activity and report writes invalidate every ETag """
+        etags = [self.get(url).get_etag()[0] for url in self.urls]
+        response = self.client.post('/api/report', headers=self.headers, json={
+            'activity_id': self.activity.unique_id,
+            'date': '2024-06-02T10:00:00Z', 'time_on_task': 1,
+            'time_wasted': 0})
+        self.assertEqual(response.status_code, 201)
+        for url, etag in zip(self.urls, etags):
+            self.assertEqual(self.get(url, etag).status_code, 200, url)
+
+        etag = self.get(self.urls[0]).get_etag()[0]
+        response = self.client.post('/api/activity', headers=self.headers,
+                                    json={'name': 'reading', 'daily_goal': 1})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get(self.urls[0], etag).status_code, 200)
+
+    def test_query_changes_etag(self):
+        """ Different projections of the same data have different ETags """
+        self.assertNotEqual(self.get('/api/activity').get_etag()[0],
+                            self.get('/api/activity?fields=name').get_etag()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/utils/instrumentation.py """
+import re
+import unittest
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from tests.test_v2.factories import (
+    auth_headers, create_activity, create_profile, create_report)
+from v2.app import app
+from v2.engine.queries import current_queries, stop_tracking, track_queries
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.utils import instrumentation
+from v2.utils.instrumentation import route_metrics
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=(\d+\.\d);desc="(\d+) queries", app;dur=(\d+\.\d)$')
+
+
+class TestQueryStats(unittest.TestCase):
+    """ Tests counting the statements of the storage engine """
+
+    def tearDown(self):
+        """ Stops tracking """
+        stop_tracking()
+
+    @pytest.mark.committed
+    def test_counts_statements(self):
+        """ Every statement is counted with its time """
+        stats = track_queries()
+        storage.session.query(Activity).limit(1).all()
+        storage.session.query(Activity).limit(1).all()
+        self.assertIs(current_queries(), stats)
+        self.assertEqual(stats.statements, 2)
+        self.assertGreater(stats.db_time, 0)
+
+    def test_untracked(self):
+        """ Statements outside of track_queries are not recorded """
+        storage.session.query(Activity).limit(1).all()
+        self.assertIsNone(current_queries())
+
+
+class TestRequestInstrumentation(unittest.TestCase):
+    """ Tests the Server-Timing header, route metrics and /metrics """
+
+    def setUp(self):
+        """ Creates a profile with a report and empties the metrics """
+        self.client = app.test_client()
+        self.profile = create_profile()
+        activity = create_activity(self.profile, 'study')
+        create_report(activity, datetime(2024, 6, 1, 10))
+        self.headers = auth_headers(self.profile)
+        route_metrics.reset()
+
+    def test_server_timing(self):
+        """ Responses report their statements and database time """
+        response = self.client.get('/api/activity', headers=self.headers)
+        match = SERVER_TIMING.match(response.headers['Server-Timing'])
+        self.assertIsNotNone(match, response.headers['Server-Timing'])
+        self.assertGreater(int(match.group(2)), 0)
+        self.assertLessEqual(float(match.group(1)), float(match.group(3)))
+
+    def test_route_metrics(self):
+        """ Requests are recorded under their route pattern """
+        for _ in range(3):
+            self.client.get('/api/activity', headers=self.headers)
+        self.client.get('/api/nothing-here')
+
+        routes = dict(route_metrics.routes())
+        metrics = routes[('GET', '/api/activity')]
+        self.assertEqual(metrics.responses, {200: 3})
+        self.assertEqual(metrics.latency.count, 3)
+        self.assertGreater(metrics.statements.sum, 0)
+        self.assertEqual(routes[('GET', '<unmatched>')].responses, {404: 1})
+
+    def test_query_budget(self):
+        """ Requests over the statement budget log a warning """
+        with patch.object(instrumentation, 'QUERY_BUDGET', 1), \
+                self.assertLogs('v2.utils.instrumentation', 'WARNING') as logs:
+            self.client.get('/api/activity', headers=self.headers)
+        self.assertIn('GET /api/activity issued', logs.output[0])
+
+    def test_within_budget(self):
+        """ Requests within the budget log nothing """
+        with patch.object(instrumentation, 'QUERY_BUDGET', 1000), \
+                self.assertNoLogs('v2.utils.instrumentation', 'WARNING'):
+            self.client.get('/api/activity', headers=self.headers)
+
+    @patch.object(instrumentation, 'METRICS_PUBLIC', True)
+    def test_metrics_endpoint(self):
+        """ /metrics serves the route and process metrics as text """
+        self.client.get('/api/activity', headers=self.headers)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+
+        text = response.get_data(as_text=True)
+        labels = 'method="GET",route="/api/activity"'
+        self.assertIn(
+            f'timecraft_http_requests_total{{{labels},status="200"}} 1', text)
+        self.assertIn(
+            f'timecraft_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1',
+            text)
+        self.assertIn(f'timecraft_db_statements_per_request_count{{{labels}}} 1',
+                      text)
+        self.assertIn('# TYPE timecraft_db_time_seconds histogram', text)
+        for name in ('timecraft_db_pool_checkouts',
+                     'timecraft_principal_cache_hits',
+                     'timecraft_report_cache_hits',
+                     'timecraft_password_hash_latency_seconds_count'):
+            self.assertIn(name, text)
+
+    def test_metrics_token(self):
+        """ With METRICS_TOKEN set, /metrics needs it as a bearer token """
+        with patch.object(instrumentation, 'METRICS_TOKEN', 'scrape'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get(
+                '/metrics', headers={'Authorization': 'Bearer scrape'})
+            self.assertEqual(response.status_code, 200)
+
+    def test_metrics_closed(self):
+        """ Without METRICS_TOKEN or METRICS_PUBLIC, /metrics is not served """
+        with patch.object(instrumentation, 'METRICS_TOKEN', None), \
+                patch.object(instrumentation, 'METRICS_PUBLIC', False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
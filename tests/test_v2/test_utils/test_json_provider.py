@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/utils/json_provider.py """
+import json
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from v2.utils import json_provider
+from v2.utils.json_provider import FastJSONProvider
+
+
+class TestFastJSONProvider(unittest.TestCase):
+    """ Tests FastJSONProvider stays compatible with Flask's provider """
+
+    payload = {
+        'b': [1, 2.5, None, True],
+        'a': 'café',
+        'date': datetime(2024, 3, 1, 12, 30),
+        'amount': Decimal('1.50'),
+    }
+
+    def setUp(self):
+        """ Creates an app using the provider """
+        self.app = Flask(__name__)
+        self.app.json = FastJSONProvider(self.app)
+        self.default = DefaultJSONProvider(self.app)
+
+    def body(self, provider):
+        """ Response body of the payload """
+        with self.app.app_context():
+            return provider.response(self.payload).get_data()
+
+    def test_same_document_as_default(self):
+        """ Dates, decimals and key order match jsonify """
+        fast = self.body(self.app.json)
+        self.assertEqual(json.loads(fast), json.loads(self.body(self.default)))
+        self.assertIn(b'"Fri, 01 Mar 2024 12:30:00 GMT"', fast)
+        self.assertLess(fast.index(b'"a"'), fast.index(b'"b"'))
+
+    def test_compact_unless_pretty(self):
+        """ Output is compact by default and indented when not compact """
+        self.assertNotIn(b'\n  ', self.body(self.app.json))
+        self.app.json.compact = False
+        self.assertIn(b'\n  ', self.body(self.app.json))
+
+    def test_loads(self):
+        """ Strings and bytes are parsed """
+        self.assertEqual(self.app.json.loads(b'{"a": [1]}'), {'a': [1]})
+        self.assertEqual(self.app.json.loads('{"a": [1]}'), {'a': [1]})
+
+    def test_stdlib_fallback(self):
+        """ Without orjson Flask's own implementation is used """
+        with patch.object(json_provider, 'orjson', None):
+            self.assertEqual(json.loads(self.body(self.app.json)),
+                             json.loads(self.body(self.default)))
+            self.assertEqual(self.app.json.loads('[1]'), [1])
+
+    def test_unsupported_integers_fall_back(self):
+        """ Values orjson rejects are encoded by the stdlib """
+        self.assertEqual(self.app.json.dumps({'n': 2 ** 70}),
+                         '{"n": 1180591620717411303424}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/utils/middleware.py """
+import unittest
+from sqlalchemy import event
+from tests.test_v2.factories import auth_headers, create_profile
+from v2.app import app
+from v2.auth.functions import principal_cache
+from v2.models import storage
+
+
+class TestAuthMiddleware(unittest.TestCase):
+    """ Tests authentication and the principal cache """
+
+    def setUp(self):
+        """ Creates a user and counts the SQL statements issued """
+        principal_cache.clear()
+        self.client = app.test_client()
+        self.profile = create_profile()
+        self.headers = auth_headers(self.profile)
+        self.statements = 0
+
+        self.engine = storage.session.get_bind()
+        event.listen(self.engine, 'before_cursor_execute', self.count)
+
+    def tearDown(self):
+        """ Stops counting statements """
+        event.remove(self.engine, 'before_cursor_execute', self.count)
+
+    def count(self, *args):
+        """ before_cursor_execute listener """
+        self.statements += 1
+
+    def test_missing_token(self):
+        """ Requests without a token are rejected """
+        self.assertEqual(self.client.get('/api/auth/me').status_code, 401)
+
+    def test_invalid_token(self):
+        """ Tokens that don't verify are rejected """
+        response = self.client.get(
+            '/api/auth/me', headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_warm_request_skips_the_database(self):
+        """ The second request with a token is served from the cache """
+        response = self.client.get('/api/auth/me', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.statements, 0)
+
+        self.statements = 0
+        response = self.client.get('/api/auth/me', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statements, 0)
+        self.assertEqual(response.get_json()['data']['username'],
+                         self.profile.username)
+
+    def test_profile_update_invalidates(self):
+        """ Updating the profile drops the cached principal """
+        self.client.get('/api/auth/me', headers=self.headers)
+        response = self.client.patch(
+            '/api/profile', json={'full_name': 'Renamed User'},
+            headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/auth/me', headers=self.headers)
+        self.assertEqual(response.get_json()['data']['full_name'],
+                         'Renamed User')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/utils/serializers.py """
+import unittest
+from datetime import datetime
+from tests.test_v2.factories import create_activity, create_profile
+from v2.models import storage
+from v2.models.Activity import Activity
+from v2.utils.serializers import ModelSerializer, serializer_for
+
+
+class TestModelSerializer(unittest.TestCase):
+    """ Tests serializing models and query rows """
+
+    def setUp(self):
+        """ Creates an activity to serialize """
+        self.activity = create_activity(create_profile(), 'reading')
+
+    def test_dump_dates_as_iso(self):
+        """ Datetime columns are written as ISO 8601 strings """
+        serializer = ModelSerializer(Activity, ('name', 'created_at'))
+        self.assertEqual(serializer.dump(self.activity), {
+            'name': 'reading',
+            'created_at': self.activity.created_at.isoformat()
+        })
+
+    def test_dump_dates_untouched(self):
+        """ iso_dates=False leaves datetimes for the JSON provider """
+        serializer = ModelSerializer(Activity, ('created_at',), iso_dates=False)
+        self.assertIsInstance(serializer.dump(self.activity)['created_at'], datetime)
+
+    def test_null_dates(self):
+        """ Missing dates stay None """
+        serializer = ModelSerializer(Activity, ('deleted',))
+        self.assertEqual(serializer.dump(self.activity), {'deleted': None})
+
+    def test_all_columns_by_default(self):
+        """ Without fields every column is serialized, but no relationships """
+        data = ModelSerializer(Activity).dump(self.activity)
+        self.assertIn('user_id', data)
+        self.assertNotIn('reports', data)
+        self.assertNotIn('_sa_instance_state', data)
+
+    def test_dump_many_rows(self):
+        """ Query rows with matching names serialize like instances """
+        rows = storage.session.query(Activity.id, Activity.name).filter(
+            Activity.id == self.activity.id).all()
+        self.assertEqual(
+            serializer_for(Activity, ('id', 'name')).dump_many(rows),
+            [{'id': self.activity.id, 'name': 'reading'}])
+
+    def test_unknown_field(self):
+        """ Fields must be columns of the model """
+        with self.assertRaises(ValueError):
+            ModelSerializer(Activity, ('name', 'reports'))
+
+    def test_to_dict(self):
+        """ BaseModel.to_dict only contains column values """
+        data = self.activity.to_dict()
+        self.assertNotIn('_sa_instance_state', data)
+        self.assertNotIn('deleted', data)
+        self.assertEqual(data['__class__'], 'Activity')
+        self.assertEqual(data['updated_at'], self.activity.updated_at.isoformat())
+
+
+if __name__ == '__main__':
+    unittest.main()
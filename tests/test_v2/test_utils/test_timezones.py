@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+""" This module contains tests for v2/utils/timezones.py """
+import unittest
+from datetime import date, datetime, timedelta
+import pytz
+from pydantic import ValidationError
+from tests.test_v2.factories import (
+    create_activity, create_profile, create_report)
+from v2.models import storage
+from v2.models.Report import Report
+from v2.profile.validation import ProfileUpdateRequest
+from v2.utils.timezones import (
+    day_end, day_start, local_date_expression, local_day, localize,
+    validate_timezone)
+
+NEW_YORK = 'America/New_York'
+
+
+class TestDayBoundaries(unittest.TestCase):
+    """ Tests day boundaries around DST changes """
+
+    def test_validate(self):
+        """ IANA names pass, anything else is rejected """
+        self.assertEqual(validate_timezone('Europe/Berlin'), 'Europe/Berlin')
+        with self.assertRaises(ValueError):
+            validate_timezone('Mars/Olympus_Mons')
+        with self.assertRaises(ValidationError):
+            ProfileUpdateRequest(timezone='Mars/Olympus_Mons')
+
+    def test_day_length(self):
+        """ DST days are 23 and 25 hours long """
+        def hours(day, timezone):
+            length = day_end(day, timezone) - day_start(day, timezone)
+            return round(length / timedelta(hours=1))
+
+        self.assertEqual(hours(date(2024, 3, 10), NEW_YORK), 23)
+        self.assertEqual(hours(date(2024, 11, 3), NEW_YORK), 25)
+        self.assertEqual(hours(date(2024, 6, 1), NEW_YORK), 24)
+        self.assertEqual(day_start(date(2024, 6, 1), 'Europe/Moscow'),
+                         datetime(2024, 5, 31, 21, tzinfo=pytz.UTC))
+
+    def test_local_day(self):
+        """ Instants map to the wall calendar of the zone """
+        self.assertEqual(
+            local_day(datetime(2024, 3, 11, 3, 30, tzinfo=pytz.UTC), NEW_YORK),
+            date(2024, 3, 10))
+        self.assertEqual(
+            local_day(datetime(2024, 3, 10, 4, 30, tzinfo=pytz.UTC), NEW_YORK),
+            date(2024, 3, 9))
+
+    def test_localize(self):
+        """ Naive wall times get the zone's offset at that date """
+        self.assertEqual(localize(datetime(2024, 1, 15, 9), NEW_YORK).utcoffset(),
+                         timedelta(hours=-5))
+        self.assertEqual(localize(datetime(2024, 7, 15, 9), NEW_YORK).utcoffset(),
+                         timedelta(hours=-4))
+
+
+class TestLocalDateExpression(unittest.TestCase):
+    """ Tests the SQL local day against the Python one """
+
+    def setUp(self):
+        """ Seeds a report every 30 minutes around both 2024 DST changes """
+        self.profile = create_profile(timezone=NEW_YORK)
+        self.activity = create_activity(self.profile)
+        for first in (datetime(2024, 3, 9, tzinfo=pytz.UTC),
+                      datetime(2024, 11, 2, tzinfo=pytz.UTC)):
+            for step in range(3 * 48):
+                create_report(self.activity, first + step * timedelta(minutes=30))
+
+    def test_matches_python(self):
+        """ Every report lands on the same day in SQL and in Python """
+        dialect = storage.session.get_bind().dialect.name
+        day = local_date_expression(
+            dialect, Report.date, NEW_YORK,
+            datetime(2024, 3, 1), datetime(2024, 12, 1))
+        rows = storage.session.query(Report.date, day).filter(
+            Report.activity_id == self.activity.id).all()
+        self.assertEqual(len(rows), 288)
+        for report_date, sql_day in rows:
+            if isinstance(sql_day, str):
+                sql_day = date.fromisoformat(sql_day)
+            self.assertEqual(sql_day, local_day(report_date, NEW_YORK),
+                             report_date)
+
+
+if __name__ == '__main__':
+    unittest.main()